@@ -35,6 +35,10 @@ def main():
         script/program. The corresponding modes are:
         - sim: The normal simulation process started by a BlueSky server
         - sim-detached: An isolated simulation node, without networking
+
+        Finally, with --batch the scenarios in a batch file are run in
+        fast-time in a pool of detached simulation nodes (see
+        bluesky.simulation.batch).
     """
     # When importerror gives different name than (pip) install needs,
     # also advise latest version
@@ -65,12 +69,30 @@ def main():
     # Check if alternate config file is passed or a default scenfile
     cfgfile = ''
     scnfile = ''
+    batchfile = ''
+    batchargs = dict()
     for i in range(len(sys.argv)):
         if len(sys.argv) > i + 1:
             if sys.argv[i] == '--config-file':
                 cfgfile = sys.argv[i + 1]
             elif sys.argv[i] == '--scenfile':
                 scnfile = sys.argv[i + 1]
+            elif sys.argv[i] == '--batch':
+                batchfile = sys.argv[i + 1]
+            elif sys.argv[i] == '--workers':
+                batchargs['nworkers'] = int(sys.argv[i + 1])
+            elif sys.argv[i] == '--seeds':
+                batchargs['nseeds'] = int(sys.argv[i + 1])
+            elif sys.argv[i] == '--maxtime':
+                batchargs['maxtime'] = float(sys.argv[i + 1])
+            elif sys.argv[i] == '--output':
+                batchargs['outfile'] = sys.argv[i + 1]
+
+    # Fast-time batch simulation in a local process pool, without server/gui
+    if batchfile:
+        from bluesky.simulation import batch
+        batch.run(batchfile, cfgfile=cfgfile, **batchargs)
+        return
 
     # Catch import errors
     try:
@@ -0,0 +1,90 @@
+''' Pipelines of update stages, each with its own simulation-time interval. '''
+import time
+from collections import OrderedDict
+from inspect import signature
+from bluesky.core import profiler
+from bluesky.core.simtime import Timer
+
+
+class Stage:
+    ''' Update stage, triggered by a simulation timer. When the stage
+        function accepts dt, it is called with the simulation time that
+        passed since its previous call. '''
+    def __init__(self, name, fun, timer):
+        self.name = name
+        self.fun = fun
+        self.timer = timer
+        self.passdt = 'dt' in signature(fun).parameters
+        self.dt = 0.0         # Simulation time since the previous call [s]
+        self.walltime = 0.0   # Total wall-clock time spent in this stage [s]
+        self.ncalls = 0
+
+    def reset(self):
+        ''' Reset the elapsed time and wall-time accounting. '''
+        self.dt = 0.0
+        self.walltime = 0.0
+        self.ncalls = 0
+
+    def update(self, simdt):
+        ''' Call the stage function when its timer has passed an interval. '''
+        self.dt += simdt
+        if self.timer.counter == 0:
+            t0 = time.perf_counter()
+            if self.passdt:
+                self.fun(dt=self.dt)
+            else:
+                self.fun()
+            duration = time.perf_counter() - t0
+            self.walltime += duration
+            if profiler.enabled:
+                profiler.record('traffic:' + self.name, duration)
+            self.ncalls += 1
+            self.dt = 0.0
+
+
+class Pipeline:
+    ''' Ordered collection of update stages. The timers of the stages
+        are named <pipeline name>.<stage name>. '''
+    def __init__(self, name):
+        self.name = name
+        self.stages = OrderedDict()
+
+    def add(self, name, fun, dt=0.0, before=None, timer=None):
+        ''' Add a stage with update function fun, and default update interval
+            dt (zero for every simulation step). The stage is added at the
+            end, or before stage with name before. When timer is given, the
+            stage is triggered by this existing timer instead. '''
+        timer = timer or Timer.maketimer(f'{self.name}.{name}', dt)
+        stage = Stage(name, fun, timer)
+        self.stages[name.upper()] = stage
+        if before is not None:
+            names = list(self.stages)
+            for key in names[names.index(before.upper()):-1]:
+                self.stages.move_to_end(key)
+        return stage
+
+    def remove(self, name):
+        ''' Remove the stage with name. '''
+        self.stages.pop(name.upper(), None)
+
+    def get(self, name):
+        ''' Return the stage with name, or None when it doesn't exist. '''
+        return self.stages.get(name.upper())
+
+    def reset(self):
+        for stage in self.stages.values():
+            stage.reset()
+
+    def update(self, simdt):
+        ''' Update all stages in order. '''
+        for stage in self.stages.values():
+            stage.update(simdt)
+
+    def report(self):
+        ''' Text with the interval and wall-clock time of each stage. '''
+        lines = [f'{"Stage":<12} {"dt [s]":>8} {"calls":>8} {"ms/call":>8} {"total [s]":>10}']
+        for stage in self.stages.values():
+            percall = 1e3 * stage.walltime / max(1, stage.ncalls)
+            lines.append(f'{stage.name:<12} {float(stage.timer.dt_act):>8.2f} {stage.ncalls:>8d} '
+                         f'{percall:>8.3f} {stage.walltime:>10.3f}')
+        return '\n'.join(lines)
@@ -0,0 +1,193 @@
+''' Wall-clock time profiler of the parts of a simulation step.
+
+    When enabled, the timed functions (preupdate, update and reset hooks,
+    including plugin updates), the traffic update stages, stack processing,
+    walltime timers and network sends are timed. The durations of the most
+    recent calls of each section are kept in a rolling window, from which
+    a histogram and statistics are computed. The results can be dumped to
+    a JSON file, to compare the performance of different versions.
+'''
+import os
+import json
+import time
+from datetime import datetime
+import numpy as np
+
+import bluesky as bs
+from bluesky import settings
+from bluesky.core import walltime
+
+
+# Register settings defaults
+settings.set_variable_defaults(profile_window=1000, profile_streamdt=1.0)
+
+# Bin edges [s] of the duration histograms: 8 bins per decade from 1 us to 10 s
+binedges = np.logspace(-6, 1, 57)
+
+# Profiling is switched off by default, the instrumented code checks this flag
+enabled = False
+
+# Profiled sections per name
+sections = dict()
+
+# Walltime timer of the PROFILE stream
+streamtimer = None
+
+
+class Section:
+    ''' Durations of a profiled part of the simulation. '''
+    def __init__(self, name, window):
+        self.name = name
+        self.samples = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, dt):
+        ''' Add duration dt [s]. '''
+        self.samples[self.count % len(self.samples)] = dt
+        self.count += 1
+        self.total += dt
+
+    def recent(self):
+        ''' Durations in the rolling window. '''
+        return self.samples[:min(self.count, len(self.samples))]
+
+    def histogram(self):
+        ''' Histogram of the durations in the rolling window, with binedges. '''
+        return np.histogram(np.clip(self.recent(), binedges[0], binedges[-1]), binedges)[0]
+
+    def stats(self):
+        ''' Statistics of the durations [s] in the rolling window, and the
+            total number of calls and duration. '''
+        recent = self.recent()
+        p50, p95 = np.percentile(recent, (50, 95)) if len(recent) else (0.0, 0.0)
+        return dict(count=self.count, total=self.total,
+                    mean=float(recent.mean()) if len(recent) else 0.0,
+                    p50=float(p50), p95=float(p95),
+                    max=float(recent.max(initial=0.0)))
+
+
+def record(name, dt):
+    ''' Add duration dt [s] to section name. '''
+    section = sections.get(name)
+    if section is None:
+        section = sections[name] = Section(name, settings.profile_window)
+    section.record(dt)
+
+
+class timed:
+    ''' Context manager that records the duration of a with block to
+        section name, when profiling is enabled. '''
+    __slots__ = ('name', 't0')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter() if enabled else None
+
+    def __exit__(self, *args):
+        if self.t0 is not None:
+            record(self.name, time.perf_counter() - self.t0)
+
+
+def enable(flag=True):
+    ''' Switch profiling on or off. '''
+    global enabled
+    enabled = flag
+
+
+def reset():
+    ''' Remove all profiling results. '''
+    sections.clear()
+
+
+def getdata():
+    ''' Statistics and histogram of each section. '''
+    return {name: dict(section.stats(), histogram=section.histogram().tolist())
+            for name, section in sections.items()}
+
+
+def report(data=None, nmax=30):
+    ''' Text table of the sections with the largest total duration. '''
+    data = getdata() if data is None else data
+    lines = [f'{"Section":<32} {"calls":>8} {"mean ms":>8} {"p95 ms":>8} {"total s":>8}']
+    for name, stats in sorted(data.items(), key=lambda item: -item[1]['total'])[:nmax]:
+        lines.append(f'{name[:32]:<32} {stats["count"]:>8d} {1e3 * stats["mean"]:>8.3f} '
+                     f'{1e3 * stats["p95"]:>8.3f} {stats["total"]:>8.3f}')
+    return '\n'.join(lines)
+
+
+def dump(fname=''):
+    ''' Write the profiling results to JSON file fname. Returns the file name. '''
+    if not fname:
+        timestamp = datetime.now().strftime('%Y%m%d_%H-%M-%S')
+        fname = f'{settings.log_path}/PROFILE_{bs.stack.get_scenname()}_{timestamp}.json'
+        os.makedirs(settings.log_path, exist_ok=True)
+    with open(fname, 'w') as f:
+        json.dump(dict(date=datetime.now().isoformat(), scenario=bs.stack.get_scenname(),
+                       binedges=binedges.tolist(), sections=getdata()), f, indent=1)
+    return fname
+
+
+def compare(fname, data=None):
+    ''' Text table comparing the mean durations of the sections in the
+        profile dump fname with the current results. '''
+    with open(fname) as f:
+        old = json.load(f)['sections']
+    data = getdata() if data is None else data
+    lines = [f'{"Section":<32} {"old ms":>8} {"new ms":>8} {"ratio":>6}']
+    for name in sorted(set(old) & set(data), key=lambda name: -data[name]['total']):
+        mold, mnew = old[name]['mean'], data[name]['mean']
+        ratio = f'{mnew / mold:>6.2f}' if mold > 0.0 else f'{"-":>6}'
+        lines.append(f'{name[:32]:<32} {1e3 * mold:>8.3f} {1e3 * mnew:>8.3f} {ratio}')
+    return '\n'.join(lines)
+
+
+def send():
+    ''' Send the statistics of all sections in the PROFILE stream. '''
+    bs.net.send_stream(b'PROFILE', {name: section.stats() for name, section in sections.items()})
+
+
+def setstream(flag):
+    ''' Start or stop periodically sending the PROFILE stream. '''
+    global streamtimer
+    if streamtimer is None:
+        streamtimer = walltime.Timer()
+        streamtimer.timeout.connect(send)
+    if flag:
+        streamtimer.start(int(1000 * settings.profile_streamdt))
+    else:
+        streamtimer.stop()
+
+
+def profilecmd(cmd='', arg=''):
+    ''' PROFILE [ON/OFF/RESET/DUMP/COMPARE/STREAM] [filename/ON/OFF]
+
+        Profile the wall-clock time of the parts of each simulation step.
+        Without arguments, the profiling results are shown. '''
+    if not cmd:
+        if not sections:
+            return True, 'Profiler is ' + ('on, no results yet' if enabled else
+                                           'off, use PROFILE ON to start')
+        return True, report()
+    if cmd in ('ON', 'OFF'):
+        enable(cmd == 'ON')
+        return True, f'Profiler is {cmd.lower()}'
+    if cmd == 'RESET':
+        reset()
+        return True, 'Profiling results cleared'
+    if cmd == 'DUMP':
+        return True, 'Profiling results written to ' + dump(arg)
+    if cmd == 'COMPARE':
+        if not arg:
+            return False, 'PROFILE COMPARE needs the file name of a profile dump'
+        try:
+            return True, compare(arg)
+        except (OSError, ValueError, KeyError) as e:
+            return False, f'Could not read profile dump {arg}: {e}'
+    if cmd == 'STREAM':
+        flag = arg.upper() != 'OFF'
+        setstream(flag)
+        return True, 'PROFILE stream ' + ('started' if flag else 'stopped')
+    return False, 'Unknown PROFILE command ' + cmd
@@ -1,10 +1,12 @@
 ''' Simulation clock with guaranteed decimal precision. '''
+import time
 import inspect
 from collections import OrderedDict
 from inspect import signature
 from types import SimpleNamespace
 from decimal import Decimal
 from bluesky import settings
+from bluesky.core import profiler
 
 
 # Register settings defaults
@@ -61,23 +63,34 @@ def step(recovery_time=0):
     return _clock.ft, _clock.fdt + float(recovery_time)
 
 
+def trigger(funs, hook):
+    ''' Trigger the timed functions in funs. When profiling, the functions
+        that are due are timed. '''
+    if not profiler.enabled:
+        for fun in funs.values():
+            fun.trigger()
+        return
+    for fun in funs.values():
+        if fun.timer is None or fun.timer.counter == 0:
+            t0 = time.perf_counter()
+            fun.trigger()
+            profiler.record(f'{hook}:{fun.name}', time.perf_counter() - t0)
+
+
 def preupdate():
     ''' Update function executed before traffic update.'''
-    for fun in preupdate_funs.values():
-        fun.trigger()
+    trigger(preupdate_funs, 'preupdate')
 
 
 def update():
     ''' Update function executed after traffic update.'''
-    for fun in update_funs.values():
-        fun.trigger()
+    trigger(update_funs, 'update')
 
 
 def reset():
     ''' Reset function executed when simulation is reset.'''
     # Call plugin reset for plugins that have one
-    for fun in reset_funs.values():
-        fun.trigger()
+    trigger(reset_funs, 'reset')
 
     # Reset the simulation clock.
     _clock.t = Decimal('0.0')
@@ -94,7 +107,7 @@ class Timer:
     def maketimer(cls, name, dt):
         ''' Create and return a new timer if none with the given name exists.
             Return existing timer if present. '''
-        return _timers.get(name.upper(), cls(name, dt))
+        return _timers.get(name.upper()) or cls(name, dt)
 
     def __init__(self, name, dt):
         self.name = name
@@ -6,10 +6,30 @@ try:
 except ImportError:
     # In python <3.3 collections.abc doesn't exist
     from collections import Collection
+from functools import lru_cache
+from itertools import compress
 import numpy as np
 
 defaults = {"float": 0.0, "int": 0, "uint":0, "bool": False, "S": "", "str": ""}
 
+# Minimum number of elements allocated for each traffic array buffer
+mincapacity = 64
+
+
+@lru_cache()
+def fillvalue(dtype):
+    ''' Returns the default value of new elements in an array of type dtype. '''
+    # Get type without byte length
+    vartype = ''.join(c for c in str(dtype) if c.isalpha())
+    return defaults.get(vartype, 0)
+
+
+def delmask(n, idx):
+    ''' Returns boolean mask of length n that is False for elements in idx. '''
+    keep = np.ones(n, dtype=bool)
+    keep[idx] = False
+    return keep
+
 
 class RegisterElementParameters:
     """ Class to use in 'with'-syntax. This class automatically
@@ -51,6 +71,10 @@ class TrafficArrays:
         self._children = []
         self._ArrVars  = []
         self._LstVars  = []
+        # Preallocated buffers with spare capacity for the registered numpy
+        # arrays, stored as (buffer, view) tuples, where view is the array
+        # attribute as it was last handed out by create/delete.
+        self._ArrBufs  = dict()
 
     def reparent(self, newparent):
         ''' Give TrafficArrays object a new parent. '''
@@ -87,9 +111,22 @@ class TrafficArrays:
             lst.extend([defaults.get(vartype)] * n)
 
         for v in self._ArrVars:  # Numpy array
-            # Get type without byte length
-            vartype = ''.join(c for c in str(self.__dict__[v].dtype) if c.isalpha())
-            self.__dict__[v] = np.append(self.__dict__[v], [defaults.get(vartype, 0)] * n)
+            arr = self.__dict__[v]
+            nold = len(arr)
+            buf, view = self._ArrBufs.get(v, (None, None))
+            # Allocate a new buffer when the array doesn't have one yet, when
+            # it was replaced by another array since the last create/delete,
+            # or when its buffer is full. Capacity is doubled each time to
+            # get amortized constant time aircraft creation.
+            if arr is not view or nold + n > len(buf):
+                # Arrays can have more than one dimension: the first
+                # dimension is the aircraft dimension
+                buf = np.empty((max(mincapacity, 2 * (nold + n)),) + arr.shape[1:],
+                               dtype=arr.dtype)
+                buf[:nold] = arr
+            buf[nold:nold + n] = fillvalue(arr.dtype)
+            self.__dict__[v] = view = buf[:nold + n]
+            self._ArrBufs[v] = (buf, view)
 
     def istrafarray(self, name):
         ''' Returns true if parameter 'name' is a traffic array. '''
@@ -107,14 +144,37 @@ class TrafficArrays:
         for child in self._children:
             child.delete(idx)
 
+        # All arrays are compacted with the same mask (or, for a single
+        # aircraft, the same slices). The remaining elements are copied to a
+        # new buffer of the same capacity, so that any other references to
+        # the old arrays are left intact, as with np.delete.
+        keep = None
         for v in self._ArrVars:
-            self.__dict__[v] = np.delete(self.__dict__[v], idx)
+            arr = self.__dict__[v]
+            if keep is None or len(keep) != len(arr):
+                keep = delmask(len(arr), idx)
+                nnew = np.count_nonzero(keep)
+                single = not isinstance(idx, Collection) and nnew < len(arr)
+                if single:
+                    i = idx % len(arr)
+            buf, _ = self._ArrBufs.get(v, (arr, None))
+            buf = np.empty((max(nnew, len(buf)),) + arr.shape[1:], dtype=arr.dtype)
+            if single:
+                buf[:i] = arr[:i]
+                buf[i:nnew] = arr[i + 1:]
+            else:
+                arr.compress(keep, axis=0, out=buf[:nnew])
+            self.__dict__[v] = view = buf[:nnew]
+            self._ArrBufs[v] = (buf, view)
 
         if self._LstVars:
             if isinstance(idx, Collection):
-                for i in reversed(idx):
-                    for v in self._LstVars:
-                        del self.__dict__[v][i]
+                keep = None
+                for v in self._LstVars:
+                    lst = self.__dict__[v]
+                    if keep is None or len(keep) != len(lst):
+                        keep = delmask(len(lst), idx).tolist()
+                    lst[:] = compress(lst, keep)
             else:
                 for v in self._LstVars:
                     del self.__dict__[v][idx]
@@ -125,7 +185,9 @@ class TrafficArrays:
             child.reset()
 
         for v in self._ArrVars:
-            self.__dict__[v] = np.array([], dtype=self.__dict__[v].dtype)
+            arr = self.__dict__[v]
+            self.__dict__[v] = np.empty((0,) + arr.shape[1:], dtype=arr.dtype)
+        self._ArrBufs.clear()
 
         for v in self._LstVars:
             self.__dict__[v] = []
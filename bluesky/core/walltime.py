@@ -1,31 +1,45 @@
 """ BlueSky implementation of a timer that can periodically trigger functions."""
 import time
 from bluesky.core.signal import Signal
+from bluesky.core import profiler
 
 
 class Timer:
-    """ A timer can be used to periodically (wall-time) trigger functions."""
+    """ A timer can be used to periodically (wall-time) trigger functions.
+        Named timers are timed by the profiler. """
 
     # Data that the wall clock needs to keep
     timers = []
 
-    def __init__(self):
+    def __init__(self, name=''):
         super().__init__()
+        self.name     = name
         self.timeout  = Signal()
         self.interval = 0.0
         self.t_next   = 0.0
 
     def start(self, interval):
         ''' Start this timer. '''
-        Timer.timers.append(self)
+        if self not in Timer.timers:
+            Timer.timers.append(self)
         self.interval = float(interval) * 1e-3
         self.t_next   = time.time() + self.interval
 
+    def stop(self):
+        ''' Stop this timer. '''
+        if self in Timer.timers:
+            Timer.timers.remove(self)
+
     @classmethod
     def update_timers(cls):
         ''' Update all timers. '''
         tcur = time.time()
         for timer in cls.timers:
             if tcur >= timer.t_next:
-                timer.timeout.emit()
+                if profiler.enabled and timer.name:
+                    t0 = time.perf_counter()
+                    timer.timeout.emit()
+                    profiler.record('walltime:' + timer.name, time.perf_counter() - t0)
+                else:
+                    timer.timeout.emit()
                 timer.t_next += timer.interval
@@ -1,42 +1,250 @@
-''' Loader functions for navigation data. '''
+''' Loader functions for navigation data.
+
+    The navigation data is cached in a directory with a .npy file per data
+    column. Numeric columns are opened as read-only memory-mapped arrays, and
+    string columns are stored as a byte buffer with an offset table and a
+    sorted order for lookups (see StringColumn). This way the cache is loaded
+    without parsing, and all simulation nodes on a host share the same pages
+    of the navigation data.
+'''
+import os
+import json
 import pickle
+import shutil
+from collections.abc import Sequence
+import numpy as np
 
 from bluesky import settings
-from bluesky.tools import cachefile
 from .loadnavdata_txt import loadnavdata_txt, loadthresholds_txt
 
 
 # Cache versions: increment these to the current date if the source data is updated
 # or other reasons why the cache needs to be updated
-navdb_version = 'v20170101'
+navdb_version = 'v20240601'
 
 ## Default settings
 settings.set_variable_defaults(navdata_path='data/navdata')
 
 sourcedir = settings.navdata_path
 
+# Data groups in the navdata cache
+groups = ('wpt', 'apt', 'awy', 'fir', 'co', 'rwy')
+
+
+class StringColumn(Sequence):
+    ''' Column of strings, stored in three arrays (normally memory-mapped from
+        the navdata cache): a buffer with all utf-8 encoded strings, the
+        offsets of each string in this buffer, and the indices of the strings
+        in sorted order. The sorted order is used to look up strings with a
+        binary search, which makes 'in', index(), and count() fast.
+
+        Strings appended to a loaded column are kept in a list, with a
+        dictionary of their positions in this list. '''
+    def __init__(self, data, offset, order):
+        self.data = data
+        self.offset = offset
+        self.order = order
+        self.nstored = len(offset) - 1
+        self.appended = list()
+        self.appendidx = dict()
+
+    @classmethod
+    def load(cls, path, name):
+        ''' Open column name in directory path. '''
+        return cls(*(np.load(os.path.join(path, f'{name}_{part}.npy'), mmap_mode='r')
+                     for part in ('data', 'offset', 'order')))
+
+    @staticmethod
+    def save(path, name, strings):
+        ''' Store a list of strings as column name in directory path. '''
+        encoded = [s.encode('utf-8') for s in strings]
+        offset = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offset[1:] = np.cumsum([len(s) for s in encoded])
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        # Sort the byte strings: utf-8 byte order is equal to string order
+        order = np.array(sorted(range(len(encoded)), key=encoded.__getitem__),
+                         dtype=np.int64)
+        for part, arr in (('data', data), ('offset', offset), ('order', order)):
+            np.save(os.path.join(path, f'{name}_{part}.npy'), arr)
+
+    def _get(self, i):
+        return bytes(self.data[self.offset[i]:self.offset[i + 1]]).decode('utf-8')
+
+    def _find(self, value):
+        ''' Return the range in the sorted order with strings equal to value. '''
+        key = value.encode('utf-8')
+        lo, hi = 0, self.nstored
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = self.order[mid]
+            if bytes(self.data[self.offset[i]:self.offset[i + 1]]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        end = lo
+        while end < self.nstored and self._get(self.order[end]) == value:
+            end += 1
+        return lo, end
+
+    def indices(self, value):
+        ''' Return the indices of all occurrences of value, in ascending order. '''
+        if not isinstance(value, str):
+            return []
+        lo, hi = self._find(value)
+        # The sort is stable, so equal strings are in ascending index order
+        return [int(i) for i in self.order[lo:hi]] + \
+            [self.nstored + i for i in self.appendidx.get(value, [])]
+
+    def __len__(self):
+        return self.nstored + len(self.appended)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i >= self.nstored:
+            return self.appended[i - self.nstored]
+        if i < 0:
+            raise IndexError('StringColumn index out of range')
+        return self._get(i)
+
+    def __iter__(self):
+        data = bytes(self.data)
+        offset = self.offset.tolist()
+        for i0, i1 in zip(offset[:-1], offset[1:]):
+            yield data[i0:i1].decode('utf-8')
+        yield from self.appended
+
+    def __contains__(self, value):
+        return bool(self.indices(value))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def index(self, value, start=0, stop=None):
+        stop = len(self) if stop is None else stop
+        for i in self.indices(value):
+            if start <= i < stop:
+                return i
+        raise ValueError(f'{value} is not in list')
 
-def load_navdata():
-    ''' Load navigation database. '''
-    with cachefile.openfile('navdata.p', navdb_version) as cache:
+    def count(self, value):
+        return len(self.indices(value))
+
+    def append(self, value):
+        self.appendidx.setdefault(value, []).append(len(self.appended))
+        self.appended.append(value)
+
+
+def cachedir():
+    ''' Return the path of the navdata cache directory. '''
+    return os.path.join(settings.cache_path, 'navdata')
+
+
+def save_navdata(path):
+    ''' Parse the navigation data source files, and store them as a navdata
+        cache in directory path. '''
+    wptdata, aptdata, awydata, firdata, codata = loadnavdata_txt()
+    rwythresholds = loadthresholds_txt()
+
+    # Store FIR polygons as flat coordinate arrays with an offset per FIR
+    fir = firdata.pop('fir')
+    firdata['firname'] = [f[0] for f in fir]
+    firdata['firoffset'] = np.cumsum([0] + [len(f[1]) for f in fir])
+    firdata['firlat'] = np.concatenate([[]] + [f[1] for f in fir])
+    firdata['firlon'] = np.concatenate([[]] + [f[2] for f in fir])
+
+    # Write to a temporary directory first, to avoid that other nodes on
+    # this host load a partially written cache
+    tmppath = f'{path}.{os.getpid()}'
+    os.makedirs(tmppath, exist_ok=True)
+    index = dict(version=navdb_version, groups=dict())
+    for group, data in zip(groups, (wptdata, aptdata, awydata, firdata, codata)):
+        index['groups'][group] = columns = dict()
+        for name, values in data.items():
+            if len(values) and isinstance(values[0], str):
+                StringColumn.save(tmppath, name, values)
+                columns[name] = 'str'
+            else:
+                np.save(os.path.join(tmppath, name + '.npy'),
+                        np.asarray(values, dtype=float if len(values) and
+                                   isinstance(values[0], float) else None))
+                columns[name] = 'arr'
+    with open(os.path.join(tmppath, 'rwythresholds.p'), 'wb') as f:
+        pickle.dump(rwythresholds, f, pickle.HIGHEST_PROTOCOL)
+    with open(os.path.join(tmppath, 'index.json'), 'w') as f:
+        json.dump(index, f)
+
+    # Keep a valid cache that another node stored in the meantime: other
+    # nodes may already be using it. An outdated cache is moved aside first,
+    # so that it is never partially removed while it is replaced.
+    if cacheversion(path) == navdb_version:
+        shutil.rmtree(tmppath, ignore_errors=True)
+        return
+    oldpath = f'{path}.old.{os.getpid()}'
+    try:
+        os.replace(path, oldpath)
+    except OSError:
+        pass
+    try:
+        os.replace(tmppath, path)
+    except OSError:
+        # Another node was first to store the cache
+        shutil.rmtree(tmppath, ignore_errors=True)
+    shutil.rmtree(oldpath, ignore_errors=True)
+
+
+def cacheversion(path):
+    ''' Return the version of the navdata cache in directory path, or None
+        when there is no readable cache. '''
+    try:
+        with open(os.path.join(path, 'index.json')) as f:
+            return json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def open_navdata():
+    ''' Return the path and index of the navdata cache, and create the cache
+        if it doesn't exist yet or is out of date. '''
+    path = cachedir()
+    for _ in range(2):
         try:
-            wptdata       = cache.load()
-            awydata       = cache.load()
-            aptdata       = cache.load()
-            firdata       = cache.load()
-            codata        = cache.load()
-            rwythresholds = cache.load()
-        except (pickle.PickleError, cachefile.CacheError) as e:
-            print(e.args[0])
-
-            wptdata, aptdata, awydata, firdata, codata = loadnavdata_txt()
-            rwythresholds = loadthresholds_txt()
-
-            cache.dump(wptdata)
-            cache.dump(awydata)
-            cache.dump(aptdata)
-            cache.dump(firdata)
-            cache.dump(codata)
-            cache.dump(rwythresholds)
-
-    return wptdata, aptdata, awydata, firdata, codata, rwythresholds
\ No newline at end of file
+            with open(os.path.join(path, 'index.json')) as f:
+                index = json.load(f)
+            if index['version'] == navdb_version:
+                return path, index
+            print('Cache out of date: ' + path)
+        except (OSError, ValueError, KeyError):
+            print('Cache not found: ' + path)
+        print('Writing cache: ' + path)
+        save_navdata(path)
+    raise RuntimeError('Could not create navdata cache ' + path)
+
+
+def load_navdata(*names):
+    ''' Load navigation database groups (default: all groups) from the
+        navdata cache. Returns a data dictionary for each group. '''
+    path, index = open_navdata()
+    data = list()
+    for group in (names or groups):
+        if group == 'rwy':
+            with open(os.path.join(path, 'rwythresholds.p'), 'rb') as f:
+                data.append(pickle.load(f))
+            continue
+        columns = dict()
+        for name, kind in index['groups'][group].items():
+            if kind == 'str':
+                columns[name] = StringColumn.load(path, name)
+            else:
+                columns[name] = np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+        if group == 'fir':
+            # Original FIR structure: list of [name, lats, lons]
+            offset = columns.pop('firoffset')
+            lat, lon = columns.pop('firlat'), columns.pop('firlon')
+            columns['fir'] = [[name, lat[i0:i1].tolist(), lon[i0:i1].tolist()]
+                              for name, i0, i1 in zip(columns.pop('firname'),
+                                                      offset[:-1], offset[1:])]
+        data.append(columns)
+    return data
@@ -1,12 +1,19 @@
 from math import *
+import os
 import numpy as np
 
-from .loadnavdata import load_navdata
+from .loadnavdata import load_navdata, cachedir
+from .spatialindex import SpatialIndex
+from bluesky import settings
 from bluesky.tools import geo
 from bluesky.tools.aero import nm
 from bluesky.tools.misc import findall
 import bluesky as bs
 
+# Default settings
+settings.set_variable_defaults(navdata_spatialindex=True)
+
+
 class Navdatabase:
     """
     Navdatabase class definition : command stack & processing class
@@ -39,7 +46,7 @@ class Navdatabase:
 
     def reset(self):
         print("Loading global navigation database...")
-        wptdata, aptdata, awydata, firdata, codata, rwythresholds = load_navdata()
+        wptdata, aptdata = load_navdata('wpt', 'apt')
 
         # Get waypoint data
         self.wpid     = wptdata['wpid']       # identifier (string)
@@ -73,20 +80,43 @@ class Navdatabase:
         self.aptco     = aptdata['apco']      # two char country code (string)
         self.aptelev   = aptdata['apelev']    # field elevation in meters [m] above mean sea level
 
-        # Get FIR data
-        self.fir      = firdata['fir']        # fir name
-        self.firlat0  = firdata['firlat0']    # start lat of a line of border
-        self.firlon0  = firdata['firlon0']    # start lon of a line of border
-        self.firlat1  = firdata['firlat1']    # end lat of a line of border
-        self.firlon1  = firdata['firlon1']    # end lon of a line of border
-
-        # Get country code data
-        self.coname   = codata['coname']      # country full name
-        self.cocode2  = codata['cocode2']     # country code A2 (asscii2) 2 chars
-        self.cocode3  = codata['cocode3']     # country code A3 (asscii2) 3 chars
-        self.conr     = codata['conr']        # country icao number
-
-        self.rwythresholds = rwythresholds
+        # Spatial indices of waypoints and airports, created on first use
+        self._wptree   = None
+        self._apttree  = None
+        self.nwpcache  = len(self.wplat)  # Number of waypoints in cache
+
+        # Airway, FIR, country code, and runway threshold data are loaded on
+        # first use (see __getattr__)
+        for name in self.lazydata:
+            self.__dict__.pop(name, None)
+
+    # Attributes that are loaded on first access, with their data group and key
+    lazydata = dict(
+        awid=('awy', 'awid'),             # airway identifier
+        awfromwpid=('awy', 'awfromwpid'), # identifier of start of leg
+        awtowpid=('awy', 'awtowpid'),     # identifier of end of leg
+        fir=('fir', 'fir'),           # fir name
+        firlat0=('fir', 'firlat0'),   # start lat of a line of border
+        firlon0=('fir', 'firlon0'),   # start lon of a line of border
+        firlat1=('fir', 'firlat1'),   # end lat of a line of border
+        firlon1=('fir', 'firlon1'),   # end lon of a line of border
+        coname=('co', 'coname'),      # country full name
+        cocode2=('co', 'cocode2'),    # country code A2 (asscii2) 2 chars
+        cocode3=('co', 'cocode3'),    # country code A3 (asscii2) 3 chars
+        conr=('co', 'conr'),          # country icao number
+        rwythresholds=('rwy', None)
+    )
+
+    def __getattr__(self, name):
+        ''' Load airway, FIR, country code, and runway threshold data on first access. '''
+        if name not in Navdatabase.lazydata:
+            raise AttributeError(f"'Navdatabase' object has no attribute '{name}'")
+        group = Navdatabase.lazydata[name][0]
+        data = load_navdata(group)[0]
+        for attr, (grp, key) in Navdatabase.lazydata.items():
+            if grp == group:
+                setattr(self, attr, data if key is None else data.get(key, []))
+        return getattr(self, name)
 
     def defwpt(self,name=None,lat=None,lon=None,wptype=None):
 
@@ -99,7 +129,7 @@ class Navdatabase:
         # No data: give info on waypoint
         elif lat==None or lon==None:
             reflat, reflon = bs.scr.getviewctr()
-            if self.wpid.count(name.upper()) > 0:
+            if name.upper() in self.wpid:
                 i = self.getwpidx(name.upper(),reflat,reflon)
                 txt = self.wpid[i]+" : "+str(self.wplat[i])+","+str(self.wplon[i])
                 if len(self.wptype[i]+self.wpco[i])>0:
@@ -112,6 +142,7 @@ class Navdatabase:
 
         # Still here? So there is data, then we add this waypoint
         self.wpid.append(name.upper())
+        self._wptree = None
         self.wplat = np.append(self.wplat,lat)
         self.wplon = np.append(self.wplon,lon)
 
@@ -120,9 +151,9 @@ class Navdatabase:
         else:
             self.wptype.append(wptype)
 
-        self.wpelev.append(0.0)               # elevation [m]
-        self.wpvar.append(0.0)                # magn variation [deg]
-        self.wpfreq.append(0.0)               # frequency [kHz/MHz]
+        self.wpelev = np.append(self.wpelev, 0.0) # elevation [m]
+        self.wpvar = np.append(self.wpvar, 0.0)   # magn variation [deg]
+        self.wpfreq = np.append(self.wpfreq, 0.0) # frequency [kHz/MHz]
         self.wpdesc.append("Custom waypoint") # description
 
          # Update screen info
@@ -132,84 +163,76 @@ class Navdatabase:
 
     def getwpidx(self, txt, reflat=999999., reflon=999999):
         """Get waypoint index to access data"""
-        name = txt.upper()
-        try:
-            i = self.wpid.index(name)
-        except:
+        idx = np.array(self.wpid.indices(txt.upper()), dtype=int)
+        if len(idx) == 0:
             return -1
 
-        # if no pos is specified, get first occurence
-        if not reflat < 99999.:
-            return i
+        # if no pos is specified, or there are no duplicates, get first occurence
+        if len(idx) == 1 or not reflat < 99999.:
+            return int(idx[0])
 
-        # If pos is specified check for more and return closest
-        else:
-            idx = []
-            idx.append(i)
-            found = True
-            while i < len(self.wpid) - 1 and found:
-                try:
-                    i = self.wpid.index(name, i + 1)
-                    idx.append(i)
-                except:
-                    found = False
-            if len(idx) == 1:
-                return idx[0]
-            else:
-                imin = idx[0]
-                dmin = geo.kwikdist(reflat, reflon, self.wplat[imin], self.wplon[imin])
-                for i in idx[1:]:
-                    d = geo.kwikdist(reflat, reflon, self.wplat[i], self.wplon[i])
-                    if d < dmin:
-                        imin = i
-                        dmin = d
-                return imin
+        # If pos is specified return closest
+        return int(idx[self.nearest(idx, reflat, reflon)])
 
     def getwpindices(self, txt, reflat=999999., reflon=999999,crit=1852.0):
         """Get waypoint index to access data"""
-        name = txt.upper()
-        try:
-            i = self.wpid.index(name)
-        except:
+        idx = np.array(self.wpid.indices(txt.upper()), dtype=int)
+        if len(idx) == 0:
             return [-1]
 
-        # if no pos is specified, get first occurence
-        if not reflat < 99999.:
-            return [i]
-
-        # If pos is specified check for more and return closest
-        else:
-            idx = findall(self.wpid,name) # find indices of al occurences
-
-            if len(idx) == 1:
-                return [idx[0]]
-            else:
-                imin = idx[0]
-                dmin = geo.kwikdist(reflat, reflon, self.wplat[imin], self.wplon[imin])
-                for i in idx[1:]:
-                    d = geo.kwikdist(reflat, reflon, self.wplat[i], self.wplon[i])
-                    if d < dmin:
-                        imin = i
-                        dmin = d
-                # Find co-located
-                indices = [imin]
-                for i in idx:
-                    if i!=imin:
-                        dist = nm*geo.kwikdist(self.wplat[i], self.wplon[i], \
-                                            self.wplat[imin], self.wplon[imin])
-                        if dist<=crit:
-                            indices.append(i)
-
-                return indices
-
-    def getaptidx(self, txt):
-        """Get waypoint index to access data"""
-        try:
-            return self.aptid.index(txt.upper())
-        except:
+        # if no pos is specified, or there are no duplicates, get first occurence
+        if len(idx) == 1 or not reflat < 99999.:
+            return [int(idx[0])]
+
+        # If pos is specified return closest, followed by co-located
+        # waypoints with the same name
+        imin = idx[self.nearest(idx, reflat, reflon)]
+        dist = nm * geo.kwikdist(self.wplat[imin], self.wplon[imin],
+                                 self.wplat[idx], self.wplon[idx])
+        return [int(imin)] + [int(i) for i in idx[(dist <= crit) & (idx != imin)]]
+
+    def nearest(self, idx, reflat, reflon):
+        """Get the position in waypoint index array idx of the waypoint
+           closest to reflat, reflon"""
+        return np.argmin(geo.kwikdist(reflat, reflon, self.wplat[idx], self.wplon[idx]))
+
+    def getaptidx(self, txt, reflat=999999., reflon=999999.):
+        """Get airport index to access data"""
+        idx = np.array(self.aptid.indices(txt.upper()), dtype=int)
+        if len(idx) == 0:
             return -1
-
-    def getinear(self, wlat, wlon, lat, lon):  # lat,lon in degrees
+        if len(idx) == 1 or not reflat < 99999.:
+            return int(idx[0])
+        d = geo.kwikdist(reflat, reflon, self.aptlat[idx], self.aptlon[idx])
+        return int(idx[np.argmin(d)])
+
+    @property
+    def wptree(self):
+        """Spatial index of the waypoints, or None if disabled"""
+        if self._wptree is None and settings.navdata_spatialindex:
+            self._wptree = self.spatialindex('wpt', self.wplat, self.wplon,
+                                             len(self.wplat) == self.nwpcache)
+        return self._wptree
+
+    @property
+    def apttree(self):
+        """Spatial index of the airports, or None if disabled"""
+        if self._apttree is None and settings.navdata_spatialindex:
+            self._apttree = self.spatialindex('apt', self.aptlat, self.aptlon)
+        return self._apttree
+
+    @staticmethod
+    def spatialindex(name, lat, lon, cached=True):
+        """Load spatial index from the navdata cache, or create it"""
+        if cached:
+            return SpatialIndex.load(os.path.join(cachedir(), name + '_index.p'), lat, lon)
+        return SpatialIndex(lat, lon)
+
+    def getinear(self, wlat, wlon, lat, lon, tree=None):  # lat,lon in degrees
+        """Get index of position in wlat, wlon closest to lat, lon. With a
+           spatial index, lat and lon can also be arrays"""
+        if tree is not None:
+            return tree.nearest(lat, lon)
         # t0 = time.clock()
         f = cos(radians(lat))
         dlat = (wlat - lat + 180.) % 360. - 180.
@@ -222,14 +245,33 @@ class Navdatabase:
 
     def getwpinear(self, lat, lon):  # lat,lon in degrees
         """Get closest waypoint index"""
-        return self.getinear(self.wplat, self.wplon, lat, lon)
+        return self.getinear(self.wplat, self.wplon, lat, lon, self.wptree)
 
     def getapinear(self, lat, lon):  # lat,lon in degrees
         """Get closest airport index"""
-        return self.getinear(self.aptlat, self.aptlon, lat, lon)
-
-    def getinside(self, wlat, wlon, lat0, lat1, lon0, lon1):
-        """Get indices inside given box"""
+        return self.getinear(self.aptlat, self.aptlon, lat, lon, self.apttree)
+
+    def getwpknear(self, lat, lon, k):
+        """Get indices of the k closest waypoints, sorted by distance"""
+        tree = self.wptree
+        if tree is None:
+            tree = SpatialIndex(self.wplat, self.wplon)
+        return tree.nearest(lat, lon, k)
+
+    def getapknear(self, lat, lon, k):
+        """Get indices of the k closest airports, sorted by distance"""
+        tree = self.apttree
+        if tree is None:
+            tree = SpatialIndex(self.aptlat, self.aptlon)
+        return tree.nearest(lat, lon, k)
+
+    def getinside(self, wlat, wlon, lat0, lat1, lon0, lon1, tree=None):
+        """Get indices inside given box. With a spatial index, the box
+           coordinates can also be arrays, and a list of index arrays
+           is returned"""
+        if tree is not None and (np.ndim(lat0) > 0 or lat0 < lat1):
+            idx = tree.inside(lat0, lat1, lon0, lon1)
+            return idx if np.ndim(lat0) > 0 else list(idx)
         # t0 = time.clock()
         if lat0 < lat1:
             arr = np.where((wlat > lat0) * (wlat < lat1) * (wlon > lon0) * (wlon < lon1))
@@ -242,11 +284,11 @@ class Navdatabase:
 
     def getwpinside(self, lat0, lat1, lon0, lon1):
         """Get waypoint indices inside box"""
-        return self.getinside(self.wplat, self.wplon, lat0, lat1, lon0, lon1)
+        return self.getinside(self.wplat, self.wplon, lat0, lat1, lon0, lon1, self.wptree)
 
     def getapinside(self, lat0, lat1, lon0, lon1):
         """Get airport indicex inside box"""
-        return self.getinside(self.aptlat, self.aptlon, lat0, lat1, lon0, lon1)
+        return self.getinside(self.aptlat, self.aptlon, lat0, lat1, lon0, lon1, self.apttree)
 
     # returns all runways of given airport
     def listairway(self, airwayid):
@@ -255,7 +297,8 @@ class Navdatabase:
         airway = []     # identifier of waypoint   0 .. N-1
 
         # Does this airway exist?
-        if self.awid.count(awkey)>0:
+        idx = self.awid.indices(awkey) if len(self.awid) else []
+        if idx:
             # Collect leg indices
             i = 0
             found = True
@@ -263,7 +306,6 @@ class Navdatabase:
             left  = []  # wps in left column in file
             right = []  # wps in right coumn in file
 
-            idx = findall(self.awid,awkey)
             for i in idx:
                 newleg = self.awfromwpid[i]+"-"+self.awtowpid[i]
                 if newleg not in legs:
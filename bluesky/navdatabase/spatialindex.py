@@ -0,0 +1,86 @@
+''' Spatial index of navigation data positions, for nearest and in-box
+    queries without scanning all positions. '''
+import os
+import pickle
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def xyz(lat, lon):
+    ''' Convert lat/lon [deg] to cartesian coordinates on the unit sphere. '''
+    latrad = np.radians(lat)
+    lonrad = np.radians(lon)
+    coslat = np.cos(latrad)
+    return np.column_stack((coslat * np.cos(lonrad), coslat * np.sin(lonrad),
+                            np.sin(latrad)))
+
+
+class SpatialIndex:
+    ''' Spatial index of a set of lat/lon positions. Nearest queries use a
+        KD-tree of the 3D positions on the unit sphere, which is independent
+        of dateline crossings and convergence of meridians. Bounding box
+        queries use the positions sorted by latitude: a binary search gives
+        the positions in the latitude band of the box, which are then
+        selected on longitude.
+
+        All queries accept a single position or box, or arrays of them. '''
+    # Increment when the stored index structure changes
+    version = 1
+
+    def __init__(self, lat, lon):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.sphere = cKDTree(xyz(self.lat, self.lon))
+        self.latorder = np.argsort(self.lat, kind='stable')
+        self.latsorted = self.lat[self.latorder]
+
+    def __len__(self):
+        return len(self.lat)
+
+    @classmethod
+    def load(cls, fname, lat, lon):
+        ''' Load the index of positions lat, lon from file fname, or build it
+            and store it in fname when the file doesn't exist or doesn't
+            match the positions. '''
+        try:
+            with open(fname, 'rb') as f:
+                version, index = pickle.load(f)
+            if version == cls.version and \
+                    np.array_equal(index.lat, lat) and np.array_equal(index.lon, lon):
+                return index
+        except (OSError, pickle.PickleError, EOFError, AttributeError, ValueError, TypeError):
+            pass
+        index = cls(lat, lon)
+        try:
+            tmpname = f'{fname}.{os.getpid()}'
+            with open(tmpname, 'wb') as f:
+                pickle.dump((cls.version, index), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpname, fname)
+        except OSError:
+            pass
+        return index
+
+    def nearest(self, lat, lon, k=1):
+        ''' Index of the nearest position to lat, lon, or with k > 1, indices
+            of the k nearest positions sorted by distance. For arrays lat, lon
+            an array of indices is returned, with shape (n, k) when k > 1. '''
+        k = min(k, len(self))
+        if not k:
+            return -1 if np.ndim(lat) == 0 else np.full(np.shape(lat), -1)
+        _, idx = self.sphere.query(xyz(np.ravel(lat), np.ravel(lon)), k=k)
+        return idx[0] if np.ndim(lat) == 0 else idx
+
+    def inside(self, lat0, lat1, lon0, lon1):
+        ''' Indices of the positions inside the box with latitudes between
+            lat0 and lat1, and longitudes between lon0 and lon1. For arrays of
+            box coordinates a list with an index array per box is returned. '''
+        bulk = np.ndim(lat0) > 0
+        lat0, lat1, lon0, lon1 = (np.atleast_1d(v) for v in (lat0, lat1, lon0, lon1))
+        i0 = np.searchsorted(self.latsorted, lat0, side='right')
+        i1 = np.searchsorted(self.latsorted, lat1, side='left')
+        result = list()
+        for i in range(len(i0)):
+            band = self.latorder[i0[i]:i1[i]]
+            lon = self.lon[band]
+            result.append(np.sort(band[(lon > lon0[i]) & (lon < lon1[i])]))
+        return result if bulk else result[0]
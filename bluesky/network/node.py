@@ -4,8 +4,14 @@ import zmq
 import msgpack
 import bluesky as bs
 from bluesky import stack
+from bluesky.core import profiler
 from bluesky.core.walltime import Timer
-from bluesky.network.npcodec import encode_ndarray, decode_ndarray
+from bluesky.network.npcodec import encode_ndarray, decode_ndarray, packb_frames
+
+
+# Send array data in streams as separate zero-copy message frames.
+# Note that clients from before this option was introduced can't decode these.
+bs.settings.set_variable_defaults(stream_zerocopy=False)
 
 
 class Node:
@@ -73,9 +79,14 @@ class Node:
 
     def send_event(self, eventname, data=None, target=None):
         # On the sim side, target is obtained from the currently-parsed stack command
-        target = target or stack.routetosender() or [b'*']
-        pydata = msgpack.packb(data, default=encode_ndarray, use_bin_type=True)
-        self.event_io.send_multipart(target + [eventname, pydata])
+        with profiler.timed('event:' + eventname.decode()):
+            target = target or stack.routetosender() or [b'*']
+            pydata = msgpack.packb(data, default=encode_ndarray, use_bin_type=True)
+            self.event_io.send_multipart(target + [eventname, pydata])
 
     def send_stream(self, name, data):
-        self.stream_out.send_multipart([name + self.node_id, msgpack.packb(data, default=encode_ndarray, use_bin_type=True)])
+        with profiler.timed('stream:' + name.decode()):
+            if bs.settings.stream_zerocopy:
+                self.stream_out.send_multipart([name + self.node_id] + packb_frames(data), copy=False)
+            else:
+                self.stream_out.send_multipart([name + self.node_id, msgpack.packb(data, default=encode_ndarray, use_bin_type=True)])
@@ -3,6 +3,7 @@ from threading import Thread
 import zmq
 import msgpack
 from bluesky import stack
+from bluesky.core import profiler
 from bluesky.core.walltime import Timer
 from bluesky.network.npcodec import encode_ndarray, decode_ndarray
 
@@ -119,7 +120,9 @@ class Node:
 
     def send_event(self, name, data=None, target=None):
         # On the sim side, target is obtained from the currently-parsed stack command
-        self.event_io.send_multipart([stack.sender() or b'*', name, msgpack.packb(data, default=encode_ndarray, use_bin_type=True)])
+        with profiler.timed('event:' + name.decode()):
+            self.event_io.send_multipart([stack.sender() or b'*', name, msgpack.packb(data, default=encode_ndarray, use_bin_type=True)])
 
     def send_stream(self, name, data):
-        self.stream_out.send_multipart([name + self.node_id, msgpack.packb(data, default=encode_ndarray, use_bin_type=True)])
+        with profiler.timed('stream:' + name.decode()):
+            self.stream_out.send_multipart([name + self.node_id, msgpack.packb(data, default=encode_ndarray, use_bin_type=True)])
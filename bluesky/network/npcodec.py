@@ -1,16 +1,81 @@
+''' Msgpack encoding and decoding of numpy arrays.
+
+    Arrays are by default encoded in a dict format that is understood by all
+    BlueSky clients. Array data is passed to msgpack as a memoryview, and
+    decoded arrays are (read-only) views on the unpacked data, so no copies
+    are made besides the ones done by msgpack itself.
+
+    For streams, array data can also be sent in separate zmq message frames
+    (see packb_frames and unpackb_frames). In the packed message each array
+    is then replaced by a small msgpack extension object that refers to its
+    data frame.
+'''
+import msgpack
 import numpy as np
 
+# Msgpack extension type code of an array with data in a separate frame
+EXT_NDARRAY_FRAME = 42
+
+
+def arraydata(o):
+    ''' Byte view on the data of C-contiguous array o. Empty arrays can't
+        be cast to a byte view when they are multi-dimensional. '''
+    return memoryview(o).cast('B') if o.size else b''
+
+
 def encode_ndarray(o):
     '''Msgpack encoder for numpy arrays.'''
     if isinstance(o, np.ndarray):
         return {b'numpy': True,
                 b'type': o.dtype.str,
                 b'shape': o.shape,
-                b'data': o.tobytes()}
+                b'data': arraydata(np.ascontiguousarray(o))}
     return o
 
+
 def decode_ndarray(o):
     '''Msgpack decoder for numpy arrays.'''
     if o.get(b'numpy'):
-        return np.fromstring(o[b'data'], dtype=np.dtype(o[b'type'])).reshape(o[b'shape'])
+        return np.frombuffer(o[b'data'], dtype=np.dtype(o[b'type'])).reshape(o[b'shape'])
     return o
+
+
+def packb_frames(data):
+    ''' Pack data with msgpack, and put the data of numpy arrays in separate
+        frames.
+
+        Returns a list of message frames: the packed data, followed by one
+        buffer per array. These frames can be sent with
+        send_multipart(frames, copy=False). Writeable arrays are copied once,
+        because the simulation can modify them in-place while zmq is still
+        sending their data from its I/O thread. '''
+    frames = []
+
+    def encode(o):
+        if isinstance(o, np.ndarray) and not o.dtype.hasobject:
+            if o.flags.writeable or not o.flags.c_contiguous:
+                o = np.array(o, order='C')
+            frames.append(arraydata(o))
+            return msgpack.ExtType(EXT_NDARRAY_FRAME,
+                msgpack.packb((o.dtype.str, o.shape, len(frames))))
+        return encode_ndarray(o)
+
+    return [msgpack.packb(data, default=encode, use_bin_type=True)] + frames
+
+
+def unpackb_frames(frames):
+    ''' Unpack a message that was packed with packb_frames.
+
+        Frames can be bytes, or zmq.Frame objects obtained with
+        recv_multipart(copy=False), in which case the decoded arrays are
+        views on the received frames. '''
+    frames = [getattr(frame, 'buffer', frame) for frame in frames]
+
+    def ext_hook(code, data):
+        if code == EXT_NDARRAY_FRAME:
+            dtype, shape, idx = msgpack.unpackb(data, raw=False)
+            return np.frombuffer(frames[idx], dtype=np.dtype(dtype)).reshape(shape)
+        return msgpack.ExtType(code, data)
+
+    return msgpack.unpackb(frames[0], object_hook=decode_ndarray,
+                           ext_hook=ext_hook, raw=False)
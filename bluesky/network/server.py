@@ -21,14 +21,17 @@ bs.settings.set_variable_defaults(max_nnodes=cpu_count(),
                                   simevent_port=10000, simstream_port=10001,
                                   enable_discovery=True)
 
-def split_scenarios(scentime, scencmd):
-    ''' Split the contents of a batch file into individual scenarios. '''
-    start = 0
-    for i in range(1, len(scencmd) + 1):
-        if i == len(scencmd) or scencmd[i][:4] == 'SCEN':
+def split_scenarios(scentime, scencmd, scenidx=None):
+    ''' Split the contents of a batch file into individual scenarios.
+        The indices of the SCEN commands can be passed in scenidx, when
+        they are known from the compiled scenario file. '''
+    if scenidx is None:
+        scenidx = [i for i, cmd in enumerate(scencmd) if cmd[:4] == 'SCEN']
+    bounds = [0] + [i for i in scenidx if i > 0] + [len(scencmd)]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if start < end:
             scenname = scencmd[start].split()[1].strip()
-            yield dict(name=scenname, scentime=scentime[start:i], scencmd=scencmd[start:i])
-            start = i
+            yield dict(name=scenname, scentime=scentime[start:end], scencmd=scencmd[start:end])
 
 
 class Server(Thread):
@@ -203,8 +206,8 @@ class Server(Thread):
                         continue
 
                     elif eventname == b'BATCH':
-                        scentime, scencmd = msgpack.unpackb(data, raw=False)
-                        self.scenarios = [scen for scen in split_scenarios(scentime, scencmd)]
+                        self.scenarios = [scen for scen in split_scenarios(
+                            *msgpack.unpackb(data, raw=False))]
                         # Check if the batch list contains scenarios
                         if not self.scenarios:
                             echomsg = 'No scenarios defined in batch file!'
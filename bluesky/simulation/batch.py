@@ -0,0 +1,154 @@
+''' Fast-time batch simulation in a local process pool.
+
+    The scenarios in a batch file (separated by SCEN commands, as for the
+    BATCH stack command) are run headless and in fast-time, optionally for
+    a number of random seeds each. Runs are distributed over a pool of
+    worker processes that each run a detached simulation node, so no
+    server or networking is involved. With zero workers, the runs are
+    performed one by one in the main process. Each worker sends the metrics of a
+    run back to the main process as soon as the run is finished, where
+    they are merged into one columnar result file (numpy .npz, with one
+    array per metric).
+
+    A run ends when the scenario holds or quits the simulation, when the
+    maximum simulation time is reached (--maxtime, or the batch_maxtime
+    setting), or when all scenario commands are processed and no traffic
+    is left. The simulation is reset after each run, which closes the
+    data logs of the run.
+
+    Usage: python BlueSky.py --batch scenario.scn [--workers N] [--seeds N]
+                             [--maxtime SECONDS] [--output FILE]
+'''
+import os
+import time
+from datetime import datetime
+from multiprocessing import Pool, cpu_count
+import numpy as np
+
+import bluesky as bs
+from bluesky import settings
+
+
+# Register settings defaults: maximum simulation time of a run [s], when
+# no maximum time is given for the batch
+settings.set_variable_defaults(batch_maxtime=86400.0)
+
+# Result columns, and their types in the result file
+metrics = dict(scenario=str, seed=int, ended=str, simt=float, wall=float,
+               nsteps=int, ntrafmax=int, nconf_tot=int, nlos_tot=int)
+
+
+def initworker(cfgfile=''):
+    ''' Start a detached simulation node in this worker process. '''
+    bs.init('sim-detached', cfgfile=cfgfile)
+
+
+def runscenario(run):
+    ''' Run one scenario in fast-time in the simulation node of this worker
+        process, and return the metrics of the run. '''
+    bs.sim.reset()
+    if run['seed'] >= 0:
+        bs.sim.setseed(run['seed'])
+    bs.stack.set_scendata(list(run['scentime']), list(run['scencmd']))
+    bs.sim.op()
+    maxtime = run['maxtime'] or settings.batch_maxtime
+
+    nsteps = ntrafmax = 0
+    ended = ''
+    t0 = time.perf_counter()
+    while not ended:
+        # Scenario commands like OP end fast-time
+        if not bs.sim.ffmode:
+            bs.sim.fastforward()
+        bs.sim.step()
+        nsteps += 1
+        ntrafmax = max(ntrafmax, bs.traf.ntraf)
+
+        if bs.sim.state == bs.HOLD:
+            ended = 'HOLD'
+        elif bs.sim.state == bs.END:
+            ended = 'QUIT'
+        elif bs.sim.simt >= maxtime:
+            ended = 'MAXTIME'
+        elif bs.traf.ntraf == 0 and not bs.stack.get_scendata()[1] and nsteps > 1:
+            ended = 'DONE'
+
+    result = dict(scenario=run['name'], seed=run['seed'], ended=ended,
+                  simt=bs.sim.simt, wall=time.perf_counter() - t0,
+                  nsteps=nsteps, ntrafmax=ntrafmax,
+                  nconf_tot=len(bs.traf.cd.confpairs_all),
+                  nlos_tot=len(bs.traf.cd.lospairs_all))
+
+    # Close and flush the data logs of this run: the pool terminates its
+    # workers after the last run, without a further reset
+    bs.sim.reset()
+    return result
+
+
+def makeruns(fname, nseeds=0, maxtime=0.0):
+    ''' Read a batch file, and return a list of runs: one per scenario when
+        nseeds is zero, or nseeds runs with seeds 0..nseeds-1 otherwise. '''
+    from bluesky.stack.simstack import loadscn
+    from bluesky.network.server import split_scenarios
+
+    scen = loadscn(fname)
+    if not len(scen):
+        raise ValueError(f'Empty batch file {fname}')
+    runs = []
+    for scen in split_scenarios(scen.scentime.tolist(), scen.scencmd, scen.scenidx.tolist()):
+        for seed in range(nseeds) if nseeds else [-1]:
+            runs.append(dict(scen, seed=seed, maxtime=maxtime))
+    return runs
+
+
+def run(fname, nworkers=None, nseeds=0, maxtime=0.0, outfile='', cfgfile=''):
+    ''' Run all scenarios in batch file fname in a pool of nworkers
+        processes (all CPUs when None, or in the simulation node of this
+        process when zero), and store the metrics of all runs in outfile. '''
+    settings.init(cfgfile)
+    try:
+        runs = makeruns(fname, nseeds, maxtime)
+    except FileNotFoundError:
+        print(f'BATCH: File not found: {fname}')
+        return None
+    except ValueError:
+        print(f'BATCH: No scenarios defined in batch file {fname}')
+        return None
+
+    results = {name: [] for name in metrics}
+
+    def gather(finished):
+        for i, result in enumerate(finished, 1):
+            for name, value in result.items():
+                results[name].append(value)
+            print(f'BATCH: [{i}/{len(runs)}] {result["scenario"]} '
+                  f'(seed {result["seed"]}): {result["ended"]} at '
+                  f'{result["simt"]:.0f} s in {result["wall"]:.1f} s wall time')
+
+    nworkers = min(cpu_count() if nworkers is None else nworkers, len(runs))
+    t0 = time.perf_counter()
+    if nworkers:
+        print(f'BATCH: {len(runs)} runs of {fname} on {nworkers} workers')
+        with Pool(nworkers, initializer=initworker, initargs=(cfgfile,)) as pool:
+            gather(pool.imap_unordered(runscenario, runs))
+    else:
+        print(f'BATCH: {len(runs)} runs of {fname} in this process')
+        if bs.sim is None:
+            initworker(cfgfile)
+        gather(map(runscenario, runs))
+    wall = time.perf_counter() - t0
+
+    results = {name: np.array(values, dtype=metrics[name])
+               for name, values in results.items()}
+    if not outfile:
+        scenname = os.path.splitext(os.path.basename(fname))[0]
+        timestamp = datetime.now().strftime('%Y%m%d_%H-%M-%S')
+        outfile = f'{settings.log_path}/BATCH_{scenname}_{timestamp}.npz'
+    os.makedirs(os.path.dirname(outfile) or '.', exist_ok=True)
+    np.savez(outfile, **results)
+
+    # Throughput in simulated seconds per wall-clock second per worker
+    throughput = np.sum(results['simt']) / wall / max(1, nworkers)
+    print(f'BATCH: Finished {len(runs)} runs in {wall:.1f} s, '
+          f'{throughput:.1f} sim-s/wall-s per worker. Results in {outfile}')
+    return results
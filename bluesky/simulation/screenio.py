@@ -1,17 +1,61 @@
 """ ScreenIO is a screen proxy on the simulation side for the QTGL implementation of BlueSky."""
 import time
-import copy
 import numpy as np
 
 # Local imports
 import bluesky as bs
 from bluesky import stack
-from bluesky.tools import areafilter, geo, misc
+from bluesky.tools import areafilter, geo
+from bluesky.core import TrafficArrays
 from bluesky.core.walltime import Timer
 
 bs.settings.set_variable_defaults(screendt=0.2,
                                   atc_mode='BLUESKY')
 
+
+class ACDataState(TrafficArrays):
+    """ Per-aircraft state of the ACDATA stream: a stable slot id for each
+        aircraft, and the values of the static aircraft data that were last
+        sent to the clients. """
+    def __init__(self, fields):
+        super().__init__()
+        self.fields = fields
+        self.nextslot = 0
+        with self.settrafarrays():
+            self.slot = np.array([], dtype=np.int64)
+            self.sent = np.array([], dtype=bool)
+            for name in fields:
+                setattr(self, name, np.array([], dtype=object))
+
+    def create(self, n=1):
+        super().create(n)
+        self.slot[-n:] = np.arange(self.nextslot, self.nextslot + n)
+        self.nextslot += n
+
+    def patch(self, values, keyframe=False):
+        """ Return the static data of all aircraft for which it changed since
+            it was last sent, or of all aircraft when keyframe is True.
+            Returns None when there is nothing to send. """
+        changed = np.ones(len(self.slot), dtype=bool) if keyframe else ~self.sent
+        current = dict()
+        for name in self.fields:
+            cur = np.empty(len(self.slot), dtype=object)
+            cur[:] = values[name] if isinstance(values[name], list) else values[name].tolist()
+            changed |= cur != getattr(self, name)
+            current[name] = cur
+
+        idx = np.flatnonzero(changed)
+        if len(idx) == 0 and not keyframe:
+            return None
+
+        patch = dict(keyframe=keyframe, slot=self.slot[idx])
+        for name, cur in current.items():
+            getattr(self, name)[idx] = cur[idx]
+            patch[name] = cur[idx].tolist()
+        self.sent[idx] = True
+        return patch
+
+
 class ScreenIO:
     """Class within sim task which sends/receives data to/from GUI task"""
 
@@ -24,6 +68,13 @@ class ScreenIO:
     # Update rate of aircraft update messages [Hz]
     acupdate_rate = 5
 
+    # Interval of complete updates of the static aircraft data [s]
+    ackeyframe_dt = 5.0
+
+    # Aircraft data that is only sent when it changes
+    acstatic_fields = ('id', 'type', 'wtc', 'flighttype', 'sid', 'arr',
+                       'rwy', 'symbol', 'ssr')
+
     # =========================================================================
     # Functions
     # =========================================================================
@@ -55,16 +106,17 @@ class ScreenIO:
         # Timing send aircraft data
         self.acdt = max(bs.settings.screendt, 1/self.acupdate_rate)
         self.prevactime = 0.
-        self.prevacdata = dict()
+        self.prevackeyframe = -np.inf
+        self.acstate = ACDataState(self.acstatic_fields)
 
         # Output event timers
-        self.slow_timer = Timer()
+        self.slow_timer = Timer('screenio.siminfo')
         self.slow_timer.timeout.connect(self.send_siminfo)
         self.slow_timer.timeout.connect(self.send_route_data)
         self.slow_timer.timeout.connect(self.send_trails)
         self.slow_timer.start(int(1000 / self.siminfo_rate))
 
-        self.fast_timer = Timer()
+        self.fast_timer = Timer('screenio.acdata')
         self.fast_timer.timeout.connect(self.send_aircraft_data)
         self.fast_timer.start(int(1000 / self.acupdate_rate))
 
@@ -80,7 +132,7 @@ class ScreenIO:
         self.prevtime    = 0.0
 
         self.prevactime = 0.
-        self.prevacdata = dict()
+        self.prevackeyframe = -np.inf
 
         # Communicate reset to gui
         bs.net.send_event(b'RESET', b'ALL')
@@ -164,7 +216,7 @@ class ScreenIO:
             groupmask = bs.traf.groups.groups[name]
             data['groupid'] = groupmask
             self.custgrclr[groupmask] = (r, g, b)
-        elif name in bs.traf.id:
+        elif name in bs.traf.idindex:
             data['acid'] = name
             self.custacclr[name] = (r, g, b)
         elif areafilter.hasArea(name):
@@ -372,102 +424,90 @@ class ScreenIO:
         self.prevcount = self.samplecount
 
     def send_trails(self):
-        # Trails, send only new line segments to be added
-        if bs.traf.trails.active and len(bs.traf.trails.newlat0) > 0:
+        # Trails, send only new line segments to be added, and the limits
+        # of the trail buffer, so that clients can evict old segments
+        if bs.traf.trails.active and bs.traf.trails.nnew > 0:
+            lat0, lon0, lat1, lon1, time = bs.traf.trails.getnew()
             data = dict(swtrails=bs.traf.trails.active,
-                        traillat0=bs.traf.trails.newlat0,
-                        traillon0=bs.traf.trails.newlon0,
-                        traillat1=bs.traf.trails.newlat1,
-                        traillon1=bs.traf.trails.newlon1)
-            bs.traf.trails.clearnew()
+                        traillat0=lat0, traillon0=lon0,
+                        traillat1=lat1, traillon1=lon1, trailtime=time,
+                        maxseg=bs.traf.trails.capacity,
+                        tmin=bs.sim.simt - bs.traf.trails.maxage
+                        if bs.traf.trails.maxage > 0.0 else -np.inf)
             bs.net.send_stream(b'TRAILS', data)
 
     def send_aircraft_data(self):
-        # Interval update data
+        # Aircraft are identified by their slot id. Static data is only sent
+        # when it changes, and periodically for all aircraft in a keyframe,
+        # which allows clients to connect to a running simulation.
+        f32 = lambda arr: np.asarray(arr, dtype=np.float32)
+        data = dict()
+        data['slot'] = self.acstate.slot
+
+        t = time.time()
+        keyframe = t - self.prevackeyframe >= self.ackeyframe_dt
+        if keyframe:
+            self.prevackeyframe = t
+        static = self.acstate.patch(dict(
+            id=bs.traf.id,
+            type=bs.traf.type,
+            wtc=bs.traf.lvnlvars.wtc,
+            flighttype=bs.traf.lvnlvars.flighttype,
+            sid=bs.traf.lvnlvars.sid,
+            arr=bs.traf.lvnlvars.arr,
+            rwy=bs.traf.lvnlvars.rwy,
+            symbol=bs.traf.lvnlvars.symbol,
+            ssr=bs.traf.lvnlvars.ssr), keyframe)
+        if static:
+            data['static'] = static
+
+        # Interval update data. In between, only the data that is always
+        # updated is sent, which the clients apply to their last full update.
         if bs.sim.simt - self.prevactime >= self.acdt or bs.sim.simt <= 0.2:
-            data = dict()
-
             data['simt']        = bs.sim.simt
-            data['id']          = bs.traf.id
-            data['lat']         = bs.traf.lat
-            data['lon']         = bs.traf.lon
-            data['alt']         = bs.traf.alt
-            data['tas']         = bs.traf.tas
-            data['cas']         = bs.traf.cas
-            data['gs']          = bs.traf.gs
+            data['lat']         = f32(bs.traf.lat)
+            data['lon']         = f32(bs.traf.lon)
+            data['alt']         = f32(bs.traf.alt)
+            data['tas']         = f32(bs.traf.tas)
+            data['cas']         = f32(bs.traf.cas)
+            data['gs']          = f32(bs.traf.gs)
             data['ingroup']     = bs.traf.groups.ingroup
             data['inconf']      = bs.traf.cd.inconf
-            data['type']        = bs.traf.type
-            data['tcpamax']     = bs.traf.cd.tcpamax
-            data['rpz']         = bs.traf.cd.rpz
+            data['tcpamax']     = f32(bs.traf.cd.tcpamax)
+            data['rpz']         = f32(bs.traf.cd.rpz)
             data['nconf_cur']   = len(bs.traf.cd.confpairs_unique)
             data['nconf_tot']   = len(bs.traf.cd.confpairs_all)
             data['nlos_cur']    = len(bs.traf.cd.lospairs_unique)
             data['nlos_tot']    = len(bs.traf.cd.lospairs_all)
-            data['trk']         = bs.traf.trk
-            data['vs']          = bs.traf.vs
-            data['vmin']        = bs.traf.perf.vmin
-            data['vmax']        = bs.traf.perf.vmax
+            data['trk']         = f32(bs.traf.trk)
+            data['vs']          = f32(bs.traf.vs)
+            data['vmin']        = f32(bs.traf.perf.vmin)
+            data['vmax']        = f32(bs.traf.perf.vmax)
 
             # LVNL Variables
             data['simname']     = bs.scr.simname
             data['atcip']       = bs.traf.lvnlvars.atcIP
-            data['flighttype']  = bs.traf.lvnlvars.flighttype
-            data['wtc']         = bs.traf.lvnlvars.wtc
-            data['dtg']         = bs.traf.lvnlvars.dtg
-            data['dtg_route']   = bs.traf.lvnlvars.dtg_route
+            data['dtg']         = f32(bs.traf.lvnlvars.dtg)
+            data['dtg_route']   = f32(bs.traf.lvnlvars.dtg_route)
 
             # Transition level as defined in traf
             data['translvl']    = bs.traf.translvl
 
             # ASAS resolutions for visualization. Only send when evaluated
-            data['asastas']     = bs.traf.cr.tas
-            data['asastrk']     = bs.traf.cr.trk
+            data['asastas']     = f32(bs.traf.cr.tas)
+            data['asastrk']     = f32(bs.traf.cr.trk)
 
             # History symbols
-            data['histsymblat'] = bs.traf.histsymb.histlat
-            data['histsymblon'] = bs.traf.histsymb.histlon
-
-            # Always update data
-            data['arr']         = np.array(bs.traf.lvnlvars.arr)
-            data['symbol']      = np.array(bs.traf.lvnlvars.symbol)
-            data['rwy']         = np.array(bs.traf.lvnlvars.rwy)
-            data['selhdg']      = bs.traf.selhdg
-            data['selalt']      = bs.traf.selalt
-            data['selspd']      = bs.traf.selspd
-            data['sid']         = np.array(bs.traf.lvnlvars.sid)
-            data['ssr']         = bs.traf.lvnlvars.ssr
-            data['uco']         = bs.traf.lvnlvars.uco
+            data['histsymblat'] = f32(bs.traf.histsymb.histlat)
+            data['histsymblon'] = f32(bs.traf.histsymb.histlon)
 
             self.prevactime = bs.sim.simt
-            self.prevacdata = copy.deepcopy(data)
-        else:
-            data = copy.deepcopy(self.prevacdata)
-
-        # Check if data is created
-        if 'id' in data:
-            # Index for traffic arrays in data dict
-            idata = misc.get_indices(data['id'], bs.traf.id)
-            # Index for traffic arrays
-            itraf = misc.get_indices(bs.traf.id, data['id'])
-        else:
-            idata = []
-            itraf = []
-
-        # Always update data (take aircraft create/delete into account)
-        data['arr'][idata]      = np.array(bs.traf.lvnlvars.arr)[itraf]
-        data['arr']             = data['arr'].tolist()
-        data['symbol'][idata]   = np.array(bs.traf.lvnlvars.symbol)[itraf]
-        data['symbol']          = data['symbol'].tolist()
-        data['rwy'][idata]      = np.array(bs.traf.lvnlvars.rwy)[itraf]
-        data['rwy']             = data['rwy'].tolist()
-        data['selhdg'][idata]   = bs.traf.selhdg[itraf]
-        data['selalt'][idata]   = bs.traf.selalt[itraf]
-        data['selspd'][idata]   = bs.traf.selspd[itraf]
-        data['sid'][idata]      = np.array(bs.traf.lvnlvars.sid)[itraf]
-        data['sid']             = data['sid'].tolist()
-        data['ssr'][idata]      = bs.traf.lvnlvars.ssr[itraf]
-        data['uco'][idata]      = bs.traf.lvnlvars.uco[itraf]
+
+        # Always update data
+        data['selhdg']      = f32(bs.traf.selhdg)
+        data['selalt']      = f32(bs.traf.selalt)
+        data['selspd']      = f32(bs.traf.selspd)
+        data['uco']         = bs.traf.lvnlvars.uco
 
         # Send data
         bs.net.send_stream(b'ACDATA', data)
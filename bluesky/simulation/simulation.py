@@ -7,7 +7,7 @@ from random import seed
 # Local imports
 import bluesky as bs
 import bluesky.core as core
-from bluesky.core import plugin, simtime
+from bluesky.core import plugin, simtime, profiler
 from bluesky.stack import simstack, recorder
 from bluesky.tools import datalog, areafilter, plotter
 
@@ -70,7 +70,8 @@ class Simulation:
             time.sleep(remainder)
 
         # Always update stack
-        simstack.process()
+        with profiler.timed('stack'):
+            simstack.process()
 
         if self.state == bs.OP:
             # Plot/log the current timestep, and call preupdate functions
@@ -92,7 +93,8 @@ class Simulation:
             self.utc += datetime.timedelta(seconds=self.simdt)
 
             # Update traffic and other update functions for the next timestep
-            bs.traf.update()
+            with profiler.timed('traffic'):
+                bs.traf.update()
             simtime.update()
 
         # Always update syst
@@ -192,8 +194,9 @@ class Simulation:
         # send to server and clear stack
         self.reset()
         try:
-            scentime, scencmd = zip(*[tc for tc in simstack.readscn(fname)])
-            bs.net.send_event(b'BATCH', (scentime, scencmd))
+            scen = simstack.loadscn(fname)
+            bs.net.send_event(b'BATCH', (scen.scentime.tolist(), scen.scencmd,
+                                         scen.scenidx.tolist()))
         except FileNotFoundError:
             return False, f'BATCH: File not found: {fname}'
 
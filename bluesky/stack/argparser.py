@@ -50,7 +50,7 @@ class Parameter:
         if self.annotation is inspect._empty:
             # Without annotation the argument is passed on unchanged as string
             # (i.e., the 'word' argument type)
-            self.parsers = [Parser(str)]
+            self.parsers = [Parser(str, static=True)]
             self.annotation = 'word'
         elif isinstance(self.annotation, str):
             # If the annotation is a string we get our parsers from the argparsers dict
@@ -62,14 +62,21 @@ class Parameter:
         else:
             # All other annotation types are expected to have default behaviour
             # and are wrapped in Parser
-            self.parsers = [Parser(self.annotation)]
+            self.parsers = [Parser(self.annotation,
+                                   static=self.annotation in (str, int, float))]
 
         # This parameter is not valid if it has no parsers, or is keyword-only.
         # In those cases it can be skipped from the list of parameters when
         # processing a stack command line.
         self.valid = bool(self.parsers) and self.canwrap(param)
 
-    def __call__(self, argstring):
+        # A static parameter can be parsed ahead of execution. An aircraft id
+        # is only deferred when it is the sole option, because falling back
+        # to the next parser depends on whether the aircraft exists.
+        self.static = all(p.static for p in self.parsers) and \
+            (len(self.parsers) == 1 or not any(isinstance(p, AcidArg) for p in self.parsers))
+
+    def __call__(self, argstring, compile=False):
         # First check if argument is omitted and default value is needed
         if not argstring or argstring[0] == ',':
             _, argstring = re_getarg.match(argstring).groups()
@@ -82,7 +89,7 @@ class Parameter:
         error = ''
         for parser in self.parsers:
             try:
-                return parser.parse(argstring)
+                return parser.compile(argstring) if compile else parser.parse(argstring)
             except (ValueError, ArgumentError) as e:
                 error += ('\n' + e.args[0])
 
@@ -122,26 +129,50 @@ class Parser:
     # Output size of this parser
     size = 1
 
-    def __init__(self, parsefun=None):
+    # A parser is static when its result only depends on the argument text,
+    # and not on the simulation state or the stack reference data
+    static = False
+
+    def __init__(self, parsefun=None, static=None):
         self.parsefun = parsefun
+        if static is not None:
+            self.static = static
 
     def parse(self, argstring):
         ''' Parse the next argument from argstring. '''
         curarg, argstring = re_getarg.match(argstring).groups()
         return self.parsefun(curarg), argstring
 
+    def compile(self, argstring):
+        ''' Parse the next argument from argstring ahead of execution.
+            Only used for static parsers. '''
+        return self.parse(argstring)
+
 
 class StringArg(Parser):
     ''' Argument parser that simply consumes the entire remaining text string. '''
+    static = True
+
     def parse(self, argstring):
         return argstring, ''
 
 
 class AcidArg(Parser):
     ''' Argument parser for aircraft callsigns and group ids. '''
+    # Aircraft ids of compiled command lines are resolved at execution
+    static = True
+
     def parse(self, argstring):
         arg, argstring = re_getarg.match(argstring).groups()
-        acid = arg.upper()
+        return self.resolve(arg.upper()), argstring
+
+    def compile(self, argstring):
+        arg, argstring = re_getarg.match(argstring).groups()
+        return AcidRef(arg.upper()), argstring
+
+    @staticmethod
+    def resolve(acid):
+        ''' Return the traffic index of aircraft (or group) acid. '''
         if acid in bs.traf.groups:
             idx = bs.traf.groups.listgroup(acid)
         else:
@@ -153,7 +184,23 @@ class AcidArg(Parser):
             refdata.lat = bs.traf.lat[idx]
             refdata.lon = bs.traf.lon[idx]
             refdata.acidx = idx
-        return idx, argstring
+        return idx
+
+
+class AcidRef:
+    ''' Aircraft id in the arguments of a compiled command line, which is
+        resolved to a traffic index when the command is executed. '''
+    __slots__ = ('acid',)
+
+    def __init__(self, acid):
+        self.acid = acid
+
+    def __repr__(self):
+        return f'AcidRef({self.acid})'
+
+    def resolve(self):
+        ''' Return the traffic index of this aircraft. '''
+        return AcidArg.resolve(self.acid)
 
 
 class AcidselectArg(Parser):
@@ -292,6 +339,8 @@ class PosArg(Parser):
 
 class PandirArg(Parser):
     ''' Parse pan direction commands. '''
+    static = True
+
     def parse(self, argstring):
         arg, argstring = re_getarg.match(argstring).groups()
         pandir = arg.upper()
@@ -302,6 +351,8 @@ class PandirArg(Parser):
 
 class ColorArg(Parser):
     ''' Parse color commands. '''
+    static = True
+
     def parse(self, argstring):
         arg, argstring = re_getarg.match(argstring).groups()
         try:
@@ -317,13 +368,13 @@ class ColorArg(Parser):
 
 argparsers = {
     '*': None,
-    'txt': Parser(str.upper),
-    'word': Parser(str),
+    'txt': Parser(str.upper, static=True),
+    'word': Parser(str, static=True),
     'string': StringArg(),
-    'float': Parser(float),
-    'int': Parser(int),
-    'onoff': Parser(txt2bool),
-    'bool': Parser(txt2bool),
+    'float': Parser(float, static=True),
+    'int': Parser(int, static=True),
+    'onoff': Parser(txt2bool, static=True),
+    'bool': Parser(txt2bool, static=True),
     'acid': AcidArg(),
     'acidselect': AcidselectArg(),
     'wpinroute': WpinrouteArg(),
@@ -332,9 +383,9 @@ argparsers = {
     'lat': PosArg(),
     'lon': None,
     'pandir': PandirArg(),
-    'spd': Parser(txt2spd),
-    'vspd': Parser(txt2vs),
-    'alt': Parser(txt2alt),
+    'spd': Parser(txt2spd, static=True),
+    'vspd': Parser(txt2vs, static=True),
+    'alt': Parser(txt2alt, static=True),
     'hdg': Parser(lambda txt: txt2hdg(txt, refdata.acidx, refdata.lat, refdata.lon)),
-    'time': Parser(txt2tim),
+    'time': Parser(txt2tim, static=True),
     'color': ColorArg()}
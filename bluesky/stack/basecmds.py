@@ -4,7 +4,7 @@ import os
 
 import bluesky as bs
 from bluesky import settings
-from bluesky.core import select_implementation, simtime, varexplorer as ve
+from bluesky.core import select_implementation, simtime, profiler, varexplorer as ve
 from bluesky.tools import geo, aero, areafilter, plotter, printer
 from bluesky.tools.calculator import calculator
 from bluesky.stack.cmdparser import append_commands
@@ -63,30 +63,12 @@ def initbasecmds():
             bs.traf.airwaycmd,
             "Get info on airway or connections of a waypoint",
         ],
-        "ATALT": [
-            "acid ATALT alt cmd ",
-            "acid,alt,string",
-            bs.traf.cond.ataltcmd,
-            "When a/c at given altitude , execute a command cmd",
-        ],
         "ATCMODE": [
             "ATCMODE BLUESKY/APP/ACC",
             'txt',
             bs.scr.setatcmode,
             "Change the ATC mode",
         ],
-        "ATDIST": [
-            "acid ATDIST pos dist cmd ",
-            "acid,latlon,float,string",
-            bs.traf.cond.atdistcmd,
-            "When a/c passing this distance[nm] to position, execute the command cmd",
-        ],
-        "ATSPD": [
-            "acid ATSPD spd cmd ",
-            "acid,spd,string",
-            bs.traf.cond.atspdcmd,
-            "When a/c reaches given speed, execute a command cmd",
-        ],
         "BANK": [
             "BANK acid bankangle[deg]",
             "acid,[float]",
@@ -414,6 +396,12 @@ def initbasecmds():
             lambda name, *coords: areafilter.defineArea(name, "POINT", coords),
             "Draw a point"
         ],
+        "PROFILE": [
+            "PROFILE [ON/OFF/RESET/DUMP/COMPARE/STREAM] [filename/ON/OFF]",
+            "[txt,string]",
+            profiler.profilecmd,
+            "Profile the wall-clock time of the parts of each simulation step",
+        ],
         "PRINTER": [
             "PRINTER",
             "",
@@ -1,7 +1,7 @@
 ''' Stack Command implementation. '''
 import inspect
 import sys, os
-from bluesky.stack.argparser import Parameter, getnextarg, ArgumentError
+from bluesky.stack.argparser import Parameter, getnextarg, ArgumentError, AcidRef
 
 
 class Command:
@@ -47,6 +47,9 @@ class Command:
         self.help = inspect.cleandoc(kwargs.get('help', ''))
         self.brief = kwargs.get('brief', '')
         self.aliases = kwargs.get('aliases', tuple())
+        # Names of the parameters for which the callback also accepts arrays,
+        # to combine stacked lines of this command in one call
+        self.bulk = kwargs.get('bulk', tuple())
         self.impl = ''
         self.valid = True
         self.annotations = get_annot(kwargs.get('annotations', ''))
@@ -55,11 +58,21 @@ class Command:
         self.callback = func
 
     def __call__(self, argstring):
+        return self.call(self.parse(argstring))
+
+    def parse(self, argstring, compile=False):
+        ''' Parse argstring into the list of arguments for the callback.
+
+            With compile=True the arguments are parsed ahead of execution:
+            None is returned when not all parameters are static, and
+            aircraft ids are returned as AcidRef objects. '''
+        if compile and not all(param.static for param in self.params):
+            return None
         args = []
         param = None
         # Use callback-specified parameter parsers to generate param list from strings
         for param in self.params:
-            result = param(argstring)
+            result = param(argstring, compile)
             argstring = result[-1]
             args.extend(result[:-1])
 
@@ -75,12 +88,15 @@ class Command:
                     count += 1
                 msg += f', but {count} were given'
                 raise ArgumentError(msg)
-            result = param(argstring)
+            result = param(argstring, compile)
             argstring = result[-1]
             args.extend(result[:-1])
+        return args
 
-        # Call callback function with parsed parameters
-        ret = self.callback(*args)
+    def call(self, args):
+        ''' Call the callback function with a list of parsed arguments. '''
+        ret = self.callback(*(arg.resolve() if isinstance(arg, AcidRef) else arg
+                              for arg in args))
         # Always return a tuple with a success value and a message string
         if ret is None:
             return True, ''
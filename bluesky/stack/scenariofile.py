@@ -0,0 +1,113 @@
+''' Compiled scenario files.
+
+    Reading a scenario file parses the timestamp of each line in Python,
+    which takes long for large (e.g., generated replay) scenarios. Therefore
+    a compiled version of each large scenario file is stored next to it,
+    with the command times as a float64 array, and the command lines as a
+    table of unique lines with an index into this table per command. The
+    compiled file contains a hash of the scenario text, and is replaced when
+    the scenario file changes.
+'''
+import os
+import hashlib
+import numpy as np
+
+from bluesky import settings
+
+
+# Register settings defaults
+settings.set_variable_defaults(scenario_compile_minsize=100000)
+
+# Increment when the compiled file structure changes
+version = 1
+
+# Extension appended to the scenario filename for the compiled file
+extension = 'c'
+
+
+class Scenario:
+    ''' Contents of a scenario file: the time and command line of each
+        command in file order, and the indices of the SCEN commands that
+        start the scenarios in a batch file. Identical command lines are
+        the same string object. '''
+    def __init__(self, scentime, cmdidx, cmdtable):
+        self.scentime = np.asarray(scentime, dtype=np.float64)
+        self.cmdidx = np.asarray(cmdidx, dtype=np.int64)
+        self.cmdtable = cmdtable
+        self.scencmd = [cmdtable[i] for i in self.cmdidx.tolist()]
+        # SCEN commands are found in the table of unique lines
+        scen = np.flatnonzero([cmd[:4] == 'SCEN' for cmd in cmdtable])
+        self.scenidx = np.flatnonzero(np.isin(self.cmdidx, scen))
+
+    @classmethod
+    def fromlines(cls, lines):
+        ''' Create a scenario from a sequence of (time, cmdline) tuples. '''
+        table = dict()
+        scentime, cmdidx = list(), list()
+        for cmdtime, cmdline in lines:
+            scentime.append(cmdtime)
+            cmdidx.append(table.setdefault(cmdline, len(table)))
+        return cls(scentime, cmdidx, list(table))
+
+    def __len__(self):
+        return len(self.scentime)
+
+    def __iter__(self):
+        return zip(self.scentime.tolist(), self.scencmd)
+
+    def issorted(self):
+        ''' Returns True when the command times are in ascending order. '''
+        return bool(np.all(np.diff(self.scentime) >= 0.0))
+
+    def save(self, fname, digest):
+        ''' Store this scenario as compiled file fname. '''
+        encoded = [cmd.encode('utf-8') for cmd in self.cmdtable]
+        offset = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offset[1:] = np.cumsum([len(cmd) for cmd in encoded])
+        # Write to a temporary file first, to avoid that other nodes
+        # load a partially written file
+        tmpname = f'{fname}.{os.getpid()}'
+        with open(tmpname, 'wb') as f:
+            np.savez(f, version=version, digest=digest, scentime=self.scentime,
+                     cmdidx=self.cmdidx, cmdoffset=offset,
+                     cmddata=np.frombuffer(b''.join(encoded), dtype=np.uint8))
+        os.replace(tmpname, fname)
+
+    @classmethod
+    def load(cls, fname, digest):
+        ''' Load compiled file fname, and return the scenario, or None when
+            the file doesn't match the scenario text with hash digest. '''
+        with np.load(fname) as data:
+            if data['version'] != version or str(data['digest']) != digest:
+                return None
+            buf, offset = data['cmddata'].tobytes(), data['cmdoffset'].tolist()
+            text = buf.decode('utf-8')
+            if len(text) == len(buf):
+                # Plain ASCII text: byte offsets are character offsets
+                cmdtable = [text[i0:i1] for i0, i1 in zip(offset[:-1], offset[1:])]
+            else:
+                cmdtable = [buf[i0:i1].decode('utf-8') for i0, i1 in zip(offset[:-1], offset[1:])]
+            return cls(data['scentime'], data['cmdidx'], cmdtable)
+
+
+def load(fname, readlines):
+    ''' Return the contents of scenario file fname, from its compiled file
+        when this is up to date. Otherwise the scenario is read with
+        readlines(fname), and a compiled file is stored when the scenario
+        is large. '''
+    with open(fname, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    try:
+        scen = Scenario.load(fname + extension, digest)
+        if scen is not None:
+            return scen
+    except (OSError, ValueError, KeyError):
+        pass
+    scen = Scenario.fromlines(readlines(fname))
+    if os.path.getsize(fname) >= settings.scenario_compile_minsize:
+        try:
+            scen.save(fname + extension, digest)
+        except OSError:
+            # The scenario directory can be read-only
+            pass
+    return scen
@@ -2,12 +2,15 @@
 import math
 import os
 import traceback
+from bisect import bisect_left, bisect_right
+import numpy as np
 import bluesky as bs
-from bluesky.stack.stackbase import Stack, stack, checkscen, forward
-from bluesky.stack.cmdparser import Command, command
+from bluesky.stack.stackbase import Stack, stack, checkscen, forward, set_scendata
+from bluesky.stack.cmdparser import Command, CommandGroup, command
 from bluesky.stack.basecmds import initbasecmds
 from bluesky.stack import recorder
 from bluesky.stack import argparser, ArgumentError
+from bluesky.stack import scenariofile
 from bluesky import settings
 from bluesky.tools import vemmisread
 
@@ -23,6 +26,11 @@ tmxlist = ("BGPASAS", "DFFLEVEL", "FFLEVEL", "FILTCONF", "FILTTRED", "FILTTAMB",
 tbar_lst = ['NIRSI', 'SOKS2', 'GALIS', 'RANGEBAR']
 maps_loaded = []
 
+# Cache of compiled command lines, and of read scenario files
+compiled = dict()
+maxcompiled = 200000
+scncache = dict()
+
 def init():
     """ Initialization of the default stack commands. This function is called
         at the initialization of the main simulation object."""
@@ -50,35 +58,154 @@ def reset():
     argparser.reset()
 
 
+class CompiledLine:
+    ''' Stack command line with its command lookup, and its arguments when
+        these can be parsed ahead of execution (see Command.parse).
+        Compiled lines are cached, so that lines that are processed many
+        times (e.g., scenarios that are replayed in batch simulations) are
+        only tokenized and parsed once.
+
+        Each variant of the line is stored as a tuple of
+        (cmd, cmdu, cmdobj, params, argstring, args). '''
+    __slots__ = ('direct', 'acidfirst')
+
+    def __init__(self, cmdline):
+        # Get first argument from command line and check if it's a command
+        cmd, argstring = argparser.getnextarg(cmdline)
+        self.direct = self.compile(cmd, argstring)
+        self.acidfirst = None
+
+        # If no function is found for 'cmd', the line may start with an
+        # aircraft id, which is checked at execution
+        if not self.direct[2] and cmd:
+            acid = self.direct[1]
+            cmd, argstring = argparser.getnextarg(argstring)
+            # When no other args are parsed, command is POS
+            self.acidfirst = self.compile(cmd, acid + " " + argstring, cmd.upper() if cmd else 'POS')
+
+    @staticmethod
+    def compile(cmd, argstring, cmdu=None):
+        ''' Look up command cmd and try to parse its arguments. '''
+        cmdu = cmdu or cmd.upper()
+        cmdobj = Command.cmddict.get(cmdu)
+        args = None
+        if cmdobj and not isinstance(cmdobj, CommandGroup):
+            try:
+                args = cmdobj.parse(argstring, compile=True)
+            except Exception:
+                # Errors are reported when the line is executed
+                pass
+        return (cmd, cmdu, cmdobj, cmdobj and cmdobj.params, argstring, args)
+
+    def current(self):
+        ''' Returns True when the commands of this line haven't been
+            added, replaced, or reimplemented since it was compiled. '''
+        for variant in (self.direct, self.acidfirst):
+            if variant and (Command.cmddict.get(variant[1]) is not variant[2] or
+                            variant[2] and variant[2].params is not variant[3]):
+                return False
+        return True
+
+    def dispatch(self):
+        ''' Return the variant of this line to execute. '''
+        if self.acidfirst and self.direct[1] in bs.traf.idindex:
+            return self.acidfirst
+        return self.direct
+
+
+def getcompiled(cmdline):
+    ''' Return the compiled version of cmdline. '''
+    line = compiled.get(cmdline)
+    if line is None or not line.current():
+        if len(compiled) >= maxcompiled:
+            compiled.clear()
+        line = compiled[cmdline] = CompiledLine(cmdline)
+    return line
+
+
+def bulkargs(cmdobj, args, i):
+    ''' Combine the arguments of the compiled scenario lines that follow
+        stack entry i, and call the same bulk command, with the arguments
+        args of entry i. The bulk parameters become arrays, all other
+        arguments should be equal. Aircraft ids are resolved, and should be
+        unique single aircraft.
+
+        Returns the number of combined lines after entry i, and the
+        combined arguments. '''
+    # Only lines that are followed by the same command can be combined
+    if i + 1 >= len(Stack.cmdstack) or \
+            getcompiled(Stack.cmdstack[i + 1][0]).dispatch()[2] is not cmdobj or \
+            len(args) != len(cmdobj.params):
+        return 0, args
+    args = [arg.resolve() if isinstance(arg, argparser.AcidRef) else arg for arg in args]
+    bulkpos = [j for j, param in enumerate(cmdobj.params) if param.name in cmdobj.bulk]
+    acidpos = [j for j, param in enumerate(cmdobj.params)
+               if isinstance(param.parsers[0], argparser.AcidArg)]
+    if not set(acidpos) <= set(bulkpos) or \
+            any(isinstance(args[j], np.ndarray) for j in acidpos):
+        return 0, args
+    columns = {j: [args[j]] for j in bulkpos}
+    acids = {tuple(args[j] for j in acidpos)}
+    nbulk = 0
+    for cmdline, sender_rte in Stack.cmdstack[i + 1:]:
+        _, _, nextobj, _, _, nextargs = getcompiled(cmdline).dispatch()
+        if sender_rte is not None or nextobj is not cmdobj or \
+                nextargs is None or len(nextargs) != len(args):
+            break
+        try:
+            nextargs = [arg.resolve() if isinstance(arg, argparser.AcidRef) else arg
+                        for arg in nextargs]
+        except ArgumentError:
+            break
+        acid = tuple(nextargs[j] for j in acidpos)
+        if acid in acids or any(isinstance(idx, np.ndarray) for idx in acid) or \
+                any(nextargs[j] != args[j] for j in range(len(args)) if j not in columns):
+            break
+        acids.add(acid)
+        for j, column in columns.items():
+            column.append(nextargs[j])
+        nbulk += 1
+    if nbulk:
+        for j, column in columns.items():
+            args[j] = np.array(column)
+    return nbulk, args
+
+
 def process():
     ''' Sim-side stack processing. '''
     # First check for commands in scenario file
     checkscen()
 
     # Process stack of commands
-    for cmdline in Stack.commands():
+    nbulk = 0
+    for i, cmdline in enumerate(Stack.commands()):
+        if nbulk:
+            # This line was executed in the bulk call of a previous line
+            nbulk -= 1
+            if success:
+                recorder.savecmd(cmdu, cmdline)
+            continue
+
         success = True
         echotext = ''
         echoflags = bs.BS_OK
 
-        # Get first argument from command line and check if it's a command
-        cmd, argstring = argparser.getnextarg(cmdline)
-        cmdu = cmd.upper()
-        cmdobj = Command.cmddict.get(cmdu)
-
-        # If no function is found for 'cmd', check if cmd is actually an aircraft id
-        if not cmdobj and cmdu in bs.traf.id:
-            cmd, argstring = argparser.getnextarg(argstring)
-            argstring = cmdu + " " + argstring
-            # When no other args are parsed, command is POS
-            cmdu = cmd.upper() if cmd else 'POS'
-            cmdobj = Command.cmddict.get(cmdu)
+        cmd, cmdu, cmdobj, _, argstring, args = getcompiled(cmdline).dispatch()
 
         # Proceed if a command object was found
         if cmdobj:
             try:
-                # Call the command, passing the argument string
-                success, echotext = cmdobj(argstring)
+                if args is None:
+                    # Call the command, passing the argument string
+                    success, echotext = cmdobj(argstring)
+                else:
+                    # Lines from a scenario calling a bulk command are
+                    # combined with the following lines calling it
+                    ncombined = 0
+                    if cmdobj.bulk and Stack.sender_rte is None:
+                        ncombined, args = bulkargs(cmdobj, args, i)
+                    success, echotext = cmdobj.call(args)
+                    nbulk = ncombined
                 if not success:
                     if not argstring:
                         echotext = echotext or cmdobj.brieftext()
@@ -137,7 +264,16 @@ def process():
 
 
 def readscn(fname):
-    ''' Read a scenario file. '''
+    ''' Read a scenario file. Yields the time and command line of each
+        command in the file. '''
+    yield from loadscn(fname)
+
+
+def loadscn(fname):
+    ''' Load a scenario file, and return its contents as a
+        scenariofile.Scenario. Scenarios are cached until the file is
+        modified, and their command lines are compiled when they are
+        loaded. '''
     # Split the incoming filename into a path + filename and an extension
     base, ext = os.path.splitext(fname.replace("\\", "/"))
     if not os.path.isabs(base):
@@ -147,6 +283,23 @@ def readscn(fname):
     # The entire filename, possibly with added path and extension
     fname_full = os.path.normpath(base + ext)
 
+    fstat = os.stat(fname_full)
+    key = (fstat.st_mtime_ns, fstat.st_size)
+    cached = scncache.get(fname_full)
+    if cached is None or cached[0] != key:
+        scen = scenariofile.load(fname_full, readscnlines)
+        for cmdline in scen.cmdtable:
+            # Lines with arguments that are substituted by PCALL are
+            # compiled when they are executed
+            if '%' not in cmdline:
+                for line in cmdline.strip().split(';'):
+                    getcompiled(line)
+        cached = scncache[fname_full] = (key, scen)
+    return cached[1]
+
+
+def readscnlines(fname_full):
+    ''' Parse the timestamped command lines of scenario file fname_full. '''
     with open(fname_full, "r") as fscen:
         prevline = ''
         for line in fscen:
@@ -193,7 +346,7 @@ def pcall(fname, *pcall_arglst):
     """
     # Check for a/c id as first argument (use case: procedure files)
     # CALL KL204 myproc should have effect as if: CALL myproc KL204
-    if pcall_arglst and fname in bs.traf.id:
+    if pcall_arglst and fname in bs.traf.idindex:
         acid = fname
         fname = pcall_arglst[0]
         pcall_arglst = [acid] + list(pcall_arglst[1:])
@@ -230,10 +383,8 @@ def pcall(fname, *pcall_arglst):
                 Stack.scencmd.append(cmdline)
             else:
                 if cmdtime > instime:
-                    insidx, instime = next(
-                        ((j, t) for j, t in enumerate(Stack.scentime) if t >= cmdtime),
-                        (len(Stack.scentime), Stack.scentime[-1]),
-                    )
+                    insidx = bisect_left(Stack.scentime, cmdtime)
+                    instime = Stack.scentime[min(insidx, len(Stack.scentime) - 1)]
                 Stack.scentime.insert(insidx, cmdtime)
                 Stack.scencmd.insert(insidx, cmdline)
                 insidx += 1
@@ -272,10 +423,8 @@ def stack_commands(cmdstime, cmds):
             Stack.scencmd.append(cmdline)
         else:
             if cmdtime > instime:
-                insidx, instime = next(
-                    ((j, t) for j, t in enumerate(Stack.scentime) if t >= cmdtime),
-                    (len(Stack.scentime), Stack.scentime[-1]),
-                )
+                insidx = bisect_left(Stack.scentime, cmdtime)
+                instime = Stack.scentime[min(insidx, len(Stack.scentime) - 1)]
             Stack.scentime.insert(insidx, cmdtime)
             Stack.scencmd.insert(insidx, cmdline)
             insidx += 1
@@ -307,10 +456,8 @@ def maptoggle_func(fname):
                 Stack.scencmd.append(cmdline)
             else:
                 if cmdtime > instime:
-                    insidx, instime = next(
-                        ((j, t) for j, t in enumerate(Stack.scentime) if t >= cmdtime),
-                        (len(Stack.scentime), Stack.scentime[-1]),
-                    )
+                    insidx = bisect_left(Stack.scentime, cmdtime)
+                    instime = Stack.scentime[min(insidx, len(Stack.scentime) - 1)]
                 Stack.scentime.insert(insidx, cmdtime)
                 Stack.scencmd.insert(insidx, cmdline)
                 insidx += 1
@@ -358,9 +505,14 @@ def ic(filename : 'string' = ''):
     # Reset sim and open new scenario file
     if filename:
         try:
-            for (cmdtime, cmd) in readscn(filename):
-                Stack.scentime.append(cmdtime)
-                Stack.scencmd.append(cmd)
+            scen = loadscn(filename)
+            if scen.issorted():
+                set_scendata(scen.scentime.tolist(), list(scen.scencmd))
+            else:
+                # Commands are fed from the scenario in order of time
+                scentime = scen.scentime.tolist()
+                order = np.argsort(scen.scentime, kind='stable').tolist()
+                set_scendata([scentime[i] for i in order], [scen.scencmd[i] for i in order])
             Stack.scenname, _ = os.path.splitext(os.path.basename(filename))
 
             # Remember this filename in IC.scn in scenario folder
@@ -396,7 +548,7 @@ def schedule(time: 'time', cmdline: 'string'):
         - time: the time at which the command should be executed
         - cmdline: the command line to be executed """
     # Get index of first scentime greater than 'time' as insert position
-    idx = next((i for i, t in enumerate(Stack.scentime) if t > time), len(Stack.scentime))
+    idx = bisect_right(Stack.scentime, time)
     Stack.scentime.insert(idx, time)
     Stack.scencmd.insert(idx, cmdline)
     return True
@@ -411,7 +563,7 @@ def delay(time: 'time', cmdline: 'string'):
         - cmdline: the command line to be executed after the delay """
     # Get index of first scentime greater than 'time' as insert position
     time += bs.sim.simt
-    idx = next((i for i, t in enumerate(Stack.scentime) if t > time), len(Stack.scentime))
+    idx = bisect_right(Stack.scentime, time)
     Stack.scentime.insert(idx, time)
     Stack.scencmd.insert(idx, cmdline)
     return True
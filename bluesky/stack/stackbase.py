@@ -1,4 +1,5 @@
 ''' BlueSky Stack base data and functions. '''
+from bisect import bisect_right
 import bluesky as bs
 
 
@@ -40,13 +41,14 @@ class Stack:
 def checkscen():
     """ Check if commands from the scenario buffer need to be stacked. """
     if Stack.scencmd:
-        # Find index of first timestamp exceeding bs.sim.simt
-        idx = next((i for i, t in enumerate(
-            Stack.scentime) if t > bs.sim.simt), None)
-        # Stack all commands before that time, and remove from scenario
-        stack(*Stack.scencmd[:idx])
-        del Stack.scencmd[:idx]
-        del Stack.scentime[:idx]
+        # Find index of first timestamp exceeding bs.sim.simt. The scenario
+        # commands are sorted on time, so this is a binary search.
+        idx = bisect_right(Stack.scentime, bs.sim.simt)
+        if idx:
+            # Stack all commands before that time, and remove from scenario
+            stack(*Stack.scencmd[:idx])
+            del Stack.scencmd[:idx]
+            del Stack.scentime[:idx]
 
 
 def del_scencmds(idx):
@@ -0,0 +1,10 @@
+''' Performance benchmarks for BlueSky.
+
+    The benchmark modules in this package are not collected by the test
+    runner. Each of them can be run as a script, e.g.:
+    python -m bluesky.test.benchmarks.bench_cd
+
+    The suite module runs the simulation hot paths for a range of traffic
+    counts, and keeps a history of the results:
+    python -m bluesky.test.benchmarks.suite --save
+'''
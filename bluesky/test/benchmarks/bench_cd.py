@@ -0,0 +1,67 @@
+''' Benchmark of dense (StateBased) versus sparse (SparseStateBased) conflict
+    detection for increasing traffic counts.
+
+    Usage: python -m bluesky.test.benchmarks.bench_cd [ntraf ntraf ...]
+'''
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+
+from bluesky.tools.aero import nm, ft
+from bluesky.traffic.asas import StateBased, SparseStateBased
+
+
+# Dense detection keeps about a dozen ntraf x ntraf float matrices alive:
+# skip it when this would exceed the following amount of memory [bytes]
+densemem_max = 4e9
+
+
+def synthetic_traffic(ntraf, density=5.0, seed=0):
+    ''' Create a traffic-like object with ntraf aircraft spread out randomly
+        over an area that scales with ntraf, such that the traffic density
+        (aircraft per square degree) remains constant. '''
+    rng = np.random.default_rng(seed)
+    size = np.sqrt(ntraf / density)
+    traf = SimpleNamespace(ntraf=ntraf)
+    traf.id = [f'AC{i:05d}' for i in range(ntraf)]
+    traf.lat = 52.0 + size * (rng.random(ntraf) - 0.5)
+    traf.lon = 4.0 + size * (rng.random(ntraf) - 0.5)
+    traf.alt = rng.integers(100, 400, ntraf) * 100.0 * ft
+    traf.trk = rng.random(ntraf) * 360.0
+    traf.gs = 150.0 + 100.0 * rng.random(ntraf)
+    traf.vs = np.zeros(ntraf)
+    return traf
+
+
+def timeit(fun, *args, repeat=3):
+    ''' Return the best wall-clock time of repeat calls to fun, and the
+        result of the last call. '''
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fun(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def run(ntrafs=(1000, 5000, 20000)):
+    ''' Run the benchmark for each number of aircraft in ntrafs. '''
+    print(f'{"ntraf":>8} {"dense [s]":>12} {"sparse [s]":>12} {"speedup":>9} {"nconf":>8}')
+    for ntraf in ntrafs:
+        traf = synthetic_traffic(ntraf)
+        rpz = np.ones(ntraf) * 5.0 * nm
+        hpz = np.ones(ntraf) * 1000.0 * ft
+        dtlook = np.ones(ntraf) * 300.0
+        args = (None, traf, traf, rpz, hpz, dtlook)
+        tsparse, sparse = timeit(SparseStateBased.detect, *args)
+        if 12 * 8 * ntraf ** 2 < densemem_max:
+            tdense, dense = timeit(StateBased.detect, *args)
+            assert dense[0] == sparse[0], 'Dense and sparse conflict pairs differ'
+            print(f'{ntraf:8d} {tdense:12.4f} {tsparse:12.4f} {tdense / tsparse:9.1f} {len(sparse[0]):8d}')
+        else:
+            print(f'{ntraf:8d} {"skipped":>12} {tsparse:12.4f} {"-":>9} {len(sparse[0]):8d}')
+
+
+if __name__ == '__main__':
+    run([int(n) for n in sys.argv[1:]] or (1000, 5000, 20000))
@@ -0,0 +1,69 @@
+''' Benchmark of the evaluation of conditional commands in each sim step,
+    with a mix of altitude, speed and distance conditions: the original
+    lookup of aircraft ids and distance computation per condition, compared
+    with the evaluation of the condition table.
+
+    Usage: python -m bluesky.test.benchmarks.bench_conditional [ntraf] [nsteps]
+'''
+import sys
+import time
+import numpy as np
+
+import bluesky as bs
+from bluesky.tools.aero import ft, kts
+from bluesky.tools.geo import qdrdist
+from bluesky.traffic.conditional import alttype, spdtype, postype
+
+
+def update_original(cond, ids, posdata):
+    ''' Actual values as in the original update. '''
+    acidxlst = np.array(bs.traf.id2idx(ids))
+    actdist = np.ones(cond.ncond) * 999e9
+    for j in range(cond.ncond):
+        if cond.condtype[j] == postype:
+            actdist[j] = qdrdist(bs.traf.lat[acidxlst[j]], bs.traf.lon[acidxlst[j]],
+                                 posdata[j][0], posdata[j][1])[1]
+    actual = (cond.condtype == alttype) * bs.traf.alt[acidxlst] + \
+             (cond.condtype == spdtype) * bs.traf.cas[acidxlst] + \
+             (cond.condtype == postype) * actdist
+    actdif = cond.target - actual
+    idxtrue = np.where(actdif * cond.lastdif <= 0.0)[0]
+    cond.lastdif = actdif
+    return idxtrue
+
+
+def run(ntraf=5000, nsteps=20):
+    if bs.traf is None:
+        bs.init('sim-detached')
+    bs.traf.reset()
+    rng = np.random.default_rng(0)
+    bs.traf.cre([f'KL{i:05d}' for i in range(ntraf)], 'B738', 52.0 + rng.random(ntraf),
+                4.0 + rng.random(ntraf), 90, 20000 * ft, 250 * kts)
+    cond = bs.traf.cond
+    idx = np.arange(ntraf)
+    third = ntraf // 3
+    # Targets that are never reached
+    cond.ataltcmd(idx[:third], 40000 * ft, 'ECHO ALT')
+    cond.atspdcmd(idx[third:2 * third], 400 * kts, 'ECHO SPD')
+    for i in idx[2 * third:].tolist():
+        cond.atdistcmd(i, 60.0, 4.0, 10.0, 'ECHO DIST')
+
+    ids = [bs.traf.id[i] for i in cond.acidx.tolist()]
+    posdata = list(zip(cond.reflat.tolist(), cond.reflon.tolist()))
+    t0 = time.perf_counter()
+    for _ in range(nsteps):
+        update_original(cond, ids, posdata)
+    told = (time.perf_counter() - t0) / nsteps
+    t0 = time.perf_counter()
+    for _ in range(nsteps):
+        cond.update()
+    tnew = (time.perf_counter() - t0) / nsteps
+    assert cond.ncond == len(ids)
+    bs.traf.reset()
+
+    print(f'{len(ids)} conditions: original update {1e3 * told:.1f} ms, '
+          f'condition table {1e3 * tnew:.2f} ms ({told / tnew:.0f}x)')
+
+
+if __name__ == '__main__':
+    run(*[int(n) for n in sys.argv[1:]])
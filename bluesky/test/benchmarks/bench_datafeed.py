@@ -0,0 +1,71 @@
+''' Benchmark of the datafeed update step with many datafeed aircraft, which
+    looks up the traffic index of every datafeed callsign each step.
+    Compares misc.get_indices with the original broadcasting implementation.
+
+    Usage: python -m bluesky.test.benchmarks.bench_datafeed [ntraf ...]
+'''
+import sys
+import time
+import numpy as np
+
+import bluesky as bs
+from bluesky.tools import misc
+from bluesky.tools.aero import ft, kts
+
+
+def get_indices_broadcast(arr, items, index=None):
+    ''' Original get_indices, which compares all items with all elements. '''
+    if isinstance(items, (str, int, float)):
+        items = [items]
+    if len(items) == 0 or len(arr) == 0:
+        return np.array([], dtype=int)
+    return np.nonzero(np.array(items)[:, None] == arr)[1]
+
+
+def timeit(fun, nrep=10):
+    ''' Return the average time of nrep calls to fun. '''
+    t0 = time.perf_counter()
+    for _ in range(nrep):
+        fun()
+    return (time.perf_counter() - t0) / nrep
+
+
+def run(ntrafs=(1000, 5000)):
+    if bs.traf is None:
+        bs.init('sim-detached')
+
+    for ntraf in ntrafs:
+        bs.traf.reset()
+        rng = np.random.default_rng(0)
+        acid = [f'AC{i:05d}' for i in range(ntraf)]
+        bs.traf.cre(acid, 'B744', 50.0 + 5.0 * rng.random(ntraf),
+                    2.0 + 5.0 * rng.random(ntraf), 360.0 * rng.random(ntraf),
+                    np.full(ntraf, 20000 * ft), np.full(ntraf, 250 * kts))
+        bs.traf.trafdatafeed.datafeedids = list(acid)
+        bs.traf.trafdatafeed.store_prev()
+
+        # Half of the aircraft receive new track data
+        iupd = rng.permutation(ntraf)[:ntraf // 2]
+        trackdata = dict(id=np.array(acid)[iupd], lat=bs.traf.lat[iupd],
+                         lon=bs.traf.lon[iupd], hdg=bs.traf.hdg[iupd],
+                         alt=bs.traf.alt[iupd], gs=bs.traf.gs[iupd])
+
+        def update():
+            bs.traf.trafdatafeed.trackdata = dict(trackdata)
+            bs.traf.trafdatafeed.update()
+
+        tnew = timeit(update)
+        get_indices = misc.get_indices
+        misc.get_indices = get_indices_broadcast
+        try:
+            told = timeit(update)
+        finally:
+            misc.get_indices = get_indices
+
+        print(f'{ntraf:6d} datafeed aircraft: broadcast {1e3 * told:8.1f} ms, '
+              f'indexed {1e3 * tnew:6.1f} ms ({told / tnew:.0f}x)')
+    bs.traf.reset()
+
+
+if __name__ == '__main__':
+    run([int(n) for n in sys.argv[1:]] or (1000, 5000))
@@ -0,0 +1,59 @@
+''' Benchmark of a periodic logger with many variables, comparing the time
+    spent in the simulation thread per log call (copying the sample into a
+    log buffer) with the total time until the writer thread has written
+    all samples, for the CSV and the binary (NPZ) log format.
+
+    Usage: python -m bluesky.test.benchmarks.bench_datalog [ntraf]
+'''
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+import bluesky as bs
+from bluesky.tools import datalog
+from bluesky.tools.aero import ft, kts
+
+
+def dirsize(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def run(ntraf=5000, nlog=20):
+    if bs.traf is None:
+        bs.init('sim-detached')
+
+    bs.traf.reset()
+    rng = np.random.default_rng(0)
+    bs.traf.cre([f'AC{i:05d}' for i in range(ntraf)], 'B744',
+                50.0 + 5.0 * rng.random(ntraf), 2.0 + 5.0 * rng.random(ntraf),
+                360.0 * rng.random(ntraf), np.full(ntraf, 20000 * ft),
+                np.full(ntraf, 250 * kts))
+
+    variables = ['traf.id', 'traf.lat', 'traf.lon', 'traf.alt', 'traf.hdg',
+                 'traf.trk', 'traf.tas', 'traf.gs', 'traf.vs', 'traf.cas']
+    print(f'{ntraf} aircraft, {len(variables)} variables')
+    with tempfile.TemporaryDirectory() as path:
+        bs.settings.log_path = path
+        for fmt in ('CSV', 'NPZ'):
+            logger = datalog.CSVLogger('BENCH' + fmt, 0.0, 'Benchmark', fmt)
+            logger.addvars(list(variables))
+            logger.start()
+            t0 = time.perf_counter()
+            for _ in range(nlog):
+                logger.log()
+            tlog = (time.perf_counter() - t0) / nlog
+            fname = logger.fname
+            logger.reset()
+            datalog.flush()
+            twall = time.perf_counter() - t0
+            print(f'{fmt}: {1e3 * tlog:7.2f} ms per log call in the sim thread, '
+                  f'{twall:5.2f} s total, {dirsize(fname) / 1e6:6.1f} MB')
+    bs.traf.reset()
+
+
+if __name__ == '__main__':
+    run(*[int(n) for n in sys.argv[1:]])
@@ -0,0 +1,56 @@
+''' Benchmark of the HighRes meteo wind interpolation, with a timeframe on
+    the 0.1 degree grid of the original meteo data: the original DataFrame
+    lookups per aircraft, compared with the interpolation of all aircraft
+    in the gridded timeframe.
+
+    Usage: python -m bluesky.test.benchmarks.bench_meteo [ntraf] [nlev]
+'''
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from bluesky.tools import Functions
+from bluesky.traffic.meteocube import MeteoFrame, columns
+
+
+def timeframe(rng, nlev):
+    ''' Rows of a timeframe covering lat 49..55.9 and lon -1..9.9. '''
+    lat, lon = np.meshgrid(np.round(np.arange(490, 560) / 10, 1),
+                           np.round(np.arange(-10, 100) / 10, 1), indexing='ij')
+    ncol = lat.size
+    alt = np.sort(rng.uniform(0.0, 45000.0, (ncol, nlev)), axis=1)[:, ::-1]
+    return pd.DataFrame(dict(timestamp_data=0, timestamp_prediction=0,
+                             lon=np.repeat(lon.ravel(), nlev), lat=np.repeat(lat.ravel(), nlev),
+                             alt=alt.ravel(), uwind=rng.normal(0.0, 20.0, ncol * nlev),
+                             vwind=rng.normal(0.0, 20.0, ncol * nlev)))
+
+
+def run(ntraf=5000, nlev=30):
+    rng = np.random.default_rng(0)
+    df = timeframe(rng, nlev)
+    lat = rng.uniform(49.0, 55.9, ntraf)
+    lon = rng.uniform(-1.0, 9.9, ntraf)
+    alt = rng.uniform(0.0, 40000.0, ntraf)
+
+    t0 = time.perf_counter()
+    frame = MeteoFrame(**{col: df[col].to_numpy() for col in columns})
+    tbuild = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    frame.interpolate(lat, lon, alt)
+    tgrid = time.perf_counter() - t0
+
+    # The original lookups take long: time a few aircraft
+    nold = 10
+    t0 = time.perf_counter()
+    for i in range(nold):
+        Functions.find_datapoint_timeframe(df, [0, alt[i], lat[i], lon[i]])
+    told = (time.perf_counter() - t0) / nold
+
+    print(f'Timeframe of {len(df)} rows: gridded in {1e3 * tbuild:.0f} ms')
+    print(f'{ntraf} aircraft: DataFrame lookups {ntraf * told:.1f} s (estimated from {nold}), '
+          f'grid interpolation {1e3 * tgrid:.1f} ms')
+
+
+if __name__ == '__main__':
+    run(*[int(n) for n in sys.argv[1:]])
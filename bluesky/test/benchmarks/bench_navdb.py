@@ -0,0 +1,160 @@
+''' Benchmark of scenario route parsing with many custom waypoints with
+    duplicate names, as in the LVNL route scenarios: a large set of DEFWPT
+    commands, followed by CRE, ADDWPT, and AFTER commands for all aircraft.
+    Compares the indexed navdb lookups with the original linear list search.
+    Also compares nearest airport and in-box queries with and without the
+    spatial index of the navdb.
+
+    Usage: python -m bluesky.test.benchmarks.bench_navdb [ntraf] [nwpt]
+'''
+import sys
+import time
+import numpy as np
+
+import bluesky as bs
+from bluesky.stack import simstack
+from bluesky.tools import geo
+
+
+def getwpidx_linear(txt, reflat=999999., reflon=999999):
+    ''' Original getwpidx, which searches the waypoint list for each
+        occurrence of the name. '''
+    navdb, name = bs.navdb, txt.upper()
+    wpid = navdb.wpid
+    try:
+        i = wpid.index(name)
+    except ValueError:
+        return -1
+    if not reflat < 99999.:
+        return i
+    idx = [i]
+    while True:
+        try:
+            i = wpid.index(name, i + 1)
+            idx.append(i)
+        except ValueError:
+            break
+    imin = idx[0]
+    dmin = geo.kwikdist(reflat, reflon, navdb.wplat[imin], navdb.wplon[imin])
+    for i in idx[1:]:
+        d = geo.kwikdist(reflat, reflon, navdb.wplat[i], navdb.wplon[i])
+        if d < dmin:
+            imin, dmin = i, d
+    return imin
+
+
+def getaptidx_linear(txt, reflat=999999., reflon=999999.):
+    ''' Original getaptidx, with a linear search of the airport list. '''
+    try:
+        return bs.navdb.aptid.index(txt.upper())
+    except ValueError:
+        return -1
+
+
+def scenario(ntraf, nwpt, rng):
+    ''' Create the DEFWPT commands, and the route commands of a scenario. '''
+    # Every custom waypoint name is used three times
+    names = [f'RT{i:04d}' for i in range(nwpt // 3)]
+    defwpt = [f'DEFWPT {names[i % len(names)]} {50.0 + 5.0 * rng.random():.4f} '
+              f'{2.0 + 5.0 * rng.random():.4f}' for i in range(nwpt)]
+    navwpts = list(bs.navdb.wpid)[:500]
+    routes = list()
+    for i in range(ntraf):
+        acid = f'KL{i:04d}'
+        routes.append(f'CRE {acid} B738 {50.0 + 5.0 * rng.random():.4f} '
+                      f'{2.0 + 5.0 * rng.random():.4f} 90 FL200 250')
+        routes.append(f'{acid} DEST EHAM')
+        wpts = list(rng.choice(names, 6)) + list(rng.choice(navwpts, 2))
+        for wpt in wpts:
+            routes.append(f'ADDWPT {acid} {wpt} FL100 220')
+        for wpt in rng.choice(names, 4):
+            routes.append(f'{acid} AFTER {wpts[0]} ADDWPT {wpt}')
+    return defwpt, routes
+
+
+def process(cmds):
+    ''' Return the time it takes to process commands cmds, and the part
+        of that time spent in waypoint and airport lookups. '''
+    tlookup = [0.0]
+
+    def timed(fun):
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            ret = fun(*args, **kwargs)
+            tlookup[0] += time.perf_counter() - t0
+            return ret
+        return wrapper
+
+    getwpidx, getaptidx = bs.navdb.getwpidx, bs.navdb.getaptidx
+    bs.navdb.getwpidx, bs.navdb.getaptidx = timed(getwpidx), timed(getaptidx)
+    try:
+        t0 = time.perf_counter()
+        for cmd in cmds:
+            bs.stack.stack(cmd)
+        simstack.process()
+        return time.perf_counter() - t0, tlookup[0]
+    finally:
+        bs.navdb.getwpidx, bs.navdb.getaptidx = getwpidx, getaptidx
+
+
+def run(ntraf=500, nwpt=20000):
+    if bs.traf is None:
+        bs.init('sim-detached')
+    bs.scr.echo = lambda *args, **kwargs: None
+
+    bs.navdb.reset()
+    bs.traf.reset()
+    defwpt, routes = scenario(ntraf, nwpt, np.random.default_rng(0))
+    tdef, _ = process(defwpt)
+    print(f'{nwpt} DEFWPT commands: {1e3 * tdef:.0f} ms')
+
+    tnew, tnewlookup = process(routes)
+    nwp = np.sum([route.nwp for route in bs.traf.ap.route])
+    bs.traf.reset()
+    # The original navdb had plain lists of names
+    wpid, aptid = bs.navdb.wpid, bs.navdb.aptid
+    bs.navdb.wpid, bs.navdb.aptid = list(wpid), list(aptid)
+    bs.navdb.getwpidx, bs.navdb.getaptidx = getwpidx_linear, getaptidx_linear
+    try:
+        told, toldlookup = process(routes)
+    finally:
+        del bs.navdb.getwpidx, bs.navdb.getaptidx
+        bs.navdb.wpid, bs.navdb.aptid = wpid, aptid
+    bs.traf.reset()
+    print(f'{len(routes)} route commands ({ntraf} aircraft, {nwp} waypoints): '
+          f'linear {1e3 * told:.0f} ms, indexed {1e3 * tnew:.0f} ms')
+    print(f'of which navdb lookups: linear {1e3 * toldlookup:.0f} ms, indexed '
+          f'{1e3 * tnewlookup:.0f} ms ({toldlookup / tnewlookup:.0f}x)')
+
+
+def spatial(nquery=1000):
+    ''' Time nearest airport and in-box waypoint queries. '''
+    navdb = bs.navdb
+    rng = np.random.default_rng(1)
+    lat = 40.0 + 20.0 * rng.random(nquery)
+    lon = -10.0 + 30.0 * rng.random(nquery)
+    results = dict()
+    for tree in (None, navdb.apttree):
+        t0 = time.perf_counter()
+        for la, lo in zip(lat, lon):
+            navdb.getinear(navdb.aptlat, navdb.aptlon, la, lo, tree)
+        results[tree is None] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    navdb.getapinear(lat, lon)
+    tbulk = time.perf_counter() - t0
+    print(f'{nquery} nearest airport queries ({len(navdb.aptlat)} airports): '
+          f'scan {1e3 * results[True]:.1f} ms, index {1e3 * results[False]:.1f} ms, '
+          f'bulk {1e3 * tbulk:.1f} ms')
+
+    for tree in (None, navdb.wptree):
+        t0 = time.perf_counter()
+        for la, lo in zip(lat, lon):
+            navdb.getinside(navdb.wplat, navdb.wplon, la, la + 0.5, lo, lo + 1.0, tree)
+        results[tree is None] = time.perf_counter() - t0
+    print(f'{nquery} in-box waypoint queries ({len(navdb.wplat)} waypoints): '
+          f'scan {1e3 * results[True]:.1f} ms, index {1e3 * results[False]:.1f} ms')
+
+
+if __name__ == '__main__':
+    run(*[int(n) for n in sys.argv[1:]])
+    spatial()
@@ -0,0 +1,48 @@
+''' Benchmark of encoding and decoding of ACDATA-like stream data with the
+    dict-based numpy codec, and with separate zero-copy array frames.
+
+    Usage: python -m bluesky.test.benchmarks.bench_npcodec [ntraf]
+'''
+import sys
+import time
+import msgpack
+import numpy as np
+
+from bluesky.network.npcodec import encode_ndarray, decode_ndarray, \
+    packb_frames, unpackb_frames
+
+
+def acdata(ntraf, nfloat=40):
+    ''' Stream data with nfloat per-aircraft float arrays and some strings. '''
+    data = {f'var{i}': np.random.rand(ntraf) for i in range(nfloat)}
+    data['id'] = [f'AC{i:05d}' for i in range(ntraf)]
+    return data
+
+
+def run(ntraf=2000, repeat=200):
+    ''' Time packing and unpacking of ACDATA-like data with both codecs. '''
+    data = acdata(ntraf)
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        msg = msgpack.packb(data, default=encode_ndarray, use_bin_type=True)
+    tenc = (time.perf_counter() - t0) / repeat
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        msgpack.unpackb(msg, object_hook=decode_ndarray, raw=False)
+    tdec = (time.perf_counter() - t0) / repeat
+    print(f'dict format:  encode {1e3 * tenc:.3f} ms, decode {1e3 * tdec:.3f} ms')
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        frames = packb_frames(data)
+    tenc = (time.perf_counter() - t0) / repeat
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        unpackb_frames(frames)
+    tdec = (time.perf_counter() - t0) / repeat
+    print(f'frame format: encode {1e3 * tenc:.3f} ms, decode {1e3 * tdec:.3f} ms')
+
+
+if __name__ == '__main__':
+    run(*[int(n) for n in sys.argv[1:]])
@@ -0,0 +1,74 @@
+''' Benchmark of the remaining route distance of all aircraft, computed
+    with a loop over the Route objects and with the columnar route table,
+    and of the LVNL DTG update that uses the route table.
+
+    Usage: python -m bluesky.test.benchmarks.bench_routes [ntraf] [nwp]
+'''
+import sys
+import time
+import numpy as np
+
+import bluesky as bs
+from bluesky.traffic.route import Route
+from bluesky.tools.aero import ft, kts
+
+
+def remaining_loop():
+    remaining = np.zeros(bs.traf.ntraf)
+    for idx, route in enumerate(bs.traf.ap.route):
+        if 0 <= route.iactwp < route.nwp:
+            remaining[idx] = np.sum(route.wpdistto[route.iactwp + 1:])
+    return remaining
+
+
+def timeit(fun, nrep=10):
+    ''' Return the average time of nrep calls to fun. '''
+    t0 = time.perf_counter()
+    for _ in range(nrep):
+        fun()
+    return (time.perf_counter() - t0) / nrep
+
+
+def run(ntraf=5000, nwp=10):
+    if bs.traf is None:
+        bs.init('sim-detached')
+
+    bs.traf.reset()
+    rng = np.random.default_rng(0)
+    bs.traf.cre([f'AC{i:05d}' for i in range(ntraf)], 'B744',
+                50.0 + 5.0 * rng.random(ntraf), 2.0 + 5.0 * rng.random(ntraf),
+                360.0 * rng.random(ntraf), np.full(ntraf, 20000 * ft),
+                np.full(ntraf, 250 * kts))
+    for idx, route in enumerate(bs.traf.ap.route):
+        for _ in range(nwp):
+            route.addwpt(idx, bs.traf.id[idx], Route.wplatlon,
+                         50.0 + 5.0 * rng.random(), 2.0 + 5.0 * rng.random())
+        route.iactwp = 0
+
+    table = bs.traf.ap.routetable
+    t0 = time.perf_counter()
+    table.sync()
+    tsync = time.perf_counter() - t0
+
+    # One percent of the aircraft pass a waypoint each step
+    def step():
+        for route in rng.choice(bs.traf.ap.route, ntraf // 100):
+            route.iactwp = min(route.iactwp + 1, route.nwp - 1)
+        return table.remaining()
+
+    tloop = timeit(remaining_loop)
+    ttable = timeit(step)
+    assert np.allclose(remaining_loop(), table.remaining())
+    print(f'{ntraf} aircraft, {nwp} waypoints: initial sync {1e3 * tsync:.1f} ms')
+    print(f'Remaining distance: loop {1e3 * tloop:.2f} ms, '
+          f'table {1e3 * ttable:.2f} ms ({tloop / ttable:.0f}x)')
+
+    for idx in range(0, ntraf, 2):
+        bs.traf.lvnlvars.setarr(idx, 'NIRSI_GAL01', False)
+    tdtg = timeit(bs.traf.lvnlvars.update)
+    print(f'LVNL DTG update: {1e3 * tdtg:.2f} ms')
+    bs.traf.reset()
+
+
+if __name__ == '__main__':
+    run(*[int(n) for n in sys.argv[1:]])
@@ -0,0 +1,94 @@
+''' Benchmark of loading a large replay scenario, and feeding its commands to
+    the stack: reading the scenario text, compared with loading the compiled
+    scenario file, the linear and binary search of due commands in each sim
+    step, and splitting a batch file into scenarios.
+
+    Usage: python -m bluesky.test.benchmarks.bench_scenario [nlines] [nscen]
+'''
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+import bluesky as bs
+from bluesky.stack import simstack, scenariofile
+from bluesky.stack.stackbase import Stack, checkscen
+from bluesky.network.server import split_scenarios
+
+
+def scenario(fname, nlines, nscen, rng):
+    ''' Write a batch file with nscen scenarios of position updates, with a
+        few commands per second. '''
+    nper = nlines // nscen
+    with open(fname, 'w') as f:
+        for iscen in range(nscen):
+            f.write(f'00:00:00.00>SCEN REPLAY{iscen}\n')
+            for i in range(nper):
+                t = i / 4.0
+                f.write(f'{int(t // 3600):02d}:{int(t // 60 % 60):02d}:{t % 60:05.2f}>'
+                        f'MOVE KL{rng.integers(1000):04d} {50.0 + 5.0 * rng.random():.4f} '
+                        f'{2.0 + 5.0 * rng.random():.4f} FL{rng.integers(100, 400)}\n')
+
+
+def checkscen_linear():
+    ''' Original feed, with a linear search of the first command that is not due. '''
+    if Stack.scencmd:
+        idx = next((i for i, t in enumerate(Stack.scentime) if t > bs.sim.simt), None)
+        bs.stack.stack(*Stack.scencmd[:idx])
+        del Stack.scencmd[:idx]
+        del Stack.scentime[:idx]
+
+
+def feed(scen, check, nsteps=2000):
+    ''' Time nsteps sim steps of feeding scenario commands to the stack. '''
+    Stack.reset()
+    bs.stack.set_scendata(scen.scentime.tolist(), list(scen.scencmd))
+    t0 = time.perf_counter()
+    for i in range(nsteps):
+        bs.sim.simt = 0.05 * i
+        check()
+        Stack.clear()
+    return time.perf_counter() - t0
+
+
+def run(nlines=300000, nscen=10):
+    if bs.traf is None:
+        bs.init('sim-detached')
+    bs.settings.scenario_compile_minsize = 0
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, 'replay.scn')
+        scenario(fname, nlines, nscen, np.random.default_rng(0))
+
+        t0 = time.perf_counter()
+        lines = list(simstack.readscnlines(fname))
+        ttext = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        scenariofile.load(fname, simstack.readscnlines)
+        tcompile = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        scen = scenariofile.load(fname, simstack.readscnlines)
+        tload = time.perf_counter() - t0
+        print(f'{len(lines)} scenario lines: read text {1e3 * ttext:.0f} ms, '
+              f'compile {1e3 * tcompile:.0f} ms, load compiled {1e3 * tload:.0f} ms')
+
+    # Feed the first scenario of the batch
+    first = scenariofile.Scenario.fromlines(list(scen)[:scen.scenidx[1]])
+    print(f'2000 sim steps: linear feed {1e3 * feed(first, checkscen_linear):.1f} ms, '
+          f'binary search feed {1e3 * feed(first, checkscen):.1f} ms')
+    Stack.reset()
+
+    scentime, scencmd = scen.scentime.tolist(), scen.scencmd
+    t0 = time.perf_counter()
+    list(split_scenarios(scentime, scencmd))
+    tscan = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    list(split_scenarios(scentime, scencmd, scen.scenidx.tolist()))
+    tidx = time.perf_counter() - t0
+    print(f'Split in {nscen} scenarios: text scan {1e3 * tscan:.1f} ms, '
+          f'compiled SCEN indices {1e3 * tidx:.1f} ms')
+
+
+if __name__ == '__main__':
+    run(*[int(n) for n in sys.argv[1:]])
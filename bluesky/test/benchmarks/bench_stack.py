@@ -0,0 +1,89 @@
+''' Benchmark of replaying a scenario file with the compiled stack dispatch,
+    as in batch simulations: the scenario is loaded several times after a
+    simulation reset, and all its commands are processed. Compares the cached, compiled lines
+    with compiling each line on every execution, without bulk calls.
+
+    Usage: python -m bluesky.test.benchmarks.bench_stack [ntraf] [nreplay]
+'''
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+import bluesky as bs
+from bluesky.stack import simstack, get_commands
+from bluesky.stack.stackbase import Stack
+from bluesky.tools.aero import ft, kts
+
+
+def scenario(fname, ntraf, rng):
+    ''' Write a scenario in which all aircraft get a number of altitude,
+        speed and vertical speed commands at the same times. '''
+    with open(fname, 'w') as f:
+        for t in range(1, 6):
+            for i in range(ntraf):
+                f.write(f'00:00:{t:02d}.00>ALT KL{i:04d} FL{100 + 10 * rng.integers(20)}\n')
+            for i in range(ntraf):
+                f.write(f'00:00:{t:02d}.00>SPD KL{i:04d} {200 + rng.integers(100)}\n')
+            for i in range(ntraf):
+                f.write(f'00:00:{t:02d}.00>VS KL{i:04d} {-1000 - 100 * rng.integers(10)}\n')
+            for i in range(ntraf):
+                f.write(f'00:00:{t:02d}.00>LNAV KL{i:04d} OFF\n')
+
+
+def replay(fname, ntraf, nreplay):
+    ''' Return the time it takes to read and process scenario fname nreplay
+        times. The aircraft are created outside of the timed part. '''
+    dt = 0.0
+    for _ in range(nreplay):
+        bs.sim.reset()
+        bs.traf.cre([f'KL{i:04d}' for i in range(ntraf)], 'B738', 52.0, 4.0, 90,
+                    20000 * ft, 250 * kts)
+        t0 = time.perf_counter()
+        # Load the scenario like IC, which also resets the simulation
+        for cmdtime, cmdline in simstack.readscn(fname):
+            Stack.scentime.append(cmdtime)
+            Stack.scencmd.append(cmdline)
+        for t in range(1, 6):
+            bs.sim.simt = float(t)
+            simstack.process()
+        dt += time.perf_counter() - t0
+    return dt
+
+
+def run(ntraf=500, nreplay=5):
+    if bs.traf is None:
+        bs.init('sim-detached')
+    bs.scr.echo = lambda *args, **kwargs: None
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, 'bench.scn')
+        scenario(fname, ntraf, np.random.default_rng(0))
+        nlines = 20 * ntraf
+
+        # Compile each line on every execution, and call commands one by one
+        getcompiled = simstack.getcompiled
+        bulkcmds = {cmdobj: cmdobj.bulk for cmdobj in get_commands().values() if cmdobj.bulk}
+        simstack.getcompiled = simstack.CompiledLine
+        for cmdobj in bulkcmds:
+            cmdobj.bulk = tuple()
+        try:
+            told = replay(fname, ntraf, nreplay)
+        finally:
+            simstack.getcompiled = getcompiled
+            for cmdobj, bulk in bulkcmds.items():
+                cmdobj.bulk = bulk
+
+        simstack.compiled.clear()
+        simstack.scncache.clear()
+        tnew = replay(fname, ntraf, nreplay)
+        bs.sim.reset()
+
+    print(f'{nreplay} replays of {nlines} scenario lines ({ntraf} aircraft): '
+          f'uncached {1e3 * told:.0f} ms, compiled {1e3 * tnew:.0f} ms '
+          f'({told / tnew:.1f}x)')
+
+
+if __name__ == '__main__':
+    run(*[int(n) for n in sys.argv[1:]])
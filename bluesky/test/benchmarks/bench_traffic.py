@@ -0,0 +1,49 @@
+''' Micro-benchmark of aircraft creation and deletion through Traffic.cre and
+    Traffic.delete, one aircraft at a time, and of id lookups with
+    Traffic.id2idx.
+
+    Usage: python -m bluesky.test.benchmarks.bench_traffic [ntraf]
+'''
+import sys
+import time
+import numpy as np
+
+import bluesky as bs
+from bluesky.tools.aero import ft, kts
+
+
+def run(ntraf=10000):
+    ''' Create ntraf aircraft one by one, look up all of them, and delete
+        them again. '''
+    if bs.traf is None:
+        bs.init('sim-detached')
+    bs.traf.reset()
+
+    rng = np.random.default_rng(0)
+    lat = 50.0 + 5.0 * rng.random(ntraf)
+    lon = 2.0 + 5.0 * rng.random(ntraf)
+    hdg = 360.0 * rng.random(ntraf)
+
+    t0 = time.perf_counter()
+    for i in range(ntraf):
+        bs.traf.cre(f'AC{i:05d}', 'B744', lat[i], lon[i], hdg[i], 20000 * ft, 250 * kts)
+    tcre = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(ntraf):
+        bs.traf.id2idx(f'AC{i:05d}')
+    tidx = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    while bs.traf.ntraf:
+        bs.traf.delete(bs.traf.ntraf // 2)
+    tdel = time.perf_counter() - t0
+
+    print(f'Created {ntraf} aircraft in {tcre:.2f} s ({1e6 * tcre / ntraf:.0f} us/aircraft)')
+    print(f'Looked up {ntraf} aircraft in {tidx:.2f} s ({1e6 * tidx / ntraf:.1f} us/aircraft)')
+    print(f'Deleted {ntraf} aircraft in {tdel:.2f} s ({1e6 * tdel / ntraf:.0f} us/aircraft)')
+    return tcre, tidx, tdel
+
+
+if __name__ == '__main__':
+    run(*[int(n) for n in sys.argv[1:]])
@@ -0,0 +1,46 @@
+''' Benchmark of wind field interpolation with a GFS-like gridded wind field
+    with altitude profiles, for the IDW, GRID and KNN interpolation methods.
+
+    Usage: python -m bluesky.test.benchmarks.bench_wind [ntraf]
+'''
+import sys
+import time
+import numpy as np
+
+import bluesky as bs
+from bluesky.traffic.windfield import Windfield
+from bluesky.tools.aero import ft
+
+
+def run(ntraf=5000, nlat=40, nlon=60):
+    if bs.traf is None:
+        bs.init('sim-detached')
+
+    rng = np.random.default_rng(0)
+    wind = Windfield()
+    alts = np.linspace(0.0, 45000.0 * ft, 20)
+    for lat in np.linspace(45.0, 60.0, nlat):
+        for lon in np.linspace(-5.0, 15.0, nlon):
+            wind.addpoint(lat, lon, 360.0 * rng.random(len(alts)),
+                          30.0 * rng.random(len(alts)), alts)
+
+    lat = 45.0 + 15.0 * rng.random(ntraf)
+    lon = -5.0 + 20.0 * rng.random(ntraf)
+    alt = 40000.0 * ft * rng.random(ntraf)
+
+    print(f'{ntraf} aircraft, {wind.nvec} wind points')
+    for mode in ('IDW', 'GRID', 'KNN'):
+        wind.mode = mode
+        wind.getdata(lat, lon, alt)
+        nrep = 2 if mode == 'IDW' else 20
+        t0 = time.perf_counter()
+        for _ in range(nrep):
+            # Aircraft move a little each call
+            lat += 1e-3
+            wind.getdata(lat, lon, alt)
+        dt = (time.perf_counter() - t0) / nrep
+        print(f'{mode:5s}: {1e3 * dt:8.2f} ms per call')
+
+
+if __name__ == '__main__':
+    run(*[int(n) for n in sys.argv[1:]])
@@ -0,0 +1,295 @@
+''' Benchmark suite of the simulation hot paths, for increasing traffic counts.
+
+    The simulation runs headless in a detached node, with synthetic traffic
+    of constant density from the SYNTHETIC plugin (SYN DENSITY). Each case
+    reports the best wall-clock time per call. Results can be appended to a
+    history file, and are compared with the previous saved run, to track
+    the performance of the simulation over time.
+
+    Usage: python -m bluesky.test.benchmarks.suite [-n 100 1000 ...] [-k name]
+                                                   [--save] [--history file]
+'''
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+import msgpack
+import numpy as np
+
+import bluesky as bs
+from bluesky.core import simtime
+from bluesky.core.entity import getproxied
+from bluesky.core.plugin import Plugin
+from bluesky.network.npcodec import encode_ndarray
+from bluesky.stack import simstack
+from bluesky.tools import areafilter
+from bluesky.tools.aero import ft
+from bluesky.traffic.asas import StateBased, SparseStateBased, MVP
+
+
+# Traffic counts of a default run
+ntraf_default = (100, 1000, 5000, 20000)
+
+# Dense detection keeps about a dozen ntraf x ntraf float matrices alive:
+# skip it when this would exceed the following amount of memory [bytes]
+densemem_max = 4e9
+
+# Benchmark cases in order of registration: name -> function(ntraf)
+cases = dict()
+
+
+def case(fun):
+    ''' Register benchmark case fun(ntraf), which returns the time [s] per
+        call of the measured function, or None when it is skipped. '''
+    cases[fun.__name__.replace('_', '.')] = fun
+    return fun
+
+
+def timeit(fun, setup=None, repeat=3, mintime=0.01):
+    ''' Return the best time per call of fun over repeat measurements. When
+        setup is given, it is called (untimed) before each measurement of
+        one call, otherwise fun is called as often as needed to measure at
+        least mintime. '''
+    number = 1
+    if setup is None:
+        t0 = time.perf_counter()
+        fun()
+        dt = time.perf_counter() - t0
+        number = max(1, int(mintime / max(dt, 1e-9)))
+    best = np.inf
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fun()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def synthetic(ntraf):
+    ''' Reset the simulation, and create ntraf aircraft with SYN DENSITY. '''
+    Plugin.loaded_plugins['SYNTHETIC'].imp.density(ntraf)
+
+
+def detect(cd):
+    ''' Conflict detection of all traffic with implementation cd. '''
+    return cd.detect(bs.traf, bs.traf, bs.traf.cd.rpz, bs.traf.cd.hpz, bs.traf.cd.dtlookahead)
+
+
+@case
+def traffic_cre(ntraf):
+    return timeit(lambda: synthetic(ntraf))
+
+
+@case
+def traffic_delete(ntraf):
+    ''' Time per aircraft of deleting 100 aircraft one by one. '''
+    ndel = min(100, ntraf)
+    rng = np.random.default_rng(0)
+
+    def delete():
+        for n in range(ntraf, ntraf - ndel, -1):
+            bs.traf.delete(int(rng.integers(n)))
+    return timeit(delete, setup=lambda: synthetic(ntraf)) / ndel
+
+
+@case
+def traffic_update(ntraf):
+    ''' Time per simulation step of the traffic update, averaged over 20
+        steps: one interval of the stages with a 1 s update interval. '''
+    synthetic(ntraf)
+    bs.sim.simdt = bs.settings.simdt
+
+    def update():
+        for _ in range(20):
+            simtime.step()
+            bs.traf.update()
+    return timeit(update) / 20
+
+
+@case
+def cd_statebased(ntraf):
+    if 12 * 8 * ntraf ** 2 > densemem_max:
+        return None
+    synthetic(ntraf)
+    StateBased.select()
+    return timeit(lambda: detect(bs.traf.cd))
+
+
+@case
+def cd_sparsestatebased(ntraf):
+    synthetic(ntraf)
+    SparseStateBased.select()
+    return timeit(lambda: detect(bs.traf.cd))
+
+
+@case
+def cr_mvp(ntraf):
+    synthetic(ntraf)
+    SparseStateBased.select()
+    MVP.select()
+    bs.traf.cd.update(bs.traf, bs.traf)
+    return timeit(lambda: bs.traf.cr.resolve(bs.traf.cd, bs.traf, bs.traf))
+
+
+@case
+def autopilot_update(ntraf):
+    synthetic(ntraf)
+    return timeit(bs.traf.ap.update)
+
+
+@case
+def performance_update(ntraf):
+    ''' Update of the selected performance model (OpenAP by default),
+        bypassing its update interval. '''
+    synthetic(ntraf)
+    perf = getproxied(bs.traf.perf)
+    update = type(perf).update.__func__
+    return timeit(lambda: update(perf, dt=bs.settings.performance_dt))
+
+
+@case
+def wind_getdata(ntraf):
+    ''' Wind at the aircraft positions, in a field of 100 wind profiles. '''
+    synthetic(ntraf)
+    rng = np.random.default_rng(0)
+    size = np.sqrt(ntraf / 5.0)
+    for lat, lon in size * (rng.random((100, 2)) - 0.5):
+        bs.traf.wind.addpoint(lat, lon, 360.0 * rng.random(5), 50.0 * rng.random(5),
+                              np.arange(5) * 10000.0 * ft)
+    return timeit(lambda: bs.traf.wind.getdata(bs.traf.lat, bs.traf.lon, bs.traf.alt))
+
+
+@case
+def areafilter_checkinside(ntraf):
+    ''' Aircraft inside a polygon with 40 vertices around half of the traffic. '''
+    synthetic(ntraf)
+    radius = 0.5 * np.sqrt(ntraf / 5.0) / np.sqrt(np.pi)
+    angle = np.linspace(0.0, 2.0 * np.pi, 40, endpoint=False)
+    coords = np.column_stack((radius * np.cos(angle), radius * np.sin(angle))).ravel()
+    areafilter.defineArea('BENCHPOLY', 'POLY', coords.tolist())
+    return timeit(lambda: areafilter.checkInside('BENCHPOLY', bs.traf.lat, bs.traf.lon, bs.traf.alt))
+
+
+@case
+def screenio_acdata(ntraf):
+    ''' Collection and serialization of the ACDATA stream, as sent by a
+        networked node. '''
+    synthetic(ntraf)
+    send_stream = bs.net.send_stream
+    bs.net.send_stream = lambda name, data: msgpack.packb(data, default=encode_ndarray,
+                                                          use_bin_type=True)
+    try:
+        return timeit(bs.scr.send_aircraft_data)
+    finally:
+        bs.net.send_stream = send_stream
+
+
+@case
+def stack_process(ntraf):
+    ''' Processing an ALT command for each aircraft from a scenario. '''
+    synthetic(ntraf)
+    lines = [f'ALT {acid} FL{100 + 10 * (i % 30)}' for i, acid in enumerate(bs.traf.id)]
+
+    def process():
+        bs.stack.stack(*lines)
+        simstack.process()
+    return timeit(process)
+
+
+def init():
+    ''' Start a detached simulation node with the SYNTHETIC plugin. '''
+    if bs.traf is None:
+        bs.init('sim-detached')
+    bs.scr.echo = lambda *args, **kwargs: None
+    if 'SYNTHETIC' not in Plugin.loaded_plugins:
+        success, msg = Plugin.load('SYNTHETIC')
+        if not success:
+            raise RuntimeError(msg)
+
+
+def run(ntrafs=ntraf_default, names=None):
+    ''' Run the cases matching names (all when None) for each traffic count.
+        Returns a dict of the time per call per case and traffic count. '''
+    init()
+    results = dict()
+    for name, fun in cases.items():
+        if names and not any(n.lower() in name for n in names):
+            continue
+        results[name] = dict()
+        for ntraf in ntrafs:
+            results[name][str(ntraf)] = fun(ntraf)
+            bs.sim.reset()
+    return results
+
+
+def record(results):
+    ''' Results with the date, version and platform of this run. '''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ''
+    return dict(date=datetime.now().isoformat(timespec='seconds'), commit=commit,
+                python=platform.python_version(), numpy=np.__version__,
+                machine=platform.machine(), processor=platform.processor(),
+                results=results)
+
+
+def loadhistory(fname):
+    ''' Saved runs in history file fname, one JSON record per line. '''
+    try:
+        with open(fname) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def report(results, previous=None):
+    ''' Text table of the results in ms per call, with the ratio to the
+        previous run when given. '''
+    ntrafs = list(next(iter(results.values()), {}))
+    prevresults = previous['results'] if previous else dict()
+    lines = [f'{"Case [ms/call]":<24}' + ''.join(f'{n:>20}' for n in ntrafs)]
+    for name, times in results.items():
+        line = f'{name:<24}'
+        for ntraf, dt in times.items():
+            prev = prevresults.get(name, {}).get(ntraf)
+            text = '-' if dt is None else f'{1e3 * dt:.3f}'
+            if dt and prev:
+                text += f' ({dt / prev:.2f}x)'
+            line += f'{text:>20}'
+        lines.append(line)
+    if previous:
+        lines.append(f'Ratios are relative to the run of {previous["date"]} '
+                     f'(commit {previous["commit"] or "unknown"})')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='BlueSky benchmark suite')
+    parser.add_argument('-n', '--ntraf', type=int, nargs='+', default=ntraf_default,
+                        help='traffic counts')
+    parser.add_argument('-k', '--cases', nargs='+', help='run only cases containing these names')
+    parser.add_argument('--history', help='history file of saved runs '
+                        '(default: benchmarks.jsonl in the log path)')
+    parser.add_argument('--save', action='store_true', help='append the results to the history file')
+    args = parser.parse_args(argv)
+
+    results = run(args.ntraf, args.cases)
+    fname = args.history or bs.settings.log_path + '/benchmarks.jsonl'
+    history = loadhistory(fname)
+    print(report(results, history[-1] if history else None))
+    if args.save:
+        os.makedirs(os.path.dirname(fname) or '.', exist_ok=True)
+        with open(fname, 'a') as f:
+            f.write(json.dumps(record(results)) + '\n')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,38 @@
+"""
+Tests the batched area classification of the area filter.
+"""
+import numpy as np
+import bluesky
+from bluesky.tools import areafilter
+
+
+def test_areafilter_classify(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args, **kwargs: None)
+    areafilter.reset()
+    areafilter.defineArea('BOX1', 'BOX', [51.0, 3.0, 52.0, 5.0], top=3000.0)
+    areafilter.defineArea('CIR1', 'CIRCLE', [52.0, 4.0, 30.0])
+    areafilter.defineArea('POLY1', 'POLY', [50.0, 6.0, 51.0, 8.0, 50.0, 8.0])
+    areafilter.defineArea('FAR', 'BOX', [-10.0, -10.0, -9.0, -9.0])
+
+    # The bounding box of a circle contains the circle
+    lat0, lon0, lat1, lon1 = areafilter.basic_shapes['CIR1'].bbox
+    assert np.isclose(lat1 - 52.0, 0.5) and lon1 - 4.0 > 0.5
+
+    rng = np.random.default_rng(2)
+    lat = 49.5 + 3.0 * rng.random(500)
+    lon = 2.0 + 7.0 * rng.random(500)
+    alt = 6000.0 * rng.random(500)
+    names = ['BOX1', 'CIR1', 'POLY1', 'FAR']
+    inside = areafilter.classify(lat, lon, alt, names)
+    assert inside.shape == (500, 4)
+    for i, name in enumerate(names):
+        assert np.array_equal(inside[:, i],
+                              areafilter.checkInside(name, lat, lon, alt))
+    assert np.all(inside[:, :3].any(axis=0)) and not inside[:, 3].any()
+
+    # All areas by default, and a redefined area replaces the old one
+    assert areafilter.classify(lat, lon, alt).shape == (500, 4)
+    areafilter.defineArea('BOX1', 'BOX', [49.0, 1.0, 49.2, 1.2])
+    assert not areafilter.classify(lat, lon, alt, ['BOX1']).any()
+    areafilter.reset()
+    assert areafilter.classify(lat, lon, alt, ['BOX1']).shape == (500, 1)
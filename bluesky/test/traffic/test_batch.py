@@ -0,0 +1,59 @@
+"""
+Tests the fast-time batch runner.
+"""
+import numpy as np
+import bluesky
+from bluesky.simulation import batch
+
+
+# Scenario A ends when its aircraft is deleted, scenario B holds the simulation
+BATCHFILE = '''00:00:00.00>SCEN BATCHA
+00:00:00.00>CRE KL001 B744 52 4 90 FL100 250
+00:00:10.00>DEL KL001
+00:00:00.00>SCEN BATCHB
+00:00:00.00>CRE KL002 B744 52 4 90 FL100 250
+00:00:20.00>HOLD
+'''
+
+
+def test_batch(traffic_, tmp_path, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args, **kwargs: None)
+    monkeypatch.setattr(bluesky.net, 'send_stream', lambda *args, **kwargs: None)
+    fname = str(tmp_path / 'batch.scn')
+    with open(fname, 'w') as f:
+        f.write(BATCHFILE)
+
+    # One run per scenario per seed
+    runs = batch.makeruns(fname, nseeds=2, maxtime=5.0)
+    assert [(run['name'], run['seed']) for run in runs] == \
+        [('BATCHA', 0), ('BATCHA', 1), ('BATCHB', 0), ('BATCHB', 1)]
+    assert [run['seed'] for run in batch.makeruns(fname)] == [-1, -1]
+
+    outfile = str(tmp_path / 'batch.npz')
+    results = batch.run(fname, nworkers=0, nseeds=2, outfile=outfile)
+    assert list(results['scenario']) == ['BATCHA', 'BATCHA', 'BATCHB', 'BATCHB']
+    assert list(results['seed']) == [0, 1, 0, 1]
+    assert list(results['ended']) == ['DONE', 'DONE', 'HOLD', 'HOLD']
+    assert np.all(results['ntrafmax'] == 1)
+    assert np.all(results['simt'][:2] >= 10.0) and np.all(results['simt'][2:] >= 20.0)
+
+    # The saved metrics have one array per metric, with a value per run
+    with np.load(outfile) as saved:
+        assert set(saved.files) == set(batch.metrics)
+        for name in batch.metrics:
+            assert np.array_equal(saved[name], results[name])
+
+    # Runs end at the maximum simulation time
+    results = batch.run(fname, nworkers=0, maxtime=5.0, outfile=outfile)
+    assert list(results['ended']) == ['MAXTIME', 'MAXTIME']
+    assert np.all((results['simt'] >= 5.0) & (results['simt'] < 6.0))
+    with np.load(outfile) as saved:
+        assert list(saved['ended']) == ['MAXTIME', 'MAXTIME']
+
+    # Without a maximum time, runs end at the batch_maxtime setting
+    monkeypatch.setattr(bluesky.settings, 'batch_maxtime', 3.0)
+    results = batch.run(fname, nworkers=0, outfile=outfile)
+    assert list(results['ended']) == ['MAXTIME', 'MAXTIME']
+    assert np.all((results['simt'] >= 3.0) & (results['simt'] < 4.0))
+
+    bluesky.sim.reset()
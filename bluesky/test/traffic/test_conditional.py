@@ -0,0 +1,106 @@
+"""
+Tests the conditional commands.
+"""
+import numpy as np
+import bluesky
+from bluesky.stack import simstack
+from bluesky.stack.stackbase import Stack
+from bluesky.tools import areafilter
+from bluesky.tools.aero import ft, kts
+
+
+def stacked():
+    ''' Return and clear the command lines on the stack. '''
+    lines = [line for line, _ in Stack.cmdstack]
+    Stack.clear()
+    return lines
+
+
+def test_conditional(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args, **kwargs: None)
+    monkeypatch.setattr(bluesky.sim, 'simt', 0.0)
+    traffic_.reset()
+    Stack.reset()
+    cond = traffic_.cond
+    traffic_.cre(['KL001', 'KL002', 'KL003', 'KL004'], 'B744', 52.0, 4.0, 90,
+                 10000 * ft, 250 * kts)
+    areafilter.defineArea('CONDBOX', 'BOX', [52.5, 3.0, 53.0, 5.0])
+
+    cond.ataltcmd(0, 12000 * ft, 'KL001 SPD 280')
+    cond.atspdcmd(1, 240 * kts, 'KL002 ALT FL100')
+    cond.atdistcmd(2, 52.0, 5.0, 10.0, 'KL003 HDG 180')
+    cond.attimecmd(3, 60.0, 'KL004 HDG 270')
+    cond.atareacmd(3, 'CONDBOX', 'KL004 ALT FL200')
+    assert cond.atareacmd(3, 'NOAREA', 'KL004 ALT FL200')[0] is False
+    assert cond.ncond == 5
+
+    cond.update()
+    assert stacked() == []
+
+    # Each condition is true when its target is passed
+    traffic_.alt[0] = 12500 * ft
+    traffic_.cas[1] = 230 * kts
+    traffic_.lon[2] = 4.8
+    bluesky.sim.simt = 60.0
+    cond.update()
+    assert stacked() == ['KL001 SPD 280', 'KL002 ALT FL100', 'KL003 HDG 180', 'KL004 HDG 270']
+    assert cond.ncond == 1
+
+    traffic_.lat[3] = 52.7
+    cond.update()
+    assert stacked() == ['KL004 ALT FL200']
+    assert cond.ncond == 0
+
+    # The conditions of deleted aircraft are removed, and the other
+    # conditions keep their aircraft
+    cond.ataltcmd(np.arange(4), 20000 * ft, [f'KL00{i} SPD 300' for i in range(1, 5)])
+    traffic_.delete([0, 2])
+    assert cond.ncond == 2 and list(cond.acidx) == [0, 1]
+    traffic_.alt[:] = 21000 * ft
+    cond.update()
+    assert stacked() == ['KL002 SPD 300', 'KL004 SPD 300']
+
+    traffic_.reset()
+    areafilter.reset()
+    assert cond.ncond == 0
+
+
+def test_conditional_pasttime(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args, **kwargs: None)
+    monkeypatch.setattr(bluesky.sim, 'simt', 100.0)
+    traffic_.reset()
+    Stack.reset()
+    traffic_.cre(['KL001'], 'B744', 52.0, 4.0, 90, 10000 * ft, 250 * kts)
+
+    # A time that has already passed is executed in the next update
+    traffic_.cond.attimecmd(0, 50.0, 'KL001 HDG 180')
+    traffic_.cond.update()
+    assert stacked() == ['KL001 HDG 180']
+    assert traffic_.cond.ncond == 0
+    traffic_.reset()
+
+
+def test_conditional_bulk(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args, **kwargs: None)
+    traffic_.reset()
+    Stack.reset()
+    acids = [f'BK{i:03d}' for i in range(10)]
+    traffic_.cre(acids, 'B744', 52.0, 4.0, 90, 10000 * ft, 250 * kts)
+
+    # Scenario lines of the same conditional command are registered together
+    calls = list()
+    cmdobj = bluesky.stack.get_commands()['ATALT']
+    callback = cmdobj.call
+    monkeypatch.setattr(cmdobj, 'call', lambda args: calls.append(args) or callback(args))
+    bluesky.stack.stack(*(f'{acid} ATALT FL{110 + i} {acid} SPD 200'
+                          for i, acid in enumerate(acids)))
+    simstack.process()
+    assert len(calls) == 1
+    assert traffic_.cond.ncond == 10
+    assert list(traffic_.cond.cmd) == [f'{acid} SPD 200' for acid in acids]
+
+    traffic_.alt[::2] = 20000 * ft
+    traffic_.cond.update()
+    assert stacked() == [f'{acid} SPD 200' for acid in acids[::2]]
+    traffic_.reset()
+    Stack.reset()
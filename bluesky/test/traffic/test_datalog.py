@@ -0,0 +1,76 @@
+"""
+Tests the binary (NPZ) datalog backend and its conversion to CSV.
+"""
+import threading
+import numpy as np
+import bluesky
+from bluesky.tools import datalog
+
+
+def makelog(fmt, path, nlog=3):
+    ''' Log a few samples of traffic data, and return the log file name. '''
+    bluesky.settings.log_path = str(path)
+    logger = datalog.CSVLogger('TESTLOG' + fmt, 0.0, 'Test log\nSecond line', fmt)
+    assert logger.addvars(['traf.id', 'traf.lat', 'traf.alt'])
+    logger.start()
+    for i in range(nlog):
+        logger.log(i, 'extra')
+        bluesky.traf.lat += 0.1
+    fname = logger.fname
+    logger.reset()
+    datalog.flush()
+    return fname
+
+
+def test_datalog_npz(traffic_, tmp_path, monkeypatch):
+    monkeypatch.setattr(bluesky.settings, 'log_chunksize', 4)
+    traffic_.reset()
+    traffic_.cre(['LOG1', 'LOG2', 'LOG3'], 'B744', 52.0, 4.0, 90, 2000, 200)
+
+    lat = traffic_.lat.copy()
+    csvname = makelog('CSV', tmp_path)
+    traffic_.lat[:] = lat
+    npzname = makelog('NPZ', tmp_path)
+
+    # Three samples of three rows in chunks of at least four rows
+    header, columns, chunks = datalog.readbinlog(npzname)
+    assert header == ['Test log', 'Second line']
+    assert columns == ['simt', 'id', 'lat', 'alt']
+    chunks = list(chunks)
+    assert [len(chunk[0]) for chunk in chunks] == [6, 3]
+    assert np.allclose(chunks[0][2], np.append(lat, lat + 0.1))
+
+    # The converted log is equal to the CSV log
+    assert datalog.tocsv(npzname, str(tmp_path / 'converted.log'))[0]
+    with open(csvname) as f1, open(tmp_path / 'converted.log') as f2:
+        assert f1.read() == f2.read()
+    traffic_.reset()
+
+
+def test_datalog_buffers(traffic_, tmp_path, monkeypatch):
+    monkeypatch.setattr(bluesky.settings, 'log_path', str(tmp_path))
+    monkeypatch.setattr(bluesky.settings, 'log_buffers', 2)
+    monkeypatch.setattr(bluesky.settings, 'log_maxwait', 0.01)
+    traffic_.reset()
+    traffic_.cre(['LOG1', 'LOG2'], 'B744', 52.0, 4.0, 90, 2000, 200)
+    logger = datalog.CSVLogger('TESTBUF', 0.0, 'Test log', 'CSV')
+    assert logger.addvars(['traf.lat'])
+    logger.start()
+    fname = logger.fname
+
+    # Stall the writer thread: the third sample finds no free buffer
+    stall = threading.Event()
+    datalog.queuejob(stall.wait)
+    for _ in range(3):
+        logger.log()
+    assert logger.buffer.depth == 2
+    assert (logger.buffer.nlate, logger.buffer.ndropped) == (1, 1)
+    assert datalog.logstats()[0]
+
+    # A flush waits until all queued samples are written
+    stall.set()
+    logger.reset()
+    datalog.flush()
+    with open(fname) as f:
+        assert len(f.readlines()) == 2 + 2 * 2
+    traffic_.reset()
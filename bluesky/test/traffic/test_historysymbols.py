@@ -0,0 +1,51 @@
+"""
+Tests the history symbol ring buffer.
+"""
+import numpy as np
+import bluesky
+
+
+def test_historysymbols(traffic_):
+    traffic_.reset()
+    traffic_.cre(['HIS1', 'HIS2', 'HIS3'], 'B744', 52.0, 4.0, 90, 2000, 200)
+    histsymb = traffic_.histsymb
+    maxsymb = histsymb.maxsymb
+
+    # Store more positions than fit in the ring buffer for the first two
+    for i in range(maxsymb + 2):
+        traffic_.lat[:] = 50.0 + i
+        histsymb.update_history(np.array([0, 1]) if i else np.array([0, 1, 2]))
+    traffic_.delete(1)
+    assert list(histsymb.nhist) == [maxsymb, 1]
+
+    # The most recent positions are shown, only valid ones
+    histsymb.nsymb = 3
+    histsymb.t_prev = bluesky.sim.simt
+    histsymb.update()
+    assert sorted(histsymb.histlat) == [50.0, 49.0 + maxsymb, 50.0 + maxsymb, 51.0 + maxsymb]
+    assert histsymb.histlat.dtype == np.float32
+
+    assert histsymb.setHistory(maxsymb) is True
+    histsymb.update()
+    assert len(histsymb.histlat) == maxsymb + 1
+    assert not histsymb.setHistory(maxsymb + 1)[0]
+    traffic_.reset()
+
+
+def test_historysymbols_opensky(traffic_, monkeypatch):
+    traffic_.reset()
+    traffic_.cre(['HIS1', 'HIS2', 'HIS3'], 'B744', 52.0, 4.0, 90, 2000, 200)
+    histsymb = traffic_.histsymb
+    feed = traffic_.trafdatafeed
+    monkeypatch.setattr(feed, 'datafeedids', ['HIS1', 'HIS2'])
+    feed.source[:2] = ['OPENSKY', 'OTHER']
+    feed.lastupdate[:] = 0.0
+
+    # Data feed traffic gets a history symbol every other update, except
+    # OPENSKY traffic, which gets one every update
+    histsymb.nsymb = 3
+    for _ in range(4):
+        histsymb.t_prev = bluesky.sim.simt
+        histsymb.update()
+    assert list(histsymb.nhist) == [4, 2, 0]
+    traffic_.reset()
@@ -0,0 +1,50 @@
+"""
+Tests the vectorized T-Bar/runway and route DTG of the LVNL variables.
+"""
+import numpy as np
+import bluesky
+from bluesky.tools import geo
+from bluesky.traffic.route import Route
+
+
+def test_lvnl_dtg(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args: None)
+    traffic_.reset()
+    rng = np.random.default_rng(3)
+    traffic_.cre([f'DTG{i}' for i in range(6)], 'B744', 52.0 + rng.random(6),
+                 4.0 + rng.random(6), 90, 2000, 200)
+    lvnl = traffic_.lvnlvars
+    lvnl.setarr(0, 'NIRSI_GAL01', False)
+    lvnl.setarr(1, 'NIRSI_AM603', False)
+    lvnl.setarr(2, 'NIRSI_GAL02', False)
+    lvnl.setrwy(2, '18C')
+    lvnl.setrwy(3, '18R_E')
+    lvnl.setarr(4, 'OTHER', False)
+
+    # Routes for all but the last aircraft
+    for idx in range(5):
+        for _ in range(4):
+            traffic_.ap.route[idx].addwpt(
+                idx, traffic_.id[idx], Route.wplatlon,
+                52.0 + rng.random(), 4.0 + rng.random())
+        Route.direct(idx, traffic_.ap.route[idx].wpname[1])
+
+    lvnl.dtg[:] = -1.0
+    lvnl.dtg_route[:] = -1.0
+    lvnl.update()
+
+    target = np.array([[52.47962777777778, 4.513372222222222],
+                       [52.68805555555555, 4.513333333333334],
+                       [52.36027777777778, 4.711666666666667],
+                       [52.331388888888895, 4.74]])
+    assert np.allclose(lvnl.dtg[:4], geo.kwikdist_matrix(
+        traffic_.lat[:4], traffic_.lon[:4], target[:, 0], target[:, 1]))
+    assert np.all(lvnl.dtg[4:] == -1.0)
+
+    for idx in range(5):
+        route = traffic_.ap.route[idx]
+        dtg = geo.kwikdist(traffic_.lat[idx], traffic_.lon[idx],
+                           route.wplat[1], route.wplon[1]) + np.sum(route.wpdistto[2:])
+        assert np.isclose(lvnl.dtg_route[idx], dtg)
+    assert lvnl.dtg_route[5] == -1.0
+    traffic_.reset()
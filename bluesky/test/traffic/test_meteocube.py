@@ -0,0 +1,73 @@
+"""
+Tests the gridded HighRes meteo data against the original DataFrame lookups.
+"""
+import os
+import sqlite3
+import datetime
+import numpy as np
+import pandas as pd
+import bluesky
+from bluesky.tools import Functions
+from bluesky.traffic.meteocube import MeteoFrame, MeteoCube, columns
+
+
+def timeframe(rng, timestamp):
+    ''' Rows of a meteo timeframe on a small grid, with level altitudes
+        that differ per column, and one column with fewer levels. '''
+    rows = list()
+    for lat in np.round(np.arange(51.0, 51.5, 0.1), 1):
+        for lon in np.round(np.arange(4.0, 4.6, 0.1), 1):
+            nlev = 5 if (lat, lon) == (51.2, 4.3) else 8
+            alts = np.sort(rng.uniform(0.0, 40000.0, nlev))[::-1]
+            for alt in alts:
+                rows.append((int(timestamp), 0, lon, lat, alt, rng.normal(0, 20), rng.normal(0, 20)))
+    return pd.DataFrame(rows, columns=['timestamp_data', 'timestamp_prediction'] + list(columns))
+
+
+def test_meteoframe():
+    rng = np.random.default_rng(3)
+    df = timeframe(rng, '211001003')
+    frame = MeteoFrame(**{col: df[col].to_numpy() for col in columns})
+    lat = np.concatenate([rng.uniform(51.0, 51.4, 200), [51.2, 51.3]])
+    lon = np.concatenate([rng.uniform(4.0, 4.5, 200), [4.3, 4.2]])
+    alt = np.concatenate([rng.uniform(0.0, 45000.0, 200), [20000.0, 20000.0]])
+    uwind, vwind = frame.interpolate(lat, lon, alt)
+    for i in range(len(lat)):
+        value = Functions.find_datapoint_timeframe(df, [0, alt[i], lat[i], lon[i]])
+        assert np.isclose(uwind[i], value[4], atol=2e-4)
+        assert np.isclose(vwind[i], value[5], atol=2e-4)
+
+
+def test_meteocube_sources(tmp_path, monkeypatch):
+    monkeypatch.setattr(bluesky.settings, 'meteo_path', str(tmp_path), raising=False)
+    rng = np.random.default_rng(4)
+    stamps = ('211001003', '211001004', '211001005')
+    frames = {stamp: timeframe(rng, stamp) for stamp in stamps}
+
+    # Directory of npz files, and SQLite database with the same data
+    os.makedirs(tmp_path / 'npzdemo')
+    for stamp, df in frames.items():
+        np.savez(tmp_path / 'npzdemo' / f'{stamp}.npz', **{col: df[col].to_numpy() for col in columns})
+    with sqlite3.connect(tmp_path / 'sqldemo.sqlite') as conn:
+        pd.concat(frames.values()).to_sql('sqldemo', conn, index=False)
+
+    utc = datetime.datetime(2021, 10, 1, 0, 34, 20)
+    lat, lon = rng.uniform(50.8, 51.4, 50), rng.uniform(3.8, 4.5, 50)
+    alt = rng.uniform(0.0, 40000.0, 50)
+    timefrac = Functions.utc2frac(utc, stamps[0])
+    for name in ('npzdemo', 'sqldemo'):
+        cube = MeteoCube(name)
+        cube.update(utc)
+        assert (cube.prev_timestamp, cube.next_timestamp) == stamps[:2]
+        # The following timeframe is read in the background
+        assert stamps[2] in cube.pending
+        inside, uwind, vwind = cube.getdata(lat, lon, alt, utc)
+        assert np.array_equal(inside, (lat >= 51.0) & (lat <= 51.4) & (lon >= 4.0) & (lon <= 4.5))
+        for i, idx in enumerate(np.flatnonzero(inside)):
+            value1, value2 = (Functions.find_datapoint_timeframe(frames[stamp], [0, alt[idx], lat[idx], lon[idx]])
+                              for stamp in stamps[:2])
+            assert np.isclose(uwind[i], Functions.time_interpolation(timefrac, value1[4], value2[4]), atol=2e-4)
+            assert np.isclose(vwind[i], Functions.time_interpolation(timefrac, value1[5], value2[5]), atol=2e-4)
+        cube.update(utc + datetime.timedelta(minutes=10))
+        assert cube.next_timestamp == stamps[2]
+        cube.close()
@@ -0,0 +1,123 @@
+"""
+Tests the memory-mapped navigation database cache.
+"""
+import numpy as np
+import pytest
+import bluesky
+from bluesky.tools import geo
+from bluesky.navdatabase import loadnavdata
+from bluesky.navdatabase.loadnavdata import StringColumn
+
+
+def test_stringcolumn(tmp_path):
+    strings = ['SPY', 'EHAM', 'SPY', '', 'ÅRE', 'ARTIP', 'SPY']
+    StringColumn.save(tmp_path, 'wpid', strings)
+    col = StringColumn.load(tmp_path, 'wpid')
+    assert isinstance(col.data, np.memmap)
+    assert list(col) == strings and col[:2] == strings[:2]
+    assert col[-1] == 'SPY' and col[4] == 'ÅRE'
+    assert col.indices('SPY') == [0, 2, 6]
+    assert col.index('SPY', 1) == 2 and col.count('SPY') == 3
+    assert 'ARTIP' in col and 'ART' not in col and '' in col
+    with pytest.raises(ValueError):
+        col.index('EHAM', 2)
+
+    col.append('SPY')
+    assert len(col) == 8 and col[-1] == 'SPY'
+    assert col.indices('SPY') == [0, 2, 6, 7]
+
+
+def test_savenavdata(tmp_path, monkeypatch):
+    wptdata = dict(wpid=['SPY', 'ARTIP'], wplat=[52.5, 52.4], wplon=[4.8, 5.1])
+    firdata = dict(fir=[['EHAA', [52.0, 53.0], [4.0, 5.0]]])
+    monkeypatch.setattr(loadnavdata, 'loadnavdata_txt',
+                        lambda: (dict(wptdata), dict(), dict(), dict(firdata), dict()))
+    monkeypatch.setattr(loadnavdata, 'loadthresholds_txt', lambda: dict())
+    path = str(tmp_path / 'navdata')
+    loadnavdata.save_navdata(path)
+    assert loadnavdata.cacheversion(path) == loadnavdata.navdb_version
+
+    # A valid cache stored by another node is kept
+    (tmp_path / 'navdata' / 'marker').touch()
+    loadnavdata.save_navdata(path)
+    assert (tmp_path / 'navdata' / 'marker').exists()
+
+    # An outdated cache is replaced
+    with open(tmp_path / 'navdata' / 'index.json', 'w') as f:
+        f.write('{"version": "v0"}')
+    loadnavdata.save_navdata(path)
+    assert not (tmp_path / 'navdata' / 'marker').exists()
+    assert loadnavdata.cacheversion(path) == loadnavdata.navdb_version
+    assert StringColumn.load(path, 'wpid').indices('SPY') == [0]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['navdata']
+
+
+def test_navdatabase_lazy(traffic_):
+    navdb = bluesky.navdb
+    navdb.reset()
+    assert 'fir' not in navdb.__dict__
+    assert isinstance(navdb.fir, list)
+    assert 'fir' in navdb.__dict__ and 'firlat0' in navdb.__dict__
+    assert 'coname' not in navdb.__dict__
+    if len(navdb.cocode2):
+        assert navdb.coname[navdb.cocode2.index(navdb.cocode2[0])] == navdb.coname[0]
+
+    navdb.reset()
+    assert 'fir' not in navdb.__dict__
+
+    i = navdb.getaptidx(navdb.aptid[10])
+    assert navdb.aptid[i] == navdb.aptid[10]
+
+
+def test_navdatabase_index(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args, **kwargs: None)
+    navdb = bluesky.navdb
+    navdb.reset()
+    n = len(navdb.wpid)
+    navdb.defwpt('DUPWP', 52.0, 4.0)
+    navdb.defwpt('DUPWP', 40.0, 4.0)
+    navdb.defwpt('DUPWP', 52.0, 4.01)
+    assert navdb.wpid.indices('DUPWP') == [n, n + 1, n + 2]
+
+    # First occurrence without reference position, otherwise the closest
+    assert navdb.getwpidx('dupwp') == n
+    assert navdb.getwpidx('DUPWP', 41.0, 4.0) == n + 1
+    assert navdb.getwpidx('NOTAWP', 41.0, 4.0) == -1
+    assert navdb.getwpindices('DUPWP', 51.0, 4.0) == [n, n + 2]
+    assert navdb.getwpindices('DUPWP', 39.0, 4.0) == [n + 1]
+
+    i = navdb.getaptidx(navdb.aptid[5].lower())
+    assert navdb.aptid[i] == navdb.aptid[5]
+    assert navdb.listairway('NOTANAWY') == []
+    navdb.reset()
+    assert 'DUPWP' not in navdb.wpid
+
+
+def test_navdatabase_spatialindex(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args, **kwargs: None)
+    navdb = bluesky.navdb
+    navdb.reset()
+    rng = np.random.default_rng(3)
+    lat = 45.0 + 15.0 * rng.random(20)
+    lon = -5.0 + 20.0 * rng.random(20)
+
+    # Nearest airports, single and bulk
+    inear = navdb.getapinear(lat, lon)
+    for i, (la, lo) in enumerate(zip(lat, lon)):
+        d = geo.kwikdist(la, lo, navdb.aptlat, navdb.aptlon)
+        assert np.isclose(d[inear[i]], d.min(), rtol=1e-3)
+        assert navdb.getapinear(la, lo) == inear[i]
+    assert navdb.getapknear(lat, lon, 3).shape == (20, 3)
+    assert np.array_equal(navdb.getapknear(lat, lon, 3)[:, 0], inear)
+
+    # Boxes, compared with the full scan
+    boxes = (lat - 1.0, lat + 0.5, lon - 0.5, lon + 2.0)
+    bulk = navdb.getwpinside(*boxes)
+    for i, box in enumerate(zip(*boxes)):
+        scan = navdb.getinside(navdb.wplat, navdb.wplon, *box)
+        assert list(bulk[i]) == scan == navdb.getwpinside(*box)
+
+    # Custom waypoints invalidate the waypoint index
+    navdb.defwpt('NEARWP', 48.123, 1.234)
+    assert navdb.wpid[navdb.getwpinear(48.12, 1.23)] == 'NEARWP'
+    assert navdb.nwpcache == len(navdb.wpid) - 1
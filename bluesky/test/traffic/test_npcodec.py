@@ -0,0 +1,23 @@
+"""
+Tests the msgpack encoding of numpy arrays.
+"""
+import msgpack
+import numpy as np
+from bluesky.network.npcodec import encode_ndarray, decode_ndarray, \
+    packb_frames, unpackb_frames
+
+
+def test_npcodec():
+    data = dict(lat=np.linspace(50.0, 54.0, 5), col=np.zeros((4, 3), dtype=np.uint8),
+                empty=np.zeros((0, 3)), none=np.array([]), id=['KL001', 'KL002'],
+                strided=np.arange(10)[::2])
+
+    # Dict format, and arrays in separate frames
+    packed = msgpack.packb(data, default=encode_ndarray, use_bin_type=True)
+    for decoded in (msgpack.unpackb(packed, object_hook=decode_ndarray, raw=False),
+                    unpackb_frames(packb_frames(data))):
+        assert decoded['id'] == data['id']
+        for name in ('lat', 'col', 'empty', 'none', 'strided'):
+            assert decoded[name].dtype == data[name].dtype
+            assert decoded[name].shape == data[name].shape
+            assert np.array_equal(decoded[name], data[name])
@@ -0,0 +1,72 @@
+"""
+Tests the traffic update stages.
+"""
+import numpy as np
+import bluesky
+from bluesky.core import simtime
+from bluesky.core.pipeline import Pipeline
+from bluesky.tools.aero import ft, kts
+
+
+def step(traf, n):
+    ''' Step the simulation clock and the traffic n times. '''
+    for _ in range(n):
+        bluesky.sim.simt, bluesky.sim.simdt = simtime.step()
+        traf.update()
+
+
+def test_pipeline():
+    simtime.reset()
+    calls = list()
+    pipeline = Pipeline('test')
+    pipeline.add('TESTFIRST', lambda: calls.append('first'))
+    pipeline.add('TESTLAST', lambda dt: calls.append(('last', round(dt, 6))), dt=0.2)
+    pipeline.add('TESTSECOND', lambda: calls.append('second'), before='testlast')
+    assert list(pipeline.stages) == ['TESTFIRST', 'TESTSECOND', 'TESTLAST']
+    assert pipeline.get('testlast').timer is simtime._timers['TEST.TESTLAST']
+
+    # Stages that accept dt get the time since their previous call
+    for _ in range(8):
+        simtime.step()
+        pipeline.update(0.05)
+    assert calls.count('first') == 8
+    assert [c for c in calls if c[0] == 'last'] == [('last', 0.2), ('last', 0.2)]
+    assert pipeline.get('testlast').ncalls == 2
+    assert 'TESTSECOND' in pipeline.report()
+    pipeline.remove('TESTSECOND')
+    assert pipeline.get('TESTSECOND') is None
+    simtime.reset()
+
+
+def test_traffic_stages(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args, **kwargs: None)
+    monkeypatch.setattr(bluesky.sim, 'simt', 0.0)
+    monkeypatch.setattr(bluesky.sim, 'simdt', 0.05)
+    simtime.reset()
+    traffic_.reset()
+    traffic_.cre(['KL001'], 'B744', 52.0, 4.0, 90, 10000 * ft, 250 * kts)
+
+    # Stage timers don't share the timers of plugins with the same name,
+    # but asas and performance are triggered by their timed functions
+    plugintimer = simtime.Timer.maketimer('datafeed', 0.5)
+    assert traffic_.pipeline.get('datafeed').timer is not plugintimer
+    assert float(plugintimer.dt_act) == 0.5
+    assert traffic_.pipeline.get('asas').timer is traffic_.update_asas.__manualtimer__
+    assert traffic_.pipeline.get('performance').timer is traffic_.perf.update.__manualtimer__
+
+    step(traffic_, 8)
+    lon = traffic_.lon[0]
+
+    # A slower kinematics stage integrates over its own interval
+    success, _ = traffic_.setstage('KINEMATICS', 0.2)
+    assert success
+    assert traffic_.setstage('NOSTAGE', 1.0)[0] is False
+    step(traffic_, 11)
+    assert traffic_.pipeline.get('kinematics').ncalls == 11
+    assert np.isclose(traffic_.lon[0] - lon, 11 / 8 * (lon - 4.0))
+    assert 'KINEMATICS' in traffic_.setstage()[1].upper()
+
+    simtime.reset()
+    traffic_.reset()
+    assert traffic_.pipeline.get('kinematics').ncalls == 0
+    assert traffic_.pipeline.get('kinematics').timer.dt_act == simtime._clock.dt
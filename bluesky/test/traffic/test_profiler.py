@@ -0,0 +1,64 @@
+"""
+Tests the wall-clock time profiler of the simulation step.
+"""
+import json
+import numpy as np
+import bluesky
+from bluesky.core import simtime, profiler
+from bluesky.tools.aero import ft, kts
+
+
+def test_section():
+    section = profiler.Section('test', 4)
+    for dt in (1e-3, 2e-3, 3e-3, 4e-3, 5e-3):
+        section.record(dt)
+    # Only the last durations are kept in the rolling window
+    stats = section.stats()
+    assert stats['count'] == 5 and np.isclose(stats['total'], 0.015)
+    assert np.isclose(stats['mean'], 3.5e-3) and np.isclose(stats['max'], 5e-3)
+    assert section.histogram().sum() == 4
+
+
+def test_profiler(traffic_, monkeypatch, tmp_path):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args, **kwargs: None)
+    monkeypatch.setattr(bluesky.sim, 'simt', 0.0)
+    monkeypatch.setattr(bluesky.sim, 'simdt', 0.05)
+    simtime.reset()
+    traffic_.reset()
+    traffic_.cre(['KL001', 'KL002'], 'B744', 52.0, 4.0, 90, 10000 * ft, 250 * kts)
+    assert profiler.profilecmd()[1].endswith('PROFILE ON to start')
+
+    def step(n):
+        for _ in range(n):
+            bluesky.sim.simt, bluesky.sim.simdt = simtime.step()
+            simtime.preupdate()
+            with profiler.timed('traffic'):
+                traffic_.update()
+            simtime.update()
+
+    # Nothing is recorded while the profiler is off
+    step(5)
+    assert not profiler.sections
+    assert profiler.profilecmd('ON')[0]
+    step(20)
+    assert profiler.sections['traffic'].count == 20
+    assert profiler.sections['traffic:kinematics'].count == 20
+    assert profiler.sections['traffic:asas'].count == 1
+    assert any(name.startswith('update:') for name in profiler.sections)
+    assert 'traffic:kinematics' in profiler.profilecmd()[1]
+
+    # Dumped results can be compared with later results
+    fname = str(tmp_path / 'profile.json')
+    assert profiler.profilecmd('DUMP', fname)[0]
+    with open(fname) as f:
+        data = json.load(f)
+    assert len(data['binedges']) == len(data['sections']['traffic']['histogram']) + 1
+    success, text = profiler.profilecmd('COMPARE', fname)
+    assert success and 'traffic:kinematics' in text
+    assert profiler.profilecmd('COMPARE', str(tmp_path / 'missing.json'))[0] is False
+
+    assert profiler.profilecmd('OFF')[0] and profiler.profilecmd('RESET')[0]
+    step(5)
+    assert not profiler.sections
+    simtime.reset()
+    traffic_.reset()
@@ -0,0 +1,58 @@
+"""
+Tests the columnar route table against the per-aircraft Route objects.
+"""
+import numpy as np
+import bluesky
+from bluesky.traffic.route import Route
+
+
+def addroutes(traffic_, rng, nwp=(2, 6)):
+    ''' Give all aircraft a random lat/lon route, and fly to its first
+        waypoint. '''
+    for idx in range(traffic_.ntraf):
+        route = traffic_.ap.route[idx]
+        for _ in range(rng.integers(*nwp)):
+            route.addwpt(idx, traffic_.id[idx], Route.wplatlon,
+                         50.0 + 5.0 * rng.random(), 2.0 + 5.0 * rng.random())
+        Route.direct(idx, route.wpname[0])
+
+
+def reference(traffic_):
+    ''' Remaining route distance computed from the Route objects. '''
+    remaining = np.zeros(traffic_.ntraf)
+    for idx, route in enumerate(traffic_.ap.route):
+        if 0 <= route.iactwp < route.nwp:
+            remaining[idx] = np.sum(route.wpdistto[route.iactwp + 1:])
+    return remaining
+
+
+def test_routetable(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args: None)
+    traffic_.reset()
+    rng = np.random.default_rng(2)
+    traffic_.cre([f'RT{i:03d}' for i in range(20)], 'B744', 52.0, 4.0,
+                 90, 2000, 200)
+    addroutes(traffic_, rng)
+    table = traffic_.ap.routetable
+    assert np.allclose(table.remaining(), reference(traffic_))
+    iwp, valid = table.actwp()
+    assert np.all(valid)
+    assert np.allclose(table.lat[iwp], traffic_.actwp.lat)
+
+    # Route edits, waypoint passing and deletion of aircraft
+    traffic_.delete([0, 5, 6])
+    Route.delwpt(3, traffic_.ap.route[3].wpname[-1])
+    traffic_.ap.route[4].getnextwp()
+    Route.delrte(7)
+    addroutes(traffic_, rng, (5, 10))
+    assert np.allclose(table.remaining(), reference(traffic_))
+    assert table.nwp[7] == traffic_.ap.route[7].nwp
+
+    # Compaction keeps all routes intact
+    table.compact()
+    assert table.size == np.sum(table.nwp)
+    assert np.allclose(table.remaining(), reference(traffic_))
+    for idx, route in enumerate(traffic_.ap.route):
+        i0 = table.offset[idx]
+        assert list(table.name[i0:i0 + table.nwp[idx]]) == route.wpname
+    traffic_.reset()
@@ -0,0 +1,62 @@
+"""
+Tests the compiled scenario files, and feeding scenario commands to the stack.
+"""
+import os
+import bluesky
+from bluesky.stack import simstack, scenariofile
+from bluesky.stack.stackbase import Stack, checkscen
+from bluesky.network.server import split_scenarios
+
+
+SCENARIO = '''# Batch file
+00:00:00.00>SCEN FIRST
+00:00:00.00>CRE KL001 B744 52 4 90 FL100 250
+00:00:10.00>ALT KL001 FL200; SPD KL001 250
+00:00:20.00>ALT \\
+    KL001, FL300
+00:00:00.00>SCEN SECOND
+00:00:00.00>CRE KL001 B744 52 4 90 FL100 250
+00:01:00.00>ALT KL001 FL200; SPD KL001 250
+'''
+
+
+def test_scenariofile(tmp_path, monkeypatch):
+    monkeypatch.setattr(bluesky.settings, 'scenario_compile_minsize', 0, raising=False)
+    fname = str(tmp_path / 'batch.scn')
+    with open(fname, 'w') as f:
+        f.write(SCENARIO)
+    lines = list(simstack.readscnlines(fname))
+
+    # The first load stores the compiled file, the second load uses it
+    scen = scenariofile.load(fname, simstack.readscnlines)
+    assert os.path.exists(fname + scenariofile.extension)
+    scen = scenariofile.load(fname, lambda fname: [])
+    assert list(scen) == lines
+    assert len(scen.cmdtable) == 5
+    assert scen.scencmd[1] is scen.scencmd[5]
+    assert list(scen.scenidx) == [0, 4]
+    assert not scen.issorted()
+
+    # Splitting with the compiled SCEN indices is equal to splitting the text
+    scentime, scencmd = [t for t, _ in lines], [c for _, c in lines]
+    assert list(split_scenarios(scentime, scencmd, scen.scenidx.tolist())) == \
+        list(split_scenarios(scentime, scencmd))
+
+    # A modified scenario file is compiled again
+    with open(fname, 'a') as f:
+        f.write('00:02:00.00>HOLD\n')
+    scen = scenariofile.load(fname, simstack.readscnlines)
+    assert list(scen)[-1] == (120.0, 'HOLD')
+
+
+def test_checkscen(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.sim, 'simt', 0.0)
+    Stack.reset()
+    bluesky.stack.set_scendata([0.0, 5.0, 5.0, 10.0], ['A', 'B', 'C', 'D'])
+    checkscen()
+    assert [line for line, _ in Stack.cmdstack] == ['A']
+    bluesky.sim.simt = 5.0
+    checkscen()
+    assert [line for line, _ in Stack.cmdstack] == ['A', 'B', 'C']
+    assert Stack.scencmd == ['D'] and Stack.scentime == [10.0]
+    Stack.reset()
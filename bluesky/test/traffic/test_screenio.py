@@ -0,0 +1,52 @@
+"""
+Tests the delta encoding of static aircraft data in the ACDATA stream.
+"""
+import numpy as np
+import bluesky
+
+
+def send_acdata(monkeypatch):
+    ''' Call send_aircraft_data and return the data of the ACDATA stream. '''
+    sent = dict()
+    monkeypatch.setattr(bluesky.net, 'send_stream',
+                        lambda name, data: sent.update(data))
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args: None)
+    bluesky.scr.send_aircraft_data()
+    return sent
+
+
+def test_acdata_static_patches(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args: None)
+    traffic_.reset()
+    bluesky.scr.reset()
+    traffic_.cre(['ACD1', 'ACD2', 'ACD3'], 'B744', 52.0, 4.0, 90, 2000, 200)
+
+    # First update is a keyframe with the static data of all aircraft
+    data = send_acdata(monkeypatch)
+    slots = data['slot'].tolist()
+    assert len(set(slots)) == 3
+    assert data['static']['keyframe']
+    assert data['static']['slot'].tolist() == slots
+    assert data['static']['id'] == ['ACD1', 'ACD2', 'ACD3']
+    assert data['lat'].dtype == np.float32
+
+    # Nothing changed: no static data is sent
+    data = send_acdata(monkeypatch)
+    assert 'static' not in data
+
+    # Only the changed aircraft is sent, slot ids are stable on delete
+    traffic_.lvnlvars.rwy[2] = '18R'
+    traffic_.delete(0)
+    data = send_acdata(monkeypatch)
+    assert data['slot'].tolist() == slots[1:]
+    assert not data['static']['keyframe']
+    assert data['static']['slot'].tolist() == [slots[2]]
+    assert data['static']['id'] == ['ACD3']
+    assert data['static']['rwy'] == ['18R']
+
+    # New aircraft get a new slot id
+    traffic_.cre('ACD4', 'B744', 52.0, 4.0, 90, 2000, 200)
+    data = send_acdata(monkeypatch)
+    assert data['slot'][-1] not in slots
+    assert data['static']['id'] == ['ACD4']
+    traffic_.reset()
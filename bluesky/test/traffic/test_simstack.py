@@ -0,0 +1,73 @@
+"""
+Tests the compiled command dispatch of the simulation stack.
+"""
+import numpy as np
+import bluesky
+from bluesky.stack import simstack, argparser
+from bluesky.stack.stackbase import Stack
+from bluesky.tools.aero import ft, kts
+
+
+def process(*cmdlines, sender_id=None):
+    bluesky.stack.stack(*cmdlines, sender_id=sender_id)
+    simstack.process()
+
+
+def test_compiledline(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args: None)
+    traffic_.reset()
+    traffic_.cre(['KL001', 'KL002'], 'B744', 52.0, 4.0, 90, 2000, 200)
+
+    # Static arguments are parsed once, aircraft ids at execution
+    line = simstack.getcompiled('ALT KL001 FL100')
+    _, cmdu, cmdobj, _, _, args = line.dispatch()
+    assert cmdu == 'ALT' and cmdobj.name == 'ALT'
+    assert isinstance(args[0], argparser.AcidRef)
+    assert np.isclose(args[1], 10000 * ft)
+    assert simstack.getcompiled('ALT KL001 FL100') is line
+
+    # Heading arguments depend on reference data, and are parsed at execution
+    assert simstack.getcompiled('HDG KL001 90').dispatch()[-1] is None
+
+    # Lines starting with an aircraft id only use the aircraft variant when
+    # the aircraft exists
+    line = simstack.getcompiled('KL003 ALT FL150')
+    assert line.dispatch()[2] is None
+    process('CRE KL003 B744 52 4 90 FL100 250', 'KL003 ALT FL150')
+    assert line.dispatch()[1] == 'ALT'
+    assert np.isclose(traffic_.selalt[2], 15000 * ft)
+
+    # Errors in compiled lines are reported at execution
+    echoes = list()
+    monkeypatch.setattr(bluesky.scr, 'echo', lambda text, flags=0: echoes.append(text))
+    process('ALT KL999 FL100')
+    assert 'KL999 not found' in echoes[-1]
+    traffic_.reset()
+
+
+def test_bulkdispatch(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.net, 'send_event', lambda *args: None)
+    traffic_.reset()
+    acids = [f'BK{i:03d}' for i in range(10)]
+    traffic_.cre(acids, 'B744', 52.0, 4.0, 90, 2000, 200)
+
+    calls = list()
+    cmdobj = bluesky.stack.get_commands()['SPD']
+    callback = cmdobj.call
+    monkeypatch.setattr(cmdobj, 'call', lambda args: calls.append(args) or callback(args))
+
+    # Scenario lines with the same command are combined in one call, until
+    # an aircraft is repeated
+    lines = [f'SPD {acid} {200 + i}' for i, acid in enumerate(acids)]
+    process(*lines, 'SPD BK000 180')
+    assert len(calls) == 2
+    assert list(calls[0][0]) == list(range(10))
+    assert np.allclose(traffic_.selspd, np.array([180] + list(range(201, 210))) * kts)
+
+    # Commands from a client are executed one by one
+    calls.clear()
+    process(*lines, sender_id=b'client')
+    assert len(calls) == len(lines)
+    assert np.allclose(traffic_.selspd, np.arange(200, 210) * kts)
+    traffic_.reset()
+    Stack.reset()
@@ -0,0 +1,40 @@
+"""
+Tests the sparse (spatially indexed) state-based conflict detection against
+the dense StateBased implementation.
+"""
+import numpy as np
+from bluesky.tools.aero import nm, ft
+from bluesky.traffic.asas import StateBased, SparseStateBased
+from bluesky.test.benchmarks.bench_cd import synthetic_traffic
+
+
+def test_sparse_equals_dense():
+    """
+    Sparse detection should give exactly the same conflicts, in the same
+    order, as dense detection.
+    """
+    traf = synthetic_traffic(800, density=200.0, seed=1)
+    traf.vs = np.random.default_rng(2).normal(0.0, 5.0, traf.ntraf)
+    rpz = np.ones(traf.ntraf) * 5.0 * nm
+    rpz[::7] = 3.0 * nm
+    hpz = np.ones(traf.ntraf) * 1000.0 * ft
+    dtlook = np.ones(traf.ntraf) * 300.0
+    dtlook[::5] = 120.0
+
+    dense = StateBased.detect(None, traf, traf, rpz, hpz, dtlook)
+    sparse = SparseStateBased.detect(None, traf, traf, rpz, hpz, dtlook)
+
+    assert dense[0]
+    assert dense[0] == sparse[0]
+    assert dense[1] == sparse[1]
+    for dval, sval in zip(dense[2:], sparse[2:]):
+        np.testing.assert_allclose(dval, sval)
+
+
+def test_sparse_single_aircraft():
+    """
+    Detection with a single aircraft should not find any conflicts.
+    """
+    traf = synthetic_traffic(1)
+    result = SparseStateBased.detect(None, traf, traf, np.ones(1), np.ones(1), np.ones(1))
+    assert not result[0] and not result[1]
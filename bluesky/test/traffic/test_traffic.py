@@ -146,4 +146,21 @@ def test_traffic_reset(traffic_):
     validate_lengths(traffic_, 0)
 
 
+def test_traffic_idindex(traffic_):
+    """
+    Test the id to index mapping after creation and deletion.
+
+    Expects the index of every id in the mapping to match the id list.
+    """
+    traffic_.reset()
+    traffic_.cre(['ID%d' % i for i in range(10)], 'B744', 52.0, 4.0, 90, 2000, 200)
+    traffic_.delete(3)
+    traffic_.delete([0, 5, 8])
+    traffic_.cre('ID10', 'B744', 52.0, 4.0, 90, 2000, 200)
+    assert traffic_.idindex == {acid: i for i, acid in enumerate(traffic_.id)}
+    assert len(traffic_.idindex) == traffic_.ntraf == 7
+    traffic_.reset()
+    assert not traffic_.idindex
+
+
 # test remaining traffic functions
@@ -37,6 +37,7 @@ def t_a(pytestconfig):
             with self.settrafarrays():
                 self.np_array_bool = np.array([], dtype=bool)
                 self.np_array_int = np.array([], dtype=int)
+                self.np_array_2d = np.zeros((0, 3, 2), dtype=np.float32)
 
     class TestRoot(TrafficArrays):
         """
@@ -142,3 +143,77 @@ def test_trafficarrays_reset(t_a):
 
     assert not root.fl_list
     assert not root.children[0].np_array_bool
+
+
+def test_trafficarrays_buffer_growth(t_a):
+    """
+    Tests that arrays are views on preallocated buffers, which
+    are reused until their capacity is exceeded.
+    """
+    root, _tcclass = t_a
+    root.reset()
+    child = root.test_child
+
+    root.create(10)
+    root.create_children(10)
+    buf = child.np_array_int.base
+    assert len(buf) > 10
+    child.np_array_int[:] = np.arange(10)
+
+    root.create(5)
+    root.create_children(5)
+    assert child.np_array_int.base is buf
+    assert list(child.np_array_int) == list(range(10)) + 5 * [0]
+
+    # Replacing an array with a new one should not affect the old one
+    old = child.np_array_int
+    child.np_array_int = child.np_array_int + 1
+    root.create_children(1)
+    assert child.np_array_int.base is not buf
+    assert list(child.np_array_int) == list(range(1, 11)) + 5 * [1] + [0]
+    assert list(old) == list(range(10)) + 5 * [0]
+
+
+def test_trafficarrays_buffer_delete(t_a):
+    """
+    Tests deletion of single and multiple elements from buffered arrays.
+    """
+    root, _tcclass = t_a
+    root.reset()
+    child = root.test_child
+
+    root.create(8)
+    root.create_children(8)
+    root.int_list[:] = list(range(8))
+    child.np_array_int[:] = np.arange(8)
+    old = child.np_array_int
+
+    root.delete(-1)
+    root.delete([0, 3, 5])
+
+    assert root.int_list == [1, 2, 4, 6]
+    assert list(child.np_array_int) == [1, 2, 4, 6]
+    assert list(old) == list(range(8))
+
+
+def test_trafficarrays_multidim(t_a):
+    """
+    Tests creation, deletion and reset of arrays with more than one dimension.
+    """
+    root, _tcclass = t_a
+    root.reset()
+    child = root.test_child
+
+    root.create(4)
+    root.create_children(4)
+    assert child.np_array_2d.shape == (4, 3, 2)
+    assert not child.np_array_2d.any()
+    child.np_array_2d[:] = np.arange(4)[:, np.newaxis, np.newaxis]
+
+    root.delete(1)
+    root.delete([0, 2])
+    assert child.np_array_2d.shape == (1, 3, 2)
+    assert np.all(child.np_array_2d == 2)
+
+    root.reset()
+    assert child.np_array_2d.shape == (0, 3, 2)
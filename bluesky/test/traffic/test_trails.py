@@ -0,0 +1,51 @@
+"""
+Tests the circular trail segment buffer.
+"""
+import numpy as np
+import bluesky
+
+
+def step(traffic_, simt):
+    ''' Move all aircraft north, and update the trails at time simt. '''
+    bluesky.sim.simt = simt
+    traffic_.lat = traffic_.lat + 0.01
+    traffic_.trails.update()
+
+
+def test_trails(traffic_, monkeypatch):
+    monkeypatch.setattr(bluesky.sim, 'simt', 0.0)
+    traffic_.reset()
+    trails = traffic_.trails
+    monkeypatch.setattr(trails, 'capacity', 10)
+    trails.clear()
+    trails.setTrails(True, 1.0)
+    traffic_.cre(['TRL1', 'TRL2', 'TRL3'], 'B744', 52.0, 4.0, 90, 2000, 200)
+    trails.changeTrailColor('RED', 1)
+
+    # One segment per aircraft per update
+    step(traffic_, 2.0)
+    assert trails.nseg == 3
+    lat0, _, lat1, _, time = trails.getnew()
+    assert np.allclose(lat1 - lat0, 0.01, atol=1e-5) and np.all(time == 2.0)
+    assert trails.col[1].tolist() == [255, 0, 0]
+    assert trails.nnew == 0
+
+    # The buffer holds at most capacity segments, the newest ones
+    for t in (4.0, 6.0, 8.0):
+        step(traffic_, t)
+    assert trails.nseg == 10 and trails.nnew == 9
+    assert list(trails.time) == [2.0] + 3 * [4.0] + 3 * [6.0] + 3 * [8.0]
+    assert np.all(np.diff(trails.lat0[1:].reshape(3, 3), axis=0) > 0.0)
+
+    # Foreground/background split for pygame
+    trails.buffer()
+    step(traffic_, 10.0)
+    assert list(trails.time) == 3 * [10.0]
+    assert list(trails.bgtime) == [4.0] + 3 * [6.0] + 3 * [8.0]
+
+    # Segments older than the maximum age are evicted
+    trails.maxage = 5.0
+    step(traffic_, 12.0)
+    assert trails.nseg == 9 and trails.bgtime.min() == 8.0
+    trails.setTrails(False)
+    traffic_.reset()
@@ -0,0 +1,99 @@
+"""
+Tests the GRID and KNN interpolation methods of the wind field.
+"""
+import numpy as np
+from bluesky.traffic.windfield import Windfield
+
+
+def makefield(mode, profile=False):
+    ''' Regular 5x6 grid with a wind that is linear in lat, lon and alt. '''
+    wind = Windfield()
+    wind.mode = mode
+    alts = np.array([0.0, 5000.0, 10000.0])
+    for lat in np.linspace(50.0, 54.0, 5):
+        for lon in np.linspace(2.0, 7.0, 6):
+            vn = 2.0 * lat - lon
+            ve = lat + 3.0 * lon
+            if profile:
+                vn = vn + alts / 1000.0
+                ve = ve - alts / 500.0
+                wind.addpoint(lat, lon, np.degrees(np.arctan2(-ve, -vn)),
+                              np.sqrt(vn * vn + ve * ve), alts)
+            else:
+                wind.addpoint(lat, lon, np.degrees(np.arctan2(-ve, -vn)),
+                              np.sqrt(vn * vn + ve * ve))
+    return wind
+
+
+def positions(n=50):
+    rng = np.random.default_rng(1)
+    return 50.0 + 4.0 * rng.random(n), 2.0 + 5.0 * rng.random(n), 9000.0 * rng.random(n)
+
+
+def test_windfield_grid(traffic_):
+    lat, lon, alt = positions()
+    vn, ve = makefield('GRID').getdata(lat, lon)
+    assert np.allclose(vn, 2.0 * lat - lon)
+    assert np.allclose(ve, lat + 3.0 * lon)
+
+    vn, ve = makefield('GRID', profile=True).getdata(lat, lon, alt)
+    assert np.allclose(vn, 2.0 * lat - lon + alt / 1000.0, atol=0.05)
+    assert np.allclose(ve, lat + 3.0 * lon - alt / 500.0, atol=0.05)
+
+
+def test_windfield_grid_fallback(traffic_):
+    wind = makefield('GRID')
+    wind.addpoint(52.5, 4.5, 90.0, 10.0)
+    assert wind.fieldindex() is None
+    lat, lon, _ = positions()
+    wind.mode = 'IDW'
+    vnidw, veidw = wind.getdata(lat, lon)
+    wind.mode = 'GRID'
+    vn, ve = wind.getdata(lat, lon)
+    assert np.array_equal(vn, vnidw) and np.array_equal(ve, veidw)
+
+
+def test_windfield_knn(traffic_):
+    lat, lon, alt = positions()
+    wind = makefield('IDW', profile=True)
+    vnidw, veidw = wind.getdata(lat, lon, alt)
+
+    # With all points as neighbours KNN is equal to IDW
+    wind.mode = 'KNN'
+    wind.knn = wind.nvec
+    vn, ve = wind.getdata(lat, lon, alt)
+    assert np.allclose(vn, vnidw) and np.allclose(ve, veidw)
+
+    # Neighbours are cached until a position moved more than a cell
+    wind.knn = 4
+    wind.clearindex()
+    wind.getdata(lat, lon, alt)
+    idx = wind.knncache[len(lat)]['idx'].copy()
+    wind.getdata(lat + 1e-3, lon, alt)
+    assert np.array_equal(wind.knncache[len(lat)]['idx'], idx)
+    wind.getdata(lat + 2.0, lon, alt)
+    assert not np.array_equal(wind.knncache[len(lat)]['idx'], idx)
+
+
+def test_windmode(traffic_):
+    wind = traffic_.wind
+    wind.clear()
+    for lat in np.linspace(50.0, 54.0, 5):
+        for lon in np.linspace(2.0, 7.0, 6):
+            wind.addpoint(lat, lon, 90.0, lat + lon)
+    lat, lon, _ = positions()
+    assert wind.setmode('KNN', 8)
+    wind.getdata(lat, lon)
+    assert wind.knncache[len(lat)]['idx'].shape == (len(lat), 8)
+
+    # An unknown mode changes nothing
+    assert wind.setmode('FOO', 4)[0] is False
+    assert wind.mode == 'KNN' and wind.knn == 8
+
+    # Cached neighbours are cleared when k changes
+    assert wind.setmode('', 4)
+    vn, _ = wind.getdata(lat, lon)
+    assert wind.knncache[len(lat)]['idx'].shape == (len(lat), 4)
+    assert np.all(np.isfinite(vn))
+    wind.setmode('IDW', 8)
+    wind.clear()
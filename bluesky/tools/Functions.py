@@ -84,14 +84,14 @@ def find_height_levels(df, point, lat, lon):
     layer_min = layer_plus = -1
     value_m = value_p = -1
     for i in range(len(df_t)):
-        if point[1] > df_t.iloc[i][4]:
+        if point[1] > df_t.iloc[i, 4]:
             if i - 1 >= 0:
                 layer_min = i
                 layer_plus = i - 1
                 break
     if layer_min != -1 and layer_plus != -1:
-        value_m = [df_t.iloc[layer_min][4], lat, lon, df_t.iloc[layer_min][5], df_t.iloc[layer_min][6]]
-        value_p = [df_t.iloc[layer_plus][4], lat, lon, df_t.iloc[layer_plus][5], df_t.iloc[layer_plus][6]]
+        value_m = [df_t.iloc[layer_min, 4], lat, lon, df_t.iloc[layer_min, 5], df_t.iloc[layer_min, 6]]
+        value_p = [df_t.iloc[layer_plus, 4], lat, lon, df_t.iloc[layer_plus, 5], df_t.iloc[layer_plus, 6]]
     return value_m, value_p
 
 def interpolation(value_mmm, value_mmp, value_mpm, value_mpp, value_pmm, value_pmp, value_ppm, value_ppp, alt, lat, lon):
@@ -52,6 +52,36 @@ def checkInside(areaname, lat, lon, alt):
     area = basic_shapes[areaname]
     return area.checkInside(lat, lon, alt)
 
+def classify(lat, lon, alt, areanames=None):
+    """ Check for all points with coordinates lat, lon, alt in which of the
+        areas in areanames (default: all areas) they are.
+        Returns a boolean membership matrix with a row for each point,
+        and a column for each area. True == Inside
+
+        Only the areas whose bounding box overlaps with the bounding box
+        of all points are tested, and per area only the points inside its
+        bounding box. """
+    lat, lon = np.atleast_1d(lat, lon)
+    alt = np.broadcast_to(alt, lat.shape)
+    areanames = list(basic_shapes) if areanames is None else list(areanames)
+    inside = np.zeros((len(lat), len(areanames)), dtype=bool)
+    if not len(lat) or not areanames:
+        return inside
+
+    column = {name: i for i, name in enumerate(areanames)}
+    for area in get_intersecting(lat.min(), lon.min(), lat.max(), lon.max()):
+        # Skip areas that aren't requested, and replaced areas that are
+        # still in the tree
+        icol = column.get(area.name)
+        if icol is None or basic_shapes.get(area.name) is not area:
+            continue
+        lat0, lon0, lat1, lon1 = area.bbox
+        sel = np.flatnonzero((lat0 <= lat) & (lat <= lat1) &
+                             (lon0 <= lon) & (lon <= lon1))
+        if len(sel):
+            inside[sel, icol] = area.checkInside(lat[sel], lon[sel], alt[sel])
+    return inside
+
 def deleteArea(areaname):
     """ Delete area with name 'areaname'. """
     if areaname in basic_shapes:
@@ -71,7 +101,7 @@ def get_intersecting(lat0, lon0, lat1, lon1):
           of the intersection area.
     '''
     items = Shape.areatree.intersection((lat0, lon0, lat1, lon1))
-    return [Shape.areas_by_id[i.id] for i in items]
+    return [Shape.areas_by_id[i] for i in items if i in Shape.areas_by_id]
 
 
 def get_knearest(lat0, lon0, lat1, lon1, k=1):
@@ -83,7 +113,7 @@ def get_knearest(lat0, lon0, lat1, lon1, k=1):
         - k: The (maximum) number of results to return.
     '''
     items = Shape.areatree.nearest((lat0, lon0, lat1, lon1), k)
-    return [Shape.areas_by_id[i.id] for i in items]
+    return [Shape.areas_by_id[i] for i in items if i in Shape.areas_by_id]
 
 
 class Shape:
@@ -103,9 +133,7 @@ class Shape:
         self.coordinates = coordinates
         self.top = np.maximum(bottom, top)
         self.bottom = np.minimum(bottom, top)
-        lat = coordinates[::2]
-        lon = coordinates[1::2]
-        self.bbox = [min(lat), min(lon), max(lat), max(lon)]
+        self.bbox = self.getbbox(coordinates)
         
         # Global weak reference and tree storage
         self.area_id = Shape.max_area_id
@@ -114,11 +142,19 @@ class Shape:
         Shape.areas_by_name[self.name] = self
         Shape.areatree.insert(self.area_id, self.bbox)
 
-    def __delete__(self):
+    def __del__(self):
         # Objects are removed automatically from the weak-value dicts,
         # but need to be manually removed from the rtree
         Shape.areatree.delete(self.area_id, self.bbox)
 
+    @staticmethod
+    def getbbox(coordinates):
+        ''' Return the bounding box [minlat, minlon, maxlat, maxlon] of this
+            shape. '''
+        lat = coordinates[::2]
+        lon = coordinates[1::2]
+        return [min(lat), min(lon), max(lat), max(lon)]
+
     def checkInside(self, lat, lon, alt):
         return False
 
@@ -180,6 +216,14 @@ class Circle(Shape):
         inside   = (distance <= self.r) & (self.bottom <= alt) & (alt <= self.top)
         return inside
 
+    @staticmethod
+    def getbbox(coordinates):
+        ''' Bounding box of a circle with coordinates [lat, lon, radius]. '''
+        clat, clon, r = coordinates[:3]
+        dlat = r / 60.0  # [NM] to [deg]
+        dlon = dlat / np.cos(np.radians(min(89.0, abs(clat) + dlat)))
+        return [clat - dlat, clon - dlon, clat + dlat, clon + dlon]
+
     def __str__(self):
         return f'{self.name} is a CIRCLE with ' \
             f'center ({self.clat}, {self.clon}) ' \
@@ -2,17 +2,29 @@
 
 # ToDo: Add description in comments
 
+import os
+import json
 import numbers
 import itertools
 from datetime import datetime
+from threading import Thread
+from queue import Queue, Empty
 import numpy as np
 from bluesky import settings, stack
 from bluesky.core import varexplorer as ve
 import bluesky as bs
 from bluesky.stack import command
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
 # Register settings defaults
-settings.set_variable_defaults(log_path='output')
+settings.set_variable_defaults(log_path='output', log_format='csv',
+                               log_chunksize=10000, log_buffers=64,
+                               log_maxwait=1.0)
 
 logprecision = '%.8f'
 
@@ -40,9 +52,9 @@ def crelogstack(name: 'txt', dt: float = None, header: 'string' = ''):
     return True, f'Created {"periodic" if dt else ""} logger {name}'
 
 
-def crelog(name, dt=None, header=''):
+def crelog(name, dt=None, header='', fmt=''):
     """ Create a new logger. """
-    allloggers[name] = allloggers.get(name, CSVLogger(name, dt or 0.0, header))
+    allloggers[name] = allloggers.get(name, CSVLogger(name, dt or 0.0, header, fmt))
     if dt:
         periodicloggers[name] = allloggers[name]
 
@@ -66,6 +78,9 @@ def reset():
     for log in allloggers.values():
         log.reset()
 
+    # Wait until all logged data is written
+    flush()
+
 
 def makeLogfileName(logname, prefix: str = ''):
     timestamp = datetime.now().strftime('%Y%m%d_%H-%M-%S')
@@ -98,11 +113,305 @@ def col2txt(col, nrows):
         yield nrows * [col]
 
 
+def col2arr(col, nrows):
+    """ Return a log column as one or more one-dimensional arrays of nrows
+        elements, the binary counterpart of col2txt. """
+    if isinstance(col, (list, np.ndarray)):
+        arr = np.asarray(col)
+        if arr.ndim > 1:
+            yield from arr.T
+        else:
+            yield arr
+    else:
+        yield np.broadcast_to(col, nrows)
+
+
+class LogSink:
+    """ Base class of the log file formats. Samples are collected in chunks
+        of log_chunksize rows, which are written by the derived classes. """
+    ext = ''
+
+    def __init__(self, fname, header, columns):
+        self.fname = fname
+        self.header = header
+        self.columns = columns
+        self.chunk = []
+        self.nrows = 0
+
+    def append(self, sample):
+        """ Append one sample: a list of equal-length column arrays. """
+        # A chunk can only contain samples with the same columns
+        if self.chunk and len(sample) != len(self.chunk[0]):
+            self.flush()
+        # Sample arrays are reused by the log buffers: store a copy
+        self.chunk.append([np.array(col) for col in sample])
+        self.nrows += len(sample[0])
+        if self.nrows >= settings.log_chunksize:
+            self.flush()
+
+    def writeline(self, line):
+        """ Write a line of text. Only supported by text formats. """
+        pass
+
+    def flush(self):
+        if self.chunk:
+            self.write([np.concatenate(col) for col in zip(*self.chunk)])
+            self.chunk = []
+            self.nrows = 0
+
+    def write(self, data):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class CSVSink(LogSink):
+    """ Comma-separated text log, with the header and column names as
+        comment lines. Samples are written directly. """
+    ext = '.log'
+
+    def __init__(self, fname, header, columns):
+        super().__init__(fname, header, columns)
+        self.file = open(fname, 'wb')
+        # Write the header
+        for line in header:
+            self.writeline('# ' + line + '\n')
+        # Write the column contents
+        self.writeline('# ' + str.join(', ', columns) + '\n')
+
+    def append(self, sample):
+        # Convert (numeric) arrays to text, leave text arrays untouched
+        txtdata = [txtcol for col in sample
+                   for txtcol in col2txt(col, len(col))]
+        np.savetxt(self.file, np.vstack(txtdata).T,
+                   delimiter=',', newline='\n', fmt='%s')
+
+    def writeline(self, line):
+        self.file.write(bytearray(line, 'ascii'))
+
+    def close(self):
+        self.file.close()
+
+
+class NpzSink(LogSink):
+    """ Append-only series of compressed .npz chunks in a log directory.
+        Each chunk contains the header and column names of the log, and
+        one array per data column (c0, c1, ...). """
+    def __init__(self, fname, header, columns):
+        super().__init__(fname, header, columns)
+        self.ichunk = 0
+        os.makedirs(fname, exist_ok=True)
+
+    def write(self, data):
+        np.savez_compressed(f'{self.fname}/chunk_{self.ichunk:05d}.npz',
+                            header=np.array(self.header),
+                            columns=np.array(self.columns),
+                            **{f'c{i}': col for i, col in enumerate(data)})
+        self.ichunk += 1
+
+
+class ParquetSink(LogSink):
+    """ Parquet log file, with one row group per chunk. The header and
+        column names of the log are stored in the schema metadata. """
+    ext = '.parquet'
+
+    def __init__(self, fname, header, columns):
+        super().__init__(fname, header, columns)
+        self.meta = {'header': json.dumps(header), 'columns': json.dumps(columns)}
+        self.writer = None
+
+    def write(self, data):
+        table = pa.table({f'c{i}': col for i, col in enumerate(data)})
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(
+                self.fname, table.schema.with_metadata(self.meta))
+        elif not table.schema.equals(self.writer.schema, check_metadata=False):
+            # Column layout changed: continue in a new file
+            self.writer.close()
+            self.fname = self.fname.replace('.parquet', '_.parquet')
+            self.writer = pq.ParquetWriter(
+                self.fname, table.schema.with_metadata(self.meta))
+        self.writer.write_table(table)
+
+    def close(self):
+        super().close()
+        if self.writer is not None:
+            self.writer.close()
+
+
+# Log formats
+sinks = dict(CSV=CSVSink, NPZ=NpzSink, PARQUET=ParquetSink)
+
+
+class LogWriter(Thread):
+    """ Background thread that performs all log file I/O, in the order in
+        which it was queued by the loggers in the simulation thread. """
+    def __init__(self):
+        super().__init__(daemon=True, name='LogWriter')
+        self.queue = Queue()
+        self.start()
+
+    def run(self):
+        while True:
+            fun, args = self.queue.get()
+            try:
+                fun(*args)
+            except Exception as e:
+                print(f'Datalog: error writing log: {e}')
+            finally:
+                self.queue.task_done()
+
+
+# The writer thread, started by the first logger that is opened
+writer = None
+
+
+def queuejob(fun, *args):
+    """ Queue a file I/O job for the writer thread. """
+    global writer
+    if writer is None:
+        writer = LogWriter()
+    writer.queue.put((fun, args))
+
+
+def flush():
+    """ Wait until the writer thread has finished all queued log I/O. """
+    if writer is not None:
+        writer.queue.join()
+
+
+class LogBuffer:
+    """ Ring of preallocated sample buffers of an open log. The simulation
+        thread copies each sample into a free buffer, which is written by
+        the writer thread, and then returned to the ring. """
+    def __init__(self, sinktype, fname, header, columns, nbuf):
+        self.sink = None
+        self.buffers = [[] for _ in range(nbuf)]
+        self.free = Queue()
+        for ibuf in range(nbuf):
+            self.free.put(ibuf)
+        self.nsamples = 0
+        self.maxdepth = 0
+        self.nlate = 0
+        self.ndropped = 0
+        queuejob(self.open, sinktype, fname, header, columns)
+
+    def open(self, sinktype, fname, header, columns):
+        self.sink = sinktype(fname, header, columns)
+
+    @property
+    def depth(self):
+        """ The number of samples waiting to be written. """
+        return len(self.buffers) - self.free.qsize()
+
+    def put(self, varlist, nrows):
+        """ Copy a sample into a free buffer, and queue it for writing.
+            When no buffer is free the sample is late: wait at most
+            log_maxwait seconds for the writer, or drop the sample. """
+        try:
+            ibuf = self.free.get_nowait()
+        except Empty:
+            self.nlate += 1
+            try:
+                ibuf = self.free.get(timeout=settings.log_maxwait)
+            except Empty:
+                self.ndropped += 1
+                return
+        buf = self.buffers[ibuf]
+        ncols = 0
+        for col in (arr for col in varlist for arr in col2arr(col, nrows)):
+            if ncols == len(buf):
+                buf.append(np.empty(0, dtype=col.dtype))
+            arr = buf[ncols]
+            # Reallocate when the buffer is too small or of another type
+            if len(arr) < nrows or arr.dtype.kind != col.dtype.kind or \
+                    not np.can_cast(col.dtype, arr.dtype):
+                dtype = np.promote_types(arr.dtype, col.dtype) if \
+                    arr.dtype.kind == col.dtype.kind else col.dtype
+                arr = buf[ncols] = np.empty(max(nrows, 2 * len(arr)), dtype=dtype)
+            arr[:nrows] = col
+            ncols += 1
+        del buf[ncols:]
+        queuejob(self.write, ibuf, nrows)
+        self.nsamples += 1
+        self.maxdepth = max(self.maxdepth, self.depth)
+
+    def write(self, ibuf, nrows):
+        try:
+            self.sink.append([arr[:nrows] for arr in self.buffers[ibuf]])
+        finally:
+            self.free.put(ibuf)
+
+    def writeline(self, line):
+        queuejob(lambda: self.sink.writeline(line))
+
+    def close(self):
+        queuejob(lambda: self.sink.close())
+
+
+@command(name='LOGSTATS')
+def logstats():
+    """ Show the sample buffer statistics of all open loggers. """
+    lines = [f'{name} ({log.fmt}): {log.buffer.nsamples} samples, '
+             f'{log.buffer.depth} queued (max {log.buffer.maxdepth} of '
+             f'{len(log.buffer.buffers)}), {log.buffer.nlate} late, '
+             f'{log.buffer.ndropped} dropped'
+             for name, log in allloggers.items() if log.isopen()]
+    if writer is not None:
+        lines.append(f'Writer queue: {writer.queue.qsize()} jobs')
+    return True, str.join('\n', lines) if lines else 'No open loggers'
+
+
+def readbinlog(fname):
+    """ Read a binary log, and return its header lines, column names,
+        and a generator of chunks (lists of column arrays). """
+    if fname.endswith('.parquet'):
+        pfile = pq.ParquetFile(fname)
+        meta = pfile.schema_arrow.metadata
+        chunks = ([col.to_numpy(zero_copy_only=False) for col in
+                   pfile.read_row_group(i).columns]
+                  for i in range(pfile.num_row_groups))
+        return json.loads(meta[b'header']), json.loads(meta[b'columns']), chunks
+
+    files = sorted(f for f in os.listdir(fname) if f.startswith('chunk_'))
+
+    def chunks():
+        for f in files:
+            with np.load(f'{fname}/{f}') as chunk:
+                yield [chunk[f'c{i}'] for i in range(len(chunk.files) - 2)]
+
+    with np.load(f'{fname}/{files[0]}') as chunk:
+        return chunk['header'].tolist(), chunk['columns'].tolist(), chunks()
+
+
+@command(name='LOGTOCSV')
+def tocsv(fname: 'string', csvname: 'string' = ''):
+    """ Convert a binary (NPZ or Parquet) log to the CSV log layout.
+
+        Arguments:
+        - fname: The binary log directory or Parquet file
+        - csvname: The name of the CSV file (default: fname with .log)
+    """
+    if not os.path.exists(fname):
+        return False, f'Log {fname} not found'
+    if fname.endswith('.parquet') and pa is None:
+        return False, 'Reading Parquet logs requires pyarrow'
+    header, columns, chunks = readbinlog(fname)
+    csvname = csvname or os.path.splitext(fname.rstrip('/'))[0] + '.log'
+    sink = CSVSink(csvname, header, columns)
+    for chunk in chunks:
+        sink.append(chunk)
+    sink.close()
+    return True, f'Converted {fname} to {csvname}'
+
+
 class CSVLogger:
-    def __init__(self, name, dt, header):
+    def __init__(self, name, dt, header, fmt=''):
         self.name = name
-        self.file = None
+        self.buffer = None
         self.fname = None
+        self.fmt = (fmt or settings.log_format).upper()
         self.dataparents = []
         self.header = header.split('\n')
         self.tlog = 0.0
@@ -114,13 +423,13 @@ class CSVLogger:
 
         # Register a command for this logger in the stack
         stackcmd = {name: [
-            name + ' ON/OFF,[dt] or ADD [FROM parent] var1,...,varn',
+            name + ' ON/OFF,[dt] or ADD [FROM parent] var1,...,varn or FORMAT CSV/NPZ/PARQUET',
             '[txt,float/word,...]', self.stackio, name + " data logging on"]
         }
         stack.append_commands(stackcmd)
 
     def write(self, line):
-        self.file.write(bytearray(line, 'ascii'))
+        self.buffer.writeline(line)
 
     def setheader(self, header):
         self.header = header.split('\n')
@@ -150,24 +459,26 @@ class CSVLogger:
         return True
 
     def open(self, fname):
-        if self.file:
-            self.file.close()
-        self.file = open(fname, 'wb')
-        # Write the header
-        for line in self.header:
-            self.file.write(bytearray('# ' + line + '\n', 'ascii'))
-        # Write the column contents
+        self.close()
         columns = ['simt']
         for v in self.selvars:
             columns.append(v.varname)
-        self.file.write(
-            bytearray('# ' + str.join(', ', columns) + '\n', 'ascii'))
+        # Without pyarrow, Parquet logs are written as NPZ chunks
+        sink = sinks['NPZ' if self.fmt == 'PARQUET' and pa is None else self.fmt]
+        self.fname = os.path.splitext(fname)[0] + sink.ext
+        self.buffer = LogBuffer(sink, self.fname, self.header, columns,
+                                settings.log_buffers)
+
+    def close(self):
+        if self.buffer:
+            self.buffer.close()
+            self.buffer = None
 
     def isopen(self):
-        return self.file is not None
+        return self.buffer is not None
 
     def log(self, *additional_vars):
-        if self.file and bs.sim.simt >= self.tlog:
+        if self.buffer and bs.sim.simt >= self.tlog:
             # Set the next log timestep
             self.tlog += self.dt
 
@@ -184,13 +495,9 @@ class CSVLogger:
                     break
             if nrows == 0:
                 return
-            # Convert (numeric) arrays to text, leave text arrays untouched
-            txtdata = [
-                txtcol for col in varlist for txtcol in col2txt(col, nrows)]
 
-            # log the data to file
-            np.savetxt(self.file, np.vstack(txtdata).T,
-                       delimiter=',', newline='\n', fmt='%s')
+            # Copy the data, and leave the writing to the writer thread
+            self.buffer.put(varlist, nrows)
 
     def start(self, prefix: str = ''):
         """ Start this logger. """
@@ -202,9 +509,7 @@ class CSVLogger:
         self.dt = self.default_dt
         self.tlog = 0.0
         self.fname = None
-        if self.file:
-            self.file.close()
-            self.file = None
+        self.close()
 
     def listallvarnames(self):
         return str.join(', ', (v.varname for v in self.selvars))
@@ -218,9 +523,11 @@ class CSVLogger:
                 text += 'a non-periodic logger.\n'
 
             text += 'with variables: ' + self.listallvarnames() + '\n'
+            text += 'Log format: ' + self.fmt + '\n'
             text += self.name + ' is ' + ('ON' if self.isopen() else 'OFF') + \
                 '\nUsage: ' + self.name + \
-                ' ON/OFF,[dt] or ADD [FROM parent] var1,...,varn'
+                ' ON/OFF,[dt] or ADD [FROM parent] var1,...,varn' + \
+                ' or FORMAT CSV/NPZ/PARQUET'
             return True, text
             # TODO: add list of logging vars
         elif args[0] == 'ON':
@@ -237,4 +544,12 @@ class CSVLogger:
         elif args[0] == 'ADD':
             return self.addvars(list(args[1:]))
 
+        elif args[0] == 'FORMAT':
+            fmt = str(args[1]).upper() if len(args) > 1 else ''
+            if fmt not in sinks:
+                return False, 'Log format should be CSV, NPZ or PARQUET'
+            if fmt == 'PARQUET' and pa is None:
+                return False, 'Parquet logging requires pyarrow'
+            self.fmt = fmt
+
         return True
@@ -11,11 +11,6 @@ Created by  : Jacco M. Hoekstra
 """
 from time import strftime, gmtime
 import numpy as np
-try:
-    from collections.abc import Sized
-except ImportError:
-    # In python <3.3 collections.abc doesn't exist
-    from collections import Sized
 from .aero import cas2tas, mach2tas, kts, fpm, ft
 from .geo import magdec, latlondist
 import bluesky as bs
@@ -441,36 +436,46 @@ def findall(lst,x):
     return idx
 
 
-def get_indices(arr, items):
+def get_indices(arr, items, index=None):
     """
     Function: Get indices of items in array/list
     Args:
         arr:    array/list containing the items [array, list]
         items:  get indices of items [int, float, str, list, array]
+        index:  mapping of the (unique) elements in arr to their index,
+                e.g. Traffic.idindex [dict]
     Returns:
         i:      indices [array]
 
+    Remark: Without an index all occurrences of each item are found with a
+            binary search in a sorted copy of arr.
+
     Created by: Bob van Dillen
     Date: 1-12-2021
     """
 
-    # Check if there are items or items in the array
-    if isinstance(items, Sized) and (len(items) == 0 or len(arr) == 0):
-        i = np.array([]).astype(int)
-
-    else:
-        # Check for single item
-        if isinstance(items, (str, int, float)):
-            i = np.nonzero(np.array([items])[:, None] == arr)
-
-        else:
-            i = np.nonzero(np.array(items)[:, None] == arr)
-
-        # Check if item is found
-        if isinstance(i, tuple) and len(i) > 1:
-            i = i[1].astype(int)
+    # Check for single item
+    if isinstance(items, (str, int, float)):
+        items = [items]
 
-        else:
-            i = np.array([], dtype=np.int_)
-
-    return i
+    # Check if there are items or items in the array
+    if len(items) == 0 or len(arr) == 0:
+        return np.array([], dtype=int)
+
+    # Hash table lookup
+    if index is not None:
+        i = [index.get(item, -1) for item in items]
+        return np.array([ii for ii in i if ii >= 0], dtype=int)
+
+    # All occurrences of an item are adjacent in the sorted array
+    arr = np.asarray(arr)
+    order = np.argsort(arr, kind='stable')
+    arrsorted = arr[order]
+    items = np.asarray(items)
+    ifirst = np.searchsorted(arrsorted, items, side='left')
+    count = np.searchsorted(arrsorted, items, side='right') - ifirst
+
+    # Indices in the sorted array, per item in ascending order
+    isorted = np.repeat(ifirst - np.cumsum(count) + count, count) + np.arange(count.sum())
+
+    return order[isorted]
@@ -1,4 +1,5 @@
 from .detection import ConflictDetection
 from .resolution import ConflictResolution
 from .statebased import StateBased
-from .mvp import MVP
\ No newline at end of file
+from .mvp import MVP
+from .sparsestatebased import SparseStateBased
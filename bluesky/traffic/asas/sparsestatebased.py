@@ -0,0 +1,156 @@
+''' State-based conflict detection using a spatial index to find candidate
+    aircraft pairs, instead of evaluating all ntraf x ntraf combinations. '''
+import numpy as np
+from scipy.spatial import cKDTree
+
+from bluesky.tools import geo
+from bluesky.tools.aero import nm, Rearth
+from bluesky.traffic.asas.statebased import StateBased
+
+
+def xyz(lat, lon):
+    ''' Convert lat/lon [deg] to cartesian coordinates [m] on a spherical
+        earth. Used to build the spatial index, which makes the search
+        independent of dateline crossings and convergence of meridians. '''
+    latrad = np.radians(lat)
+    lonrad = np.radians(lon)
+    coslat = np.cos(latrad)
+    return Rearth * np.column_stack((coslat * np.cos(lonrad),
+                                     coslat * np.sin(lonrad),
+                                     np.sin(latrad)))
+
+
+# Relative margin on the search radius, to account for the difference between
+# the chord distance in the spatial index and the flat-earth distance used
+# in the conflict detection itself
+margin = 1.01
+
+
+def candidatepairs(ownship, intruder, rpz, dtlookahead):
+    ''' Find all (ownship, intruder) index pairs that can possibly get in
+        conflict within the lookahead time.
+
+        The search radius is the largest protected zone radius plus the
+        distance both aircraft can travel towards each other within the
+        largest lookahead time. Pairs are pruned afterwards with their own
+        speeds and lookahead time, and returned sorted in row-major order,
+        i.e., in the same order as np.where on a dense conflict matrix. '''
+    gsmax = max(np.max(ownship.gs), np.max(intruder.gs))
+    dtmax = np.max(dtlookahead)
+    rsearch = margin * (np.max(rpz) + 2.0 * gsmax * dtmax)
+
+    owntree = cKDTree(xyz(ownship.lat, ownship.lon))
+    inttree = cKDTree(xyz(intruder.lat, intruder.lon))
+    pairs = owntree.sparse_distance_matrix(inttree, rsearch, output_type='ndarray')
+
+    # Remove ownship-ownship pairs
+    pairs = pairs[pairs['i'] != pairs['j']]
+    i = pairs['i'].astype(int)
+    j = pairs['j'].astype(int)
+
+    # Prune with the reach of each individual pair
+    gsij = np.maximum(ownship.gs[i] + intruder.gs[j], ownship.gs[j] + intruder.gs[i])
+    reach = np.maximum(rpz[i], rpz[j]) + gsij * np.maximum(dtlookahead[i], dtlookahead[j])
+    keep = pairs['v'] <= margin * reach
+    i, j = i[keep], j[keep]
+
+    # Sort to obtain the same ordering as a dense detection matrix
+    order = np.argsort(i * ownship.ntraf + j, kind='stable')
+    return i[order], j[order]
+
+
+class SparseStateBased(StateBased):
+    ''' State-based conflict detection that only evaluates candidate pairs
+        found with a KD-tree over aircraft positions. The results are
+        identical to StateBased, but time and memory scale with the number
+        of nearby aircraft pairs instead of ntraf squared. '''
+    def detect(self, ownship, intruder, rpz, hpz, dtlookahead):
+        ''' Conflict detection between ownship (traf) and intruder (traf/adsb).'''
+        inconf = np.zeros(ownship.ntraf, dtype=bool)
+        tcpamax = np.zeros(ownship.ntraf)
+        if ownship.ntraf < 2:
+            return [], [], inconf, tcpamax, np.array([]), np.array([]), \
+                np.array([]), np.array([]), np.array([])
+
+        # Note that in the dense implementation element [i, j] combines
+        # properties of ownship j with intruder i for the relative states.
+        # The same convention is followed here to obtain identical results.
+        i, j = candidatepairs(ownship, intruder, rpz, dtlookahead)
+
+        # Horizontal conflict ------------------------------------------------------
+        qdr, dist = geo.kwikqdrdist(ownship.lat[i], ownship.lon[i],
+                                    intruder.lat[j], intruder.lon[j])
+        dist = dist * nm
+
+        # Calculate horizontal closest point of approach (CPA)
+        qdrrad = np.radians(qdr)
+        dx = dist * np.sin(qdrrad)  # is pos j rel to i
+        dy = dist * np.cos(qdrrad)  # is pos j rel to i
+
+        owntrkrad = np.radians(ownship.trk)
+        ownu = ownship.gs * np.sin(owntrkrad)  # m/s
+        ownv = ownship.gs * np.cos(owntrkrad)  # m/s
+
+        inttrkrad = np.radians(intruder.trk)
+        intu = intruder.gs * np.sin(inttrkrad)  # m/s
+        intv = intruder.gs * np.cos(inttrkrad)  # m/s
+
+        du = ownu[j] - intu[i]
+        dv = ownv[j] - intv[i]
+
+        dv2 = du * du + dv * dv
+        dv2 = np.where(np.abs(dv2) < 1e-6, 1e-6, dv2)  # limit lower absolute value
+        vrel = np.sqrt(dv2)
+
+        tcpa = -(du * dx + dv * dy) / dv2
+
+        # Calculate distance^2 at CPA (minimum distance^2)
+        dcpa2 = np.abs(dist * dist - tcpa * tcpa * dv2)
+
+        # Check for horizontal conflict
+        rpzij = np.maximum(rpz[i], rpz[j])
+        R2 = rpzij * rpzij
+        swhorconf = dcpa2 < R2  # conflict or not
+
+        # Calculate times of entering and leaving horizontal conflict
+        dxinhor = np.sqrt(np.maximum(0., R2 - dcpa2))  # half the distance travelled inzide zone
+        dtinhor = dxinhor / vrel
+
+        tinhor = np.where(swhorconf, tcpa - dtinhor, 1e8)  # Set very large if no conf
+        touthor = np.where(swhorconf, tcpa + dtinhor, -1e8)  # set very large if no conf
+
+        # Vertical conflict --------------------------------------------------------
+        dalt = ownship.alt[j] - intruder.alt[i]
+
+        dvs = ownship.vs[j] - intruder.vs[i]
+        dvs = np.where(np.abs(dvs) < 1e-6, 1e-6, dvs)  # prevent division by zero
+
+        hpzij = np.maximum(hpz[i], hpz[j])
+        tcrosshi = (dalt + hpzij) / -dvs
+        tcrosslo = (dalt - hpzij) / -dvs
+        tinver = np.minimum(tcrosshi, tcrosslo)
+        toutver = np.maximum(tcrosshi, tcrosslo)
+
+        # Combine vertical and horizontal conflict----------------------------------
+        tinconf = np.maximum(tinver, tinhor)
+        toutconf = np.minimum(toutver, touthor)
+
+        swconfl = swhorconf * (tinconf <= toutconf) * (toutconf > 0.0) * \
+            (tinconf < dtlookahead[i])
+
+        # --------------------------------------------------------------------------
+        # Update conflict lists
+        # --------------------------------------------------------------------------
+        # Ownship conflict flag and max tCPA
+        iconf = i[swconfl]
+        inconf[iconf] = True
+        np.maximum.at(tcpamax, iconf, tcpa[swconfl])
+
+        # Select conflicting pairs: each a/c gets their own record
+        confpairs = [(ownship.id[a], ownship.id[b]) for a, b in zip(iconf, j[swconfl])]
+        swlos = (dist < rpzij) * (np.abs(dalt) < hpzij)
+        lospairs = [(ownship.id[a], ownship.id[b]) for a, b in zip(i[swlos], j[swlos])]
+
+        return confpairs, lospairs, inconf, tcpamax, \
+            qdr[swconfl], dist[swconfl], np.sqrt(dcpa2[swconfl]), \
+            tcpa[swconfl], tinconf[swconfl]
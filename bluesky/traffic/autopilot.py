@@ -14,6 +14,7 @@ from bluesky.tools.position import txt2pos
 from bluesky.tools.aero import ft, nm, fpm, vcasormach2tas, vcas2tas, tas2cas, cas2tas, g0
 from bluesky.core import Entity, timed_function
 from .route import Route
+from .routetable import RouteTable
 
 bs.settings.set_variable_defaults(fms_dt=10.5)
 
@@ -63,6 +64,9 @@ class Autopilot(Entity, replaceable=True):
             # Route objects
             self.route = []
 
+            # Columnar copy of all routes
+            self.routetable = RouteTable()
+
     def create(self, n=1):
         super().create(n)
 
@@ -523,7 +527,7 @@ class Autopilot(Entity, replaceable=True):
         else:
             return False
 
-    @stack.command(name='ALT')
+    @stack.command(name='ALT', bulk=('idx', 'alt'))
     def selaltcmd(self, idx: 'acid', alt: 'alt', vspd: 'vspd' = None):
         """ ALT acid, alt, [vspd]
 
@@ -543,7 +547,7 @@ class Autopilot(Entity, replaceable=True):
             oppositevs = np.logical_and(bs.traf.selvs[idx] * delalt < 0., abs(bs.traf.selvs[idx]) > 0.01)
             bs.traf.selvs[idx[oppositevs]] = 0.
 
-    @stack.command(name='VS')
+    @stack.command(name='VS', bulk=('idx', 'vspd'))
     def selvspdcmd(self, idx: 'acid', vspd:'vspd'):
         """ VS acid,vspd (ft/min)
             Vertical speed command (autopilot) """
@@ -556,7 +560,7 @@ class Autopilot(Entity, replaceable=True):
         """ HDG acid,hdg (deg,True or Magnetic)
             Autopilot select heading command. """
         if hdg.upper() in bs.navdb.wpid:
-            index = bs.navdb.wpid.index(hdg.upper())
+            index = bs.navdb.getwpidx(hdg)
             templat_hdg = bs.navdb.wplat[index]
             templon_hdg = bs.navdb.wplon[index]
             templat_ac = bs.traf.lat[idx]
@@ -591,7 +595,7 @@ class Autopilot(Entity, replaceable=True):
         # Everything went ok!
         return True
 
-    @stack.command(name='SPD', aliases=("SPEED",))
+    @stack.command(name='SPD', aliases=("SPEED",), bulk=('idx', 'casmach'))
     def selspdcmd(self, idx: 'acid', casmach: 'spd'):  # SPD command
         """ SPD acid, casmach (= CASkts/Mach) 
         
@@ -1,143 +1,168 @@
 """ Conditional commands:
 KL204 ATSPD 250 KL204 LNAV ON
 KL204 ATALT FL100 KL204 SPD 350
+KL204 ATTIME 00:30:00 KL204 HDG 090
+KL204 ATAREA SECTOR1 KL204 ALT FL200
+
+The conditions are stored as a table of columns, with the index of the
+aircraft of each condition, which is updated when aircraft are deleted.
+All conditions are evaluated together in each update: a condition is true
+when the difference between its target and the actual value changes sign.
 """
 import numpy as np
 import bluesky as bs
 from bluesky import stack
+from bluesky.core import Entity
+from bluesky.tools import areafilter
 from bluesky.tools.geo import qdrdist
 
 # Enumerated condtion types
-alttype, spdtype, postype = 0, 1, 2
+alttype, spdtype, postype, timetype, areatype = 0, 1, 2, 3, 4
 
 
-class Condition():
+class Condition(Entity):
     def __init__(self):
+        super().__init__()
+        self.areanames = []  # Names of the areas of area conditions
+        self.clear()
 
+    def clear(self):
+        ''' Remove all conditions. '''
         self.ncond = 0  # Number of conditions
 
-        self.id       = []                         # Id of aircraft of condition
-        self.condtype = np.array([],dtype=int)     # Condition type (0=alt,1=spd)
-        self.target   = np.array([],dtype=float)   # Target value (alt,speed,distance[nm])
-        self.lastdif  = np.array([],dtype=float)   # Difference during last update
-        self.posdata  = []                         # Data for postype: tuples lat[deg],lon[deg] of ref position
-        self.cmd      = []                         # Commands to be issued
+        self.acidx    = np.array([], dtype=int)    # Index of aircraft of condition
+        self.condtype = np.array([], dtype=int)    # Condition type (see enumeration above)
+        self.target   = np.array([], dtype=float)  # Target value (alt,speed,distance[nm],time[s])
+        self.lastdif  = np.array([], dtype=float)  # Difference during last update
+        self.reflat   = np.array([], dtype=float)  # Ref position for postype [deg]
+        self.reflon   = np.array([], dtype=float)
+        self.area     = np.array([], dtype=int)    # Index in areanames for areatype
+        self.cmd      = np.array([], dtype=object) # Commands to be issued
+
+    def reset(self):
+        super().reset()
+        self.areanames = []
+        self.clear()
+
+    def delete(self, idx):
+        ''' Remove the conditions of deleted aircraft, and shift the
+            aircraft indices of the other conditions. '''
+        super().delete(idx)
+        if self.ncond:
+            deleted = np.unique(np.atleast_1d(idx) % bs.traf.ntraf)
+            self.compact(~np.isin(self.acidx, deleted))
+            self.acidx -= np.searchsorted(deleted, self.acidx)
+
+    def compact(self, keep):
+        ''' Keep only the conditions for which mask keep is True. '''
+        self.acidx    = self.acidx[keep]
+        self.condtype = self.condtype[keep]
+        self.target   = self.target[keep]
+        self.lastdif  = self.lastdif[keep]
+        self.reflat   = self.reflat[keep]
+        self.reflon   = self.reflon[keep]
+        self.area     = self.area[keep]
+        self.cmd      = self.cmd[keep]
+        self.ncond    = len(self.acidx)
+
+    def actual(self, condtype, acidx, reflat, reflon, area):
+        ''' Actual values of conditions of type condtype. '''
+        if condtype == alttype:
+            return bs.traf.alt[acidx]
+        if condtype == spdtype:
+            return bs.traf.cas[acidx]
+        if condtype == postype:
+            return qdrdist(bs.traf.lat[acidx], bs.traf.lon[acidx], reflat, reflon)[1]  # [nm]
+        if condtype == timetype:
+            return np.full(len(acidx), bs.sim.simt)
+        # Area conditions: 1 when inside, the target is 0.5
+        inside = areafilter.classify(bs.traf.lat[acidx], bs.traf.lon[acidx],
+                                     bs.traf.alt[acidx], self.areanames)
+        return inside[np.arange(len(acidx)), area].astype(float)
 
     def update(self):
-        if self.ncond==0:
+        if self.ncond == 0:
             return
 
-        # Update indices based on list of id's
-        acidxlst = np.array(bs.traf.id2idx(self.id))
-        if len(acidxlst)>0:
-            idelcond = sorted(list(np.where(acidxlst<0)[0]))
-            for i in idelcond[::-1]:
-                del (self.id[i])
-                self.condtype = np.delete(self.condtype, i)
-                self.target = np.delete(self.target, i)
-                self.lastdif = np.delete(self.lastdif, i)
-                del self.posdata[i]
-                del self.cmd[i]
-
-            self.ncond = len(self.id)
-            if self.ncond==0:
-                return
-            acidxlst = np.array(bs.traf.id2idx(self.id))
-
-        # Check condition types
-        actdist = np.ones(self.ncond)*999e9  # Invalid number which never triggers anything is extremely large
-        for j in range(self.ncond):
-            if self.condtype[j] == postype:
-                qdr,dist = qdrdist(bs.traf.lat[acidxlst[j]],bs.traf.lon[acidxlst[j]],self.posdata[j][0],self.posdata[j][1])
-                actdist[j] = dist # [nm]
-
-        # Get relevant actual value using index list as index to numpy arrays
-        self.actual = (self.condtype == alttype) * bs.traf.alt[acidxlst] + \
-                      (self.condtype == spdtype) * bs.traf.cas[acidxlst] + \
-                      (self.condtype == postype) * actdist
-
-        # Compare sign of actual difference with sign of last difference
-        actdif       = self.target - self.actual
-
-        # Make sorted arrya of indices of true conditions and their conditional commands
-        idxtrue      = sorted(list(np.where(actdif*self.lastdif <= 0.0)[0]))# Sign changed
+        # Get the actual values per condition type
+        actual = np.empty(self.ncond)
+        for condtype in np.unique(self.condtype).tolist():
+            sel = self.condtype == condtype
+            actual[sel] = self.actual(condtype, self.acidx[sel], self.reflat[sel],
+                                      self.reflon[sel], self.area[sel])
+
+        # Compare sign of actual difference with sign of last difference.
+        # Time conditions are also true when their time has already passed.
+        actdif = self.target - actual
+        fired = (actdif * self.lastdif <= 0.0) | ((self.condtype == timetype) & (actdif <= 0.0))
         self.lastdif = actdif
-        if idxtrue==None or len(idxtrue)==0:
-            return
 
+        # Execute commands found to have true condition, and delete them
+        if fired.any():
+            stack.stack(*self.cmd[fired])
+            self.compact(~fired)
 
-        # Execute commands found to have true condition
-        for i in idxtrue:
-            if i>=0:
-                stack.stack(self.cmd[i])
-                # debug
-                # stack.stack(" ECHO Conditional command issued: "+self.cmd[i])
-
-        # Delete executed commands to clean up arrays and lists
-        # from highest index to lowest for consistency
-        for i in idxtrue[::-1]:
-            if i>=0:
-                del self.id[i]
-                self.condtype = np.delete(self.condtype,i)
-                self.target   = np.delete(self.target,i)
-                self.lastdif  = np.delete(self.lastdif,i)
-                del self.posdata[i]
-                del self.cmd[i]
-
-        # Adjust number of conditions
-        self.ncond = len(self.id)
-
-        if self.ncond!=len(self.cmd):
-            print ("self.ncond=",self.ncond)
-            print ("self.cmd=",self.cmd)
-            print ("traffic/conditional.py: self.delcondition: invalid condition array size")
-        return
-
-    def ataltcmd(self,acidx,targalt,cmdtxt):
-        actalt = bs.traf.alt[acidx]
-        self.addcondition(acidx, alttype, targalt, actalt, cmdtxt)
+    @stack.command(name='ATALT', annotations='acid,alt,string',
+                   brief='acid ATALT alt cmd', bulk=('acidx', 'targalt', 'cmdtxt'))
+    def ataltcmd(self, acidx, targalt, cmdtxt):
+        ''' When a/c at given altitude , execute a command cmd '''
+        self.addcondition(acidx, alttype, targalt, bs.traf.alt[acidx], cmdtxt)
         return True
 
+    @stack.command(name='ATSPD', annotations='acid,spd,string',
+                   brief='acid ATSPD spd cmd', bulk=('acidx', 'targspd', 'cmdtxt'))
     def atspdcmd(self, acidx, targspd, cmdtxt):
-        actspd = bs.traf.tas[acidx]
-        self.addcondition(acidx, spdtype, targspd, actspd,cmdtxt)
+        ''' When a/c reaches given speed, execute a command cmd '''
+        self.addcondition(acidx, spdtype, targspd, bs.traf.cas[acidx], cmdtxt)
         return True
 
+    @stack.command(name='ATDIST', annotations='acid,latlon,float,string',
+                   brief='acid ATDIST pos dist cmd')
     def atdistcmd(self, acidx, lat, lon, targdist, cmdtxt):
+        ''' When a/c passing this distance[nm] to position, execute the command cmd '''
         qdr, actdist = qdrdist(bs.traf.lat[acidx], bs.traf.lon[acidx], lat, lon)
-        self.addcondition(acidx, postype, targdist, actdist, cmdtxt, (lat,lon))
+        self.addcondition(acidx, postype, targdist, actdist, cmdtxt, lat, lon)
         return True
 
-    def addcondition(self,acidx, icondtype, target, actual, cmdtxt,latlon=None):
-        #print ("addcondition:", acidx, icondtype, target, actual, cmdtxt, latlon)
-
-        # Add condition to arrays
-        self.id.append(bs.traf.id[acidx])
-
-        self.condtype = np.append(self.condtype,icondtype)
-        self.target   = np.append(self.target,target)
-        self.lastdif  = np.append(self.lastdif,target - actual)
-
-        self.posdata.append(latlon)
-        self.cmd.append(cmdtxt)
-
-        self.ncond = self.ncond+1
-        #print("addcondition: self.ncond",self.ncond)
-        return
-
-    def renameac(self,oldid,newid):
-        # Continonal commands are stored per id (ac name)
-        # When renamed, call this method to update list
-        # rename ids in list of ids
-        # Call this if RENAME command is implemented
-        if self.id.count(old.id) == 0:
-            return
-        for i in range(len(self.id)):
-            if self.id[i] == oldid:
-                self.id[i] = newid
-        return
-
-
+    @stack.command(name='ATTIME', annotations='acid,time,string',
+                   brief='acid ATTIME time cmd', bulk=('acidx', 'time', 'cmdtxt'))
+    def attimecmd(self, acidx, time, cmdtxt):
+        ''' When the simulation time reaches time, execute a command cmd,
+            unless the a/c has been deleted. When time has already passed,
+            the command is executed in the next update. '''
+        self.addcondition(acidx, timetype, time, bs.sim.simt, cmdtxt)
+        return True
 
+    @stack.command(name='ATAREA', annotations='acid,txt,string',
+                   brief='acid ATAREA area cmd', bulk=('acidx', 'cmdtxt'))
+    def atareacmd(self, acidx, areaname, cmdtxt):
+        ''' When a/c is inside the area, execute a command cmd '''
+        if not areafilter.hasArea(areaname):
+            return False, f'Area {areaname} does not exist'
+        if areaname not in self.areanames:
+            self.areanames.append(areaname)
+        # Register as outside, so that the command is executed in the next
+        # update when the a/c is already inside the area
+        self.addcondition(acidx, areatype, 0.5, 0.0, cmdtxt,
+                          area=self.areanames.index(areaname))
+        return True
 
+    def addcondition(self, acidx, icondtype, target, actual, cmdtxt,
+                     lat=0.0, lon=0.0, area=-1):
+        ''' Add conditions for one or more aircraft. All other arguments
+            are either a single value, or a value per aircraft. '''
+        acidx = np.atleast_1d(acidx)
+        n = len(acidx)
+        cmd = np.empty(n, dtype=object)
+        cmd[:] = np.asarray(cmdtxt).tolist()
 
+        # Add condition to arrays
+        self.acidx    = np.append(self.acidx, acidx)
+        self.condtype = np.append(self.condtype, np.full(n, icondtype))
+        self.target   = np.append(self.target, np.broadcast_to(target, n))
+        self.lastdif  = np.append(self.lastdif, np.broadcast_to(np.subtract(target, actual), n))
+        self.reflat   = np.append(self.reflat, np.broadcast_to(lat, n))
+        self.reflon   = np.append(self.reflon, np.broadcast_to(lon, n))
+        self.area     = np.append(self.area, np.broadcast_to(area, n))
+        self.cmd      = np.append(self.cmd, cmd)
+        self.ncond    = len(self.acidx)
@@ -10,6 +10,9 @@ import bluesky as bs
 from bluesky.core import Entity, timed_function
 from bluesky.tools import misc
 
+# Maximum number of history symbols per aircraft
+bs.settings.set_variable_defaults(histsymb_max=8)
+
 
 class HistorySymbols(Entity):
     """
@@ -29,8 +32,11 @@ class HistorySymbols(Entity):
 
         self.nsymb = 4
 
-        self.histlat = np.array([])
-        self.histlon = np.array([])
+        # Depth of the history ring buffer: the maximum number of symbols
+        self.maxsymb = bs.settings.histsymb_max
+
+        self.histlat = np.array([], dtype=np.float32)
+        self.histlon = np.array([], dtype=np.float32)
 
         self.t_prev = 0.
 
@@ -42,29 +48,10 @@ class HistorySymbols(Entity):
         with self.settrafarrays():
             self.swhistory = np.array([], dtype=bool)
 
-            self.lat1 = np.array([])
-            self.lon1 = np.array([])
-
-            self.lat2 = np.array([])
-            self.lon2 = np.array([])
-
-            self.lat3 = np.array([])
-            self.lon3 = np.array([])
-
-            self.lat4 = np.array([])
-            self.lon4 = np.array([])
-
-            self.lat5 = np.array([])
-            self.lon5 = np.array([])
-
-            self.lat6 = np.array([])
-            self.lon6 = np.array([])
-
-            self.lat7 = np.array([])
-            self.lon7 = np.array([])
-
-            self.lat8 = np.array([])
-            self.lon8 = np.array([])
+            # Ring buffer with the history positions (lat, lon) per aircraft
+            self.hist = np.zeros((0, self.maxsymb, 2), dtype=np.float32)
+            self.head = np.array([], dtype=int)     # Slot of the next position
+            self.nhist = np.array([], dtype=int)    # Number of stored positions
 
     def reset(self):
         """
@@ -80,8 +67,8 @@ class HistorySymbols(Entity):
 
         self.nsymb = 4
 
-        self.histlat = np.array([])
-        self.histlon = np.array([])
+        self.histlat = np.array([], dtype=np.float32)
+        self.histlon = np.array([], dtype=np.float32)
 
         self.t_prev = 0.
 
@@ -97,71 +84,40 @@ class HistorySymbols(Entity):
         """
 
         if self.nsymb > 0:
-            # Get latitudes and longitudes for all history symbols
-            if self.nsymb >= 1:
-                self.histlat = self.lat1
-                self.histlon = self.lon1
-            if self.nsymb >= 2:
-                self.histlat = np.append(self.histlat, self.lat2)
-                self.histlon = np.append(self.histlon, self.lon2)
-            if self.nsymb >= 3:
-                self.histlat = np.append(self.histlat, self.lat3)
-                self.histlon = np.append(self.histlon, self.lon3)
-            if self.nsymb >= 4:
-                self.histlat = np.append(self.histlat, self.lat4)
-                self.histlon = np.append(self.histlon, self.lon4)
-            if self.nsymb >= 5:
-                self.histlat = np.append(self.histlat, self.lat5)
-                self.histlon = np.append(self.histlon, self.lon5)
-            if self.nsymb >= 6:
-                self.histlat = np.append(self.histlat, self.lat6)
-                self.histlon = np.append(self.histlon, self.lon6)
-            if self.nsymb >= 7:
-                self.histlat = np.append(self.histlat, self.lat7)
-                self.histlon = np.append(self.histlon, self.lon7)
-            if self.nsymb == 8:
-                self.histlat = np.append(self.histlat, self.lat8)
-                self.histlon = np.append(self.histlon, self.lon8)
-            self.histlat = self.histlat[self.histlat != 0.]
-            self.histlon = self.histlon[self.histlon != 0.]
-
-            # Data feed traffic
+            # Aircraft that get a new history position
+            inew = np.zeros(bs.traf.ntraf, dtype=bool)
+
+            # Data feed traffic that received an update
+            isfeed = np.zeros(bs.traf.ntraf, dtype=bool)
             if len(bs.traf.trafdatafeed.datafeedids) > 0:
-                itrafdatafeed = misc.get_indices(bs.traf.id, bs.traf.trafdatafeed.datafeedids)
-                # Data feed traffic that received an update
-                itrafnew = np.nonzero(bs.traf.trafdatafeed.lastupdate <= 0.2)[0]
-                itrafdatafeed_new = np.intersect1d(itrafdatafeed, itrafnew, assume_unique=True)
-            else:
-                itrafdatafeed = np.array([])
-                itrafdatafeed_new = np.array([])
+                itrafdatafeed = misc.get_indices(bs.traf.id, bs.traf.trafdatafeed.datafeedids, bs.traf.idindex)
+                isfeed[itrafdatafeed] = True
+                inew[itrafdatafeed] = bs.traf.trafdatafeed.lastupdate[itrafdatafeed] <= 0.2
 
             # Simulated traffic
             deltat = bs.sim.simt - self.t_prev
             if deltat >= self.maxdeltat:
-                itraf_new = np.setdiff1d(np.arange(bs.traf.ntraf), itrafdatafeed)
+                inew |= ~isfeed
                 self.t_prev = bs.sim.simt
-            else:
-                itraf_new = np.array([])
-
-            # Merge indices and update history
-            i_new = np.append(itrafdatafeed_new, itraf_new)
-            i_new = i_new.astype(np.int32)
 
             # Every other position gets a history symbol
-            i_swhistory = np.nonzero(self.swhistory)[0]
-            i_update = np.intersect1d(i_new, i_swhistory)
-            self.swhistory[i_new] = ~self.swhistory[i_new]
+            iupdate = inew & self.swhistory
+            self.swhistory[inew] = ~self.swhistory[inew]
 
             # OPENSKY traffic always gets an update
-            iopensky = misc.get_indices(bs.traf.trafdatafeed.source, 'OPENSKY')
-            iopensky_new = np.intersect1d(i_new, iopensky)
-            i_update = np.union1d(i_update, iopensky_new)
+            iupdate |= inew & isfeed & (np.asarray(bs.traf.trafdatafeed.source) == 'OPENSKY')
 
             # Update the history symbols
-            self.update_history(i_update)
+            self.update_history(np.nonzero(iupdate)[0])
+
+            # Positions of the most recent nsymb symbols of all aircraft
+            age = (self.head[:, np.newaxis] - 1 - np.arange(self.maxsymb)) % self.maxsymb
+            pos = self.hist[age < np.minimum(self.nhist, self.nsymb)[:, np.newaxis]]
+            self.histlat = pos[:, 0]
+            self.histlon = pos[:, 1]
         else:
-            self.histlat = np.array([])
-            self.histlon = np.array([])
+            self.histlat = np.array([], dtype=np.float32)
+            self.histlon = np.array([], dtype=np.float32)
 
     def update_history(self, indices):
         """
@@ -174,29 +130,11 @@ class HistorySymbols(Entity):
         Date: 20-12-2021
         """
 
-        self.lat8[indices] = self.lat7[indices]
-        self.lon8[indices] = self.lon7[indices]
-
-        self.lat7[indices] = self.lat6[indices]
-        self.lon7[indices] = self.lon6[indices]
-
-        self.lat6[indices] = self.lat5[indices]
-        self.lon6[indices] = self.lon5[indices]
-
-        self.lat5[indices] = self.lat4[indices]
-        self.lon5[indices] = self.lon4[indices]
-
-        self.lat4[indices] = self.lat3[indices]
-        self.lon4[indices] = self.lon3[indices]
-
-        self.lat3[indices] = self.lat2[indices]
-        self.lon3[indices] = self.lon2[indices]
-
-        self.lat2[indices] = self.lat1[indices]
-        self.lon2[indices] = self.lon1[indices]
-
-        self.lat1[indices] = bs.traf.lat[indices]
-        self.lon1[indices] = bs.traf.lon[indices]
+        # Overwrite the oldest position in the ring buffer
+        self.hist[indices, self.head[indices], 0] = bs.traf.lat[indices]
+        self.hist[indices, self.head[indices], 1] = bs.traf.lon[indices]
+        self.head[indices] = (self.head[indices] + 1) % self.maxsymb
+        self.nhist[indices] = np.minimum(self.nhist[indices] + 1, self.maxsymb)
 
     def setHistory(self, nsymbols):
         """
@@ -209,9 +147,9 @@ class HistorySymbols(Entity):
         Date: 23-12-2021
         """
 
-        if 0 <= nsymbols <= 8:
+        if 0 <= nsymbols <= self.maxsymb:
             self.nsymb = nsymbols
         else:
-            return False, 'HISTORY: Number of symbols should be between 0 and 8'
+            return False, f'HISTORY: Number of symbols should be between 0 and {self.maxsymb}'
 
         return True
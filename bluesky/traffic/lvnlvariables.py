@@ -9,7 +9,7 @@ import socket
 import numpy as np
 import bluesky as bs
 from bluesky.core import Entity, timed_function
-from bluesky.tools import misc, geo
+from bluesky.tools import geo
 from bluesky import stack
 
 # from bluesky import settings
@@ -30,6 +30,7 @@ class LVNLVariables(Entity):
         selrelcmd():        Set REL for aircraft
         setarr():           Set the arrival/stack
         setautolabel():     Set automatic label selection
+        setdtgtarget():     Set the DTG target
         setflighttype():    Set the flight type
         setils():           Set the ILS route
         setmlabel():        Set the micro label
@@ -45,6 +46,20 @@ class LVNLVariables(Entity):
     Date: 24-12-2021
     """
 
+    # DTG targets: T-Bar points per arrival/stack
+    dtgarr = {'NIRSI_GAL01': (52.47962777777778, 4.513372222222222),
+              'NIRSI_GAL02': (52.58375277777778, 4.342225),
+              'NIRSI_AM603': (52.68805555555555, 4.513333333333334)}
+    # GMP DTG targets (not used):
+    # 'ATP18C', 'RIV18C': (52.61224523851872, 4.890376355417231)
+    # 'RIV18R', 'SUG18R': (52.60490551344223, 4.581121278305933)
+
+    # DTG targets: runway thresholds
+    dtgrwy = {'18R': (52.331388888888895, 4.74),
+              '18R_E': (52.331388888888895, 4.74),
+              '18C': (52.36027777777778, 4.711666666666667),
+              '18C_E': (52.36027777777778, 4.711666666666667)}
+
     def __init__(self):
         super().__init__()
 
@@ -63,6 +78,8 @@ class LVNLVariables(Entity):
             self.uco        = np.array([], dtype=str)   # Under Control
             self.symbol     = np.array([], dtype=str)   # UCO symbol to draw
             self.wtc        = []                           # Wake Turbulence Category
+            self.dtglat     = np.array([])                 # DTG target latitude (NaN: no target)
+            self.dtglon     = np.array([])                 # DTG target longitude (NaN: no target)
 
     def create(self, n=1):
         """
@@ -79,6 +96,8 @@ class LVNLVariables(Entity):
 
         self.symbol[-n:]    = ''
         self.uco[-n:]       = '0'
+        self.dtglat[-n:]    = np.nan
+        self.dtglon[-n:]    = np.nan
 
     @timed_function(name='lvnlvars', dt=0.1)
     def update(self):
@@ -91,68 +110,34 @@ class LVNLVariables(Entity):
         Date: 1-2-2022
         """
 
-        # --------------- T-Bar DTG ---------------
-
-        inirsi_gal1 = misc.get_indices(self.arr, "NIRSI_GAL01")
-        inirsi_gal2 = misc.get_indices(self.arr, "NIRSI_GAL02")
-        inirsi_603 = misc.get_indices(self.arr, "NIRSI_AM603")
-
-        self.dtg[inirsi_gal1] = geo.kwikdist_matrix(bs.traf.lat[inirsi_gal1], bs.traf.lon[inirsi_gal1],
-                                                         np.ones(len(inirsi_gal1))*52.47962777777778,
-                                                         np.ones(len(inirsi_gal1))*4.513372222222222)
-        self.dtg[inirsi_gal2] = geo.kwikdist_matrix(bs.traf.lat[inirsi_gal2], bs.traf.lon[inirsi_gal2],
-                                                         np.ones(len(inirsi_gal2))*52.58375277777778,
-                                                         np.ones(len(inirsi_gal2))*4.342225)
-        self.dtg[inirsi_603] = geo.kwikdist_matrix(bs.traf.lat[inirsi_603], bs.traf.lon[inirsi_603],
-                                                        np.ones(len(inirsi_603))*52.68805555555555,
-                                                        np.ones(len(inirsi_603))*4.513333333333334)
-
-        # --------------- GMP DTG ---------------
-
-        # iatp_18c = misc.get_indices(self.arr, "ATP18C")
-        # iriv_18c = misc.get_indices(self.arr, "RIV18C")
-        # iriv_18r = misc.get_indices(self.arr, "RIV18R")
-        # isug_18r = misc.get_indices(self.arr, "SUG18R")
-        #
-        # self.dtg[iatp_18c] = geo.kwikdist_matrix(bs.traf.lat[iatp_18c], bs.traf.lon[iatp_18c],
-        #                                             np.ones(len(iatp_18c)) * 52.61224523851872,
-        #                                             np.ones(len(iatp_18c)) * 4.890376355417231)
-        # self.dtg[iriv_18c] = geo.kwikdist_matrix(bs.traf.lat[iriv_18c], bs.traf.lon[iriv_18c],
-        #                                             np.ones(len(iriv_18c)) * 52.61224523851872,
-        #                                             np.ones(len(iriv_18c)) * 4.890376355417231)
-        # self.dtg[iriv_18r] = geo.kwikdist_matrix(bs.traf.lat[iriv_18r], bs.traf.lon[iriv_18r],
-        #                                            np.ones(len(iriv_18r)) * 52.60490551344223,
-        #                                            np.ones(len(iriv_18r)) * 4.581121278305933)
-        # self.dtg[isug_18r] = geo.kwikdist_matrix(bs.traf.lat[isug_18r], bs.traf.lon[isug_18r],
-        #                                          np.ones(len(isug_18r)) * 52.60490551344223,
-        #                                          np.ones(len(isug_18r)) * 4.581121278305933)
-
-        # --------------- RUNWAY DTG ---------------
-
-        i_18c = misc.get_indices(self.rwy, ['18R', '18R_E'])
-        i_18r = misc.get_indices(self.rwy, ['18C', '18C_E'])
-
-        self.dtg[i_18c] = geo.kwikdist_matrix(bs.traf.lat[i_18c], bs.traf.lon[i_18c],
-                                                 np.ones(len(i_18c)) * 52.331388888888895,
-                                                 np.ones(len(i_18c)) * 4.74)
-        self.dtg[i_18r] = geo.kwikdist_matrix(bs.traf.lat[i_18r], bs.traf.lon[i_18r],
-                                                 np.ones(len(i_18r)) * 52.36027777777778,
-                                                 np.ones(len(i_18r)) * 4.711666666666667)
+        # --------------- T-Bar/RUNWAY DTG ---------------
+
+        itarget = np.nonzero(self.dtglat == self.dtglat)[0]  # not NaN
+        self.dtg[itarget] = geo.kwikdist_matrix(bs.traf.lat[itarget], bs.traf.lon[itarget],
+                                                self.dtglat[itarget], self.dtglon[itarget])
 
         # --------------- DTG ALONG ROUTE ---------------
 
-        naircraft = len(bs.traf.lat)    # number of aircrafts
+        # Distance to the active waypoint plus the remaining route distance
+        iactwp, valid = bs.traf.ap.routetable.actwp()
+        iroute = np.nonzero(valid)[0]
+        iactwp = iactwp[iroute]
+        self.dtg_route[iroute] = geo.kwikdist_matrix(bs.traf.lat[iroute], bs.traf.lon[iroute],
+                                                     bs.traf.ap.routetable.lat[iactwp],
+                                                     bs.traf.ap.routetable.lon[iactwp]) + \
+            bs.traf.ap.routetable.remaining()[iroute]
+
+    def setdtgtarget(self, idx):
+        """
+        Function: Set the DTG target of an aircraft from its runway or arrival
+        Args:
+            idx:    index for traffic arrays [int]
+        Returns: -
+        """
 
-        for idx in range(naircraft):
-            # Distance calculation
-            iactwp = bs.traf.ap.route[idx].iactwp  #active waypoint
-            if iactwp >= 0:
-                dist_iactwp = geo.kwikdist(bs.traf.lat[idx], bs.traf.lon[idx],
-                                           bs.traf.ap.route[idx].wplat[iactwp], bs.traf.ap.route[idx].wplon[iactwp])
-                dist_wp = np.sum(bs.traf.ap.route[idx].wpdistto[iactwp+1:])
-                self.dtg_route[idx] = dist_iactwp + dist_wp
-            # print('Route ',bs.traf.id[idx], bs.traf.ap.route[idx].wpname)
-        return
+        # The runway threshold takes precedence over the T-Bar point
+        target = self.dtgrwy.get(self.rwy[idx], self.dtgarr.get(self.arr[idx], (np.nan, np.nan)))
+        self.dtglat[idx], self.dtglon[idx] = target
 
     @stack.command(name='UCO')
     def selucocmd(self, idx: 'acid', IP):
@@ -278,6 +263,7 @@ class LVNLVariables(Entity):
         """
         # IP = socket.getfqdn()
         self.arr[idx] = arr.upper()
+        self.setdtgtarget(idx)
         # self.uco[idx] = IP[-11:]
 
         if addwpts:
@@ -357,6 +343,7 @@ class LVNLVariables(Entity):
 
         if isinstance(rwy, str):
             self.rwy[idx] = rwy.upper()
+            self.setdtgtarget(idx)
 
     @stack.command(name='SID', brief='SID CALLSIGN SID')
     def setsid(self, idx: 'acid', sid: str = '', addwpts: 'onoff' = True):
@@ -0,0 +1,182 @@
+''' Gridded high resolution meteo data for the HighRes wind mode.
+
+    The meteo data of a timeframe (rows of lon, lat, alt, uwind, vwind on a
+    0.1 degree lat/lon grid, with model levels that differ per grid column)
+    is stored as dense numpy arrays, so that the wind for all aircraft is
+    interpolated with a few array operations. The timeframes are read from
+    a Postgres database, or from files in the meteo data directory:
+    a directory <name> with a <timestamp>.npz file per timeframe, or an
+    SQLite database <name>.sqlite with the same table as in Postgres.
+'''
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import numpy as np
+
+from bluesky import settings
+from bluesky.tools import Functions
+
+
+# Register settings defaults
+settings.set_variable_defaults(meteo_path='data/meteo')
+
+# Data columns of a timeframe
+columns = ('lon', 'lat', 'alt', 'uwind', 'vwind')
+
+
+def source(name):
+    ''' Return a function that reads the timeframe with a given timestamp
+        from meteo data source name, as a dict of column arrays. '''
+    path = os.path.join(settings.meteo_path, name)
+    if os.path.isdir(path):
+        def load(timestamp):
+            with np.load(os.path.join(path, f'{timestamp}.npz')) as data:
+                return {col: data[col] for col in columns}
+    elif os.path.isfile(path + '.sqlite'):
+        def load(timestamp):
+            with sqlite3.connect(path + '.sqlite') as conn:
+                rows = conn.execute(f'SELECT {",".join(columns)} FROM {name} '
+                                    'WHERE timestamp_data = ?', (int(timestamp),)).fetchall()
+            data = np.array(rows, dtype=float).reshape(-1, len(columns))
+            return dict(zip(columns, data.T))
+    else:
+        def load(timestamp):
+            df = Functions.query_DB_to_DF(name, f'SELECT * FROM {name} WHERE timestamp_data = {timestamp}')
+            return {col: df[col].to_numpy(dtype=float) for col in columns}
+    return load
+
+
+class MeteoFrame:
+    ''' Meteo data of one timeframe, as (lat, lon, level) arrays of the
+        level altitude [ft] and wind components. Levels are in the order of
+        the source data (top level first), and missing levels are NaN. '''
+    # Grid lines per degree
+    scale = 10.0
+
+    def __init__(self, lon, lat, alt, uwind, vwind):
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        self.latgrid, ilat = np.unique(np.round(lat * self.scale), return_inverse=True)
+        self.longrid, ilon = np.unique(np.round(lon * self.scale), return_inverse=True)
+        self.latgrid /= self.scale
+        self.longrid /= self.scale
+        self.lat0, self.lat1 = lat.min(initial=np.inf), lat.max(initial=-np.inf)
+        self.lon0, self.lon1 = lon.min(initial=np.inf), lon.max(initial=-np.inf)
+
+        # Level index of each row: its position among the rows of its column
+        column = ilat * len(self.longrid) + ilon
+        order = np.argsort(column, kind='stable')
+        counts = np.bincount(column, minlength=len(self.latgrid) * len(self.longrid))
+        start = np.cumsum(counts) - counts
+        ilev = np.empty_like(order)
+        ilev[order] = np.arange(len(order)) - start[column[order]]
+
+        shape = (len(self.latgrid), len(self.longrid), counts.max(initial=0))
+        self.alt = np.full(shape, np.nan)
+        self.uwind = np.zeros(shape)
+        self.vwind = np.zeros(shape)
+        self.alt[ilat, ilon, ilev] = alt
+        self.uwind[ilat, ilon, ilev] = uwind
+        self.vwind[ilat, ilon, ilev] = vwind
+
+    def inside(self, lat, lon):
+        ''' Returns True for positions inside the area of this timeframe. '''
+        return (lat >= self.lat0) & (lat <= self.lat1) & (lon >= self.lon0) & (lon <= self.lon1)
+
+    @staticmethod
+    def gridindex(grid, values):
+        ''' Index of values in grid, and a mask that is False for values
+            that are not in the grid. '''
+        idx = np.minimum(np.searchsorted(grid, values - 1e-6), len(grid) - 1)
+        return idx, np.abs(grid[idx] - values) < 1e-6
+
+    def interpolate(self, lat, lon, alt):
+        ''' Wind components at positions lat, lon [deg] and alt [ft].
+            Between the four surrounding grid columns, the wind is
+            interpolated bilinearly at the first level below alt (skipping
+            the top level) and the level above it in each column, and
+            linearly between these levels, using the level altitudes of the
+            southwest column. The wind is zero when a column has no such
+            levels. '''
+        # Surrounding grid lines, and weights
+        latm, latp = np.floor(lat * self.scale) / self.scale, np.ceil(lat * self.scale) / self.scale
+        lonm, lonp = np.floor(lon * self.scale) / self.scale, np.ceil(lon * self.scale) / self.scale
+        wlat = np.where(latp != latm, (lat - latm) / np.where(latp != latm, latp - latm, 1.0), 0.0)
+        wlon = np.where(lonp != lonm, (lon - lonm) / np.where(lonp != lonm, lonp - lonm, 1.0), 0.0)
+        ilatm, validlat0 = self.gridindex(self.latgrid, latm)
+        ilatp, validlat1 = self.gridindex(self.latgrid, latp)
+        ilonm, validlon0 = self.gridindex(self.longrid, lonm)
+        ilonp, validlon1 = self.gridindex(self.longrid, lonp)
+        valid = validlat0 & validlat1 & validlon0 & validlon1
+
+        # Per column: the first level below alt (not counting the top level),
+        # and the level above it
+        windlo, windhi = np.zeros((2, len(lat))), np.zeros((2, len(lat)))
+        corners = ((ilatm, ilonm, (1 - wlat) * (1 - wlon)), (ilatm, ilonp, (1 - wlat) * wlon),
+                   (ilatp, ilonm, wlat * (1 - wlon)), (ilatp, ilonp, wlat * wlon))
+        for i, (ilat, ilon, weight) in enumerate(corners):
+            below = alt[:, np.newaxis] > self.alt[ilat, ilon, 1:]
+            valid &= below.any(axis=1)
+            ilev = np.argmax(below, axis=1) + 1
+            if i == 0:
+                altlo = self.alt[ilat, ilon, ilev]
+                althi = self.alt[ilat, ilon, ilev - 1]
+            windlo += weight * np.array((self.uwind[ilat, ilon, ilev], self.vwind[ilat, ilon, ilev]))
+            windhi += weight * np.array((self.uwind[ilat, ilon, ilev - 1], self.vwind[ilat, ilon, ilev - 1]))
+
+        walt = np.where(althi != altlo, (alt - altlo) / np.where(althi != altlo, althi - altlo, 1.0), 0.0)
+        wind = np.round(windlo + walt * (windhi - windlo), 4)
+        return np.where(valid, wind, 0.0)
+
+
+class MeteoCube:
+    ''' The two meteo timeframes around the simulation time, interpolated
+        in time. The timeframe that follows is read in a background thread,
+        so that it is available when the simulation time reaches the next
+        timeframe. '''
+    def __init__(self, name):
+        self.name = name
+        self.load = source(name)
+        self.prev_timestamp = self.next_timestamp = None
+        self.frames = None
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        # Frames that are read or being read, per timestamp
+        self.pending = dict()
+
+    def frame(self, timestamp):
+        ''' Return the timeframe with timestamp, waiting for it when it is
+            being read in the background. '''
+        future = self.pending.get(timestamp) or self.prefetch(timestamp)
+        return future.result()
+
+    def prefetch(self, timestamp):
+        ''' Start reading the timeframe with timestamp in the background. '''
+        if timestamp not in self.pending:
+            self.pending[timestamp] = self.pool.submit(
+                lambda: MeteoFrame(**self.load(timestamp)))
+        return self.pending[timestamp]
+
+    def update(self, utc):
+        ''' Select the timeframes around utc, and prefetch the next one. '''
+        self.prev_timestamp, self.next_timestamp = Functions.utc2stamps(utc)
+        self.frames = (self.frame(self.prev_timestamp), self.frame(self.next_timestamp))
+        following = Functions.utc2stamps(utc + timedelta(minutes=10))[1]
+        for timestamp in list(self.pending):
+            if timestamp not in (self.prev_timestamp, self.next_timestamp):
+                del self.pending[timestamp]
+        self.prefetch(following)
+
+    def getdata(self, lat, lon, alt, utc):
+        ''' Wind components at positions lat, lon [deg] and alt [ft] at time
+            utc. Returns a mask of the positions inside the meteo area, and
+            the wind components of these positions. '''
+        inside = self.frames[0].inside(lat, lon)
+        timefrac = Functions.utc2frac(utc, self.prev_timestamp)
+        wind1, wind2 = (frame.interpolate(lat[inside], lon[inside], alt[inside])
+                        for frame in self.frames)
+        uwind, vwind = wind1 + timefrac * (wind2 - wind1)
+        return inside, uwind, vwind
+
+    def close(self):
+        ''' Stop the background reader. '''
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -37,9 +37,13 @@ class Route(Replaceable):
     # Aircraft route objects
     _routes = WeakValueDictionary()
 
+    # Routes that changed since they were last copied to the route table
+    _modified = set()
+
     def __init__(self, acid):
         # Add self to dictionary of all aircraft routes
         Route._routes[acid] = self
+        Route._modified.add(self)
         # Aircraft id (callsign) of the aircraft to which this route belongs
         self.acid = acid
         self.nwp = 0
@@ -89,6 +93,16 @@ class Route(Replaceable):
         self.wptorta   = []
         self.wpxtorta  = []
 
+    @property
+    def iactwp(self):
+        """ Index of the active waypoint in this route. """
+        return self._iactwp
+
+    @iactwp.setter
+    def iactwp(self, value):
+        self._iactwp = value
+        Route._modified.add(self)
+
     @staticmethod
     def get_available_name(data, name_, len_=2):
         """
@@ -99,7 +113,7 @@ class Route(Replaceable):
         fmt_ = "{:0" + str(len_) + "d}"
 
         # Avoid using call sign without number
-        if bs.traf.id.count(name_) > 0:
+        if name_ in bs.traf.idindex:
             appi = 1
             name_ = name_+fmt_.format(appi)
 
@@ -523,7 +537,7 @@ class Route(Replaceable):
 
                     # IF command starts with aircraft id, it is not missing
                     cmd = args[1].upper()
-                    if not(cmd in bs.traf.id):
+                    if cmd not in bs.traf.idindex:
                         # Look up arg types
                         try:
                             cmdobj = Command.cmddict.get(cmd)
@@ -531,7 +545,7 @@ class Route(Replaceable):
                             # Command found, check arguments
                             argtypes = cmdobj.annotations
 
-                            if argtypes[0]=="acid" and not (args[2].upper() in bs.traf.id):
+                            if argtypes[0]=="acid" and args[2].upper() not in bs.traf.idindex:
                                 # missing acid, so add ownship acid
                                 acrte.wpstack[wpidx].append(acid+" "+" ".join(args[1:]))
                             else:
@@ -835,7 +849,7 @@ class Route(Replaceable):
 
 
         bs.traf.actwp.turndist[acidx] = (bs.traf.actwp.flyby[acidx] > 0.5)  *   \
-                    turnrad*abs(tan(0.5*radians(max(5., abs(degto180(qdr -
+                    turnrad*abs(tan(0.5*radians(maximum(5., abs(degto180(qdr -
                     acrte.wpdirfrom[acrte.iactwp]))))))    # [nm]
 
 
@@ -1058,10 +1072,18 @@ class Route(Replaceable):
         del acrte.wpspd[wpidx]
         del acrte.wprta[wpidx]
         del acrte.wptype[wpidx]
+        del acrte.wpflyby[wpidx]
+        del acrte.wpflyturn[wpidx]
+        del acrte.wpturnrad[wpidx]
+        del acrte.wpturnspd[wpidx]
+        del acrte.wpstack[wpidx]
         if acrte.iactwp > wpidx:
-            acrte.iactwp = max(0, acrte.iactwp - 1)
+            acrte.iactwp = maximum(0, acrte.iactwp - 1)
 
-        acrte.iactwp = min(acrte.iactwp, acrte.nwp - 1)
+        acrte.iactwp = minimum(acrte.iactwp, acrte.nwp - 1)
+
+        # Update the leg data of the remaining route
+        acrte.calcfp()
 
         # If no waypoints left, make sure to disable LNAV/VNAV
         if acrte.nwp==0 and (acidx or acidx==0):
@@ -1222,6 +1244,7 @@ class Route(Replaceable):
 
         # Direction to waypoint
         self.nwp = len(self.wpname)
+        Route._modified.add(self)
 
         # Create flight plan calculation table
         self.wpdirfrom   = self.nwp*[0.]
@@ -1347,7 +1370,7 @@ class Route(Replaceable):
         # Note: the max() prevents walking back, even in cases when this might be apropriate,
         # such as when previous waypoints have been deleted
 
-        iwpnear = max(self.iactwp,argmin(dist2))
+        iwpnear = maximum(self.iactwp,argmin(dist2))
 
         #Unless behind us, next waypoint?
         if iwpnear+1<self.nwp:
@@ -1356,8 +1379,8 @@ class Route(Replaceable):
 
             # we only turn to the first waypoint if we can reach the required
             # heading before reaching the waypoint
-            time_turn = max(0.01,bs.traf.tas[i])*radians(delhdg)/(g0*tan(bs.traf.ap.bankdef[i]))
-            time_straight= sqrt(dist2[iwpnear])*60.*nm/max(0.01,bs.traf.tas[i])
+            time_turn = maximum(0.01,bs.traf.tas[i])*radians(delhdg)/(g0*tan(bs.traf.ap.bankdef[i]))
+            time_straight= sqrt(dist2[iwpnear])*60.*nm/maximum(0.01,bs.traf.tas[i])
 
             if time_turn > time_straight:
                 iwpnear += 1
@@ -0,0 +1,136 @@
+""" Columnar route table: the routes of all aircraft in flat arrays."""
+import numpy as np
+import bluesky as bs
+from bluesky.core import TrafficArrays
+from .route import Route
+
+
+class RouteTable(TrafficArrays):
+    ''' Columnar copy of the routes of all aircraft, in CSR layout: the
+        waypoints of all routes are stored in flat arrays, and each aircraft
+        has an offset and a number of waypoints into these arrays.
+
+        The Route objects remain the editable routes used by the stack
+        commands. Routes that are changed register themselves in
+        Route._modified, and are copied into the table on the next sync(),
+        which is called by all queries. This makes it possible to get route
+        data for all aircraft with a few array operations. '''
+
+    # Flat waypoint arrays, with the Route lists they are copied from,
+    # their type and the value used for missing elements
+    fields = dict(name=('wpname', object, ''), type=('wptype', int, 0),
+                  lat=('wplat', float, 0.0), lon=('wplon', float, 0.0),
+                  alt=('wpalt', float, -999.0), spd=('wpspd', float, -999.0),
+                  distto=('wpdistto', float, 0.0),
+                  toalt=('wptoalt', float, -999.0),
+                  xtoalt=('wpxtoalt', float, 0.0))
+
+    def __init__(self):
+        super().__init__()
+        with self.settrafarrays():
+            self.offset = np.array([], dtype=int)  # Index of first waypoint
+            self.nwp = np.array([], dtype=int)     # Number of waypoints
+            self.iactwp = np.array([], dtype=int)  # Active waypoint in route
+        self.clear()
+
+    def clear(self):
+        ''' Remove all waypoints from the flat arrays. '''
+        self.size = 0
+        for name, (_, dtype, _) in self.fields.items():
+            setattr(self, name, np.zeros(64, dtype=dtype))
+        # [nm] Cumulative distance along each route from its first waypoint
+        self.cumdist = np.zeros(64)
+
+    def create(self, n=1):
+        super().create(n)
+        self.iactwp[-n:] = -1
+
+    def reset(self):
+        super().reset()
+        self.clear()
+
+    def sync(self):
+        ''' Copy all modified routes into the table. '''
+        if not Route._modified:
+            return
+        routes = list(Route._modified)
+        Route._modified.clear()
+        for route in routes:
+            idx = bs.traf.idindex.get(route.acid, -1)
+            # Skip routes of deleted aircraft, and replaced route objects
+            if idx >= 0 and bs.traf.ap.route[idx] is route:
+                self.setroute(idx, route)
+
+        # Compact the flat arrays when more than half is unused
+        nused = np.sum(self.nwp)
+        if self.size - nused > max(nused, 1024):
+            self.compact()
+
+    def setroute(self, idx, route):
+        ''' Copy the route of aircraft idx into the flat arrays. '''
+        n = len(route.wpname)
+        # Overwrite the previous waypoints when the route didn't grow,
+        # otherwise append at the end
+        if n > self.nwp[idx]:
+            if self.size + n > len(self.cumdist):
+                self.grow(self.size + n)
+            self.offset[idx] = self.size
+            self.size += n
+        i0 = self.offset[idx]
+        for name, (attr, _, missing) in self.fields.items():
+            values = getattr(route, attr)[:n]
+            getattr(self, name)[i0:i0 + n] = values + [missing] * (n - len(values))
+        self.cumdist[i0:i0 + n] = np.cumsum(self.distto[i0:i0 + n])
+        self.nwp[idx] = n
+        self.iactwp[idx] = route.iactwp
+
+    def grow(self, size):
+        ''' Double the capacity of the flat arrays until size fits. '''
+        capacity = len(self.cumdist)
+        while capacity < size:
+            capacity *= 2
+        for name in list(self.fields) + ['cumdist']:
+            arr = getattr(self, name)
+            newarr = np.zeros(capacity, dtype=arr.dtype)
+            newarr[:self.size] = arr[:self.size]
+            setattr(self, name, newarr)
+
+    def compact(self):
+        ''' Remove unused waypoints from the flat arrays. '''
+        offset = np.cumsum(self.nwp) - self.nwp
+        nused = np.sum(self.nwp)
+        iwp = np.repeat(self.offset - offset, self.nwp) + np.arange(nused)
+        for name in list(self.fields) + ['cumdist']:
+            arr = getattr(self, name)
+            arr[:nused] = arr[iwp]
+        self.offset[:] = offset
+        self.size = nused
+
+    def actwp(self):
+        ''' Flat index of the active waypoint of each aircraft, and a mask
+            that is False for aircraft without an active waypoint. '''
+        self.sync()
+        valid = (self.iactwp >= 0) & (self.iactwp < self.nwp)
+        return np.where(valid, self.offset + self.iactwp, 0), valid
+
+    def active(self, name):
+        ''' Value of waypoint field name at the active waypoint of each
+            aircraft, e.g., active('lat') or active('xtoalt'). '''
+        iwp, valid = self.actwp()
+        _, dtype, missing = self.fields.get(name, (None, float, 0.0))
+        return np.where(valid, getattr(self, name)[iwp], missing).astype(dtype)
+
+    def distalong(self, iwp):
+        ''' [nm] Distance along the route from the active waypoint of each
+            aircraft to waypoint iwp (index in route, negative indices count
+            from the end), or NaN when iwp is not ahead in the route. '''
+        iact, valid = self.actwp()
+        iwp = np.where(iwp < 0, self.nwp + iwp, iwp)
+        valid &= (iwp >= self.iactwp) & (iwp < self.nwp)
+        iwp = np.where(valid, self.offset + iwp, 0)
+        return np.where(valid, self.cumdist[iwp] - self.cumdist[iact], np.nan)
+
+    def remaining(self):
+        ''' [nm] Distance along the route from the active waypoint of each
+            aircraft to the last waypoint (zero without route). '''
+        return np.nan_to_num(self.distalong(np.full(len(self.nwp), -1)))
@@ -13,10 +13,12 @@ from random import randint
 import numpy as np
 
 import bluesky as bs
+from bluesky import stack
 from bluesky.core import Entity, timed_function
+from bluesky.core.pipeline import Pipeline
 from bluesky.stack import refdata
 from bluesky.stack.recorder import savecmd
-from bluesky.tools import geo, Functions
+from bluesky.tools import geo
 from bluesky.tools.misc import latlon2txt, angleFromCoordinate, get_indices
 from bluesky.tools.aero import cas2tas, casormach2tas, fpm, kts, ft, g0, Rearth, nm, tas2cas,\
                          vatmos,  vtas2cas, vtas2mach, vcasormach
@@ -24,6 +26,7 @@ from bluesky.tools.aero import cas2tas, casormach2tas, fpm, kts, ft, g0, Rearth,
 
 from bluesky.traffic.asas import ConflictDetection, ConflictResolution
 from .windsim import WindSim
+from .meteocube import MeteoCube
 from .conditional import Condition
 from .trails import Trails
 from .adsbmodel import ADSB
@@ -90,12 +93,14 @@ class Traffic(Entity):
         self.HighRes = False
         self.Wind_DB = ""
 
-        self.df_1 = ""
-        self.df_2 = ""
+        self.meteocube = None
         self.HR_Loaded = False
         self.activate_HR = False
 
         self.id_select = ''  # aircraft that previously received a command
+        # Index in the traffic arrays of each aircraft id (see idindex)
+        self._idindex = dict()
+        self._idvalid = 0  # Number of aircraft with an up-to-date index
 
         self.trafdatafeed = TrafficDataFeed()
 
@@ -187,10 +192,29 @@ class Traffic(Entity):
         # Default bank angles per flight phase
         self.bphase = np.deg2rad(np.array([15, 35, 35, 35, 15, 45]))
 
+        # Update stages, in order of execution. By default all stages are
+        # updated each simulation step, except for the asas and performance
+        # stages, which are triggered by the timers of their timed functions.
+        self.pipeline = Pipeline('traffic')
+        self.pipeline.add('atmosphere', self.update_atmosphere)
+        self.pipeline.add('adsb', lambda: self.adsb.update())
+        self.pipeline.add('autopilot', lambda: self.ap.update())
+        self.pipeline.add('asas', self.update_asas, timer=self.update_asas.__manualtimer__)
+        self.pipeline.add('aporasas', lambda: self.aporasas.update())
+        self.pipeline.add('performance', lambda: self.perf.update(),
+                          timer=PerfBase.update.__manualtimer__)
+        self.pipeline.add('kinematics', self.update_kinematics)
+        self.pipeline.add('datafeed', lambda: self.trafdatafeed.update())
+        self.pipeline.add('turbulence', lambda: self.turbulence.update())
+        self.pipeline.add('conditions', lambda: self.cond.update())
+        self.pipeline.add('trails', lambda: self.trails.update())
+
     def reset(self):
         ''' Clear all traffic data upon simulation reset. '''
         # Some child reset functions depend on a correct value of self.ntraf
         self.ntraf = 0
+        self._idindex.clear()
+        self._idvalid = 0
         # This ensures that the traffic arrays (which size is dynamic)
         # are all reset as well, so all lat,lon,sdp etc but also objects adsb
         super().reset()
@@ -210,6 +234,9 @@ class Traffic(Entity):
         # Reset transition level to default value
         self.translvl = 5000.*ft
 
+        # Reset the elapsed time and wall-time accounting of the update stages
+        self.pipeline.reset()
+
     def mcre(self, n, actype="B744", acalt=None, acspd=None, dest=None):
         """ Create one or more random aircraft in a specified area """
         area = bs.scr.getviewbounds()
@@ -234,7 +261,7 @@ class Traffic(Entity):
 
         if isinstance(acid, str):
             # Check if not already exist
-            if self.id.count(acid.upper()) > 0:
+            if acid.upper() in self.idindex:
                 return False, acid + " already exists."  # already exists do nothing
             acid = n * [acid]
 
@@ -259,6 +286,7 @@ class Traffic(Entity):
 
         # Aircraft Info
         self.id[-n:]   = acid
+        self._idvalid = min(self._idvalid, self.ntraf - n)
         self.type[-n:] = actype
 
         # Positions
@@ -268,7 +296,7 @@ class Traffic(Entity):
 
         if isinstance(achdg, str):
             if achdg.upper() in bs.navdb.wpid:
-                index = bs.navdb.wpid.index(achdg.upper())
+                index = bs.navdb.getwpidx(achdg)
                 templat_hdg = bs.navdb.wplat[index]
                 templon_hdg = bs.navdb.wplon[index]
                 templat_ac = aclat
@@ -423,18 +451,43 @@ class Traffic(Entity):
         # (which will use list in reverse order to avoid index confusion)
         if isinstance(idx, Collection):
             idx = np.sort(idx)
+            ifirst = np.min(idx % self.ntraf) if len(idx) else self.ntraf
+            for i in idx:
+                self._idindex.pop(self.id[i], None)
+        else:
+            ifirst = idx % self.ntraf
+            self._idindex.pop(self.id[idx], None)
 
         # Call the actual delete function
         super().delete(idx)
 
         # Update number of aircraft
         self.ntraf = len(self.lat)
+
+        # Only the aircraft after the first deleted one have moved
+        self._idvalid = min(self._idvalid, ifirst)
         return True
 
+    @property
+    def idindex(self):
+        ''' Mapping of aircraft id to index in the traffic arrays.
+            The indices of aircraft that were created or moved by a delete
+            are updated on access, so that consecutive deletes only need one
+            update. '''
+        if self._idvalid < self.ntraf:
+            self._idindex.update(zip(self.id[self._idvalid:], range(self._idvalid, self.ntraf)))
+            self._idvalid = self.ntraf
+        return self._idindex
+
     def update(self):
         # Update only if there is traffic ---------------------
         if self.ntraf == 0:
             return
+
+        # Update all stages (see pipeline in __init__ for the default order)
+        self.pipeline.update(bs.sim.simdt)
+
+    def update_atmosphere(self):
         #---------- Atmosphere --------------------------------
         self.p, self.rho, self.Temp = vatmos(self.alt)
 
@@ -442,38 +495,31 @@ class Traffic(Entity):
         if self.HighRes == True:
             self.updateHighRes()
 
-        #---------- ADSB Update -------------------------------
-        self.adsb.update()
-
-        #---------- Fly the Aircraft --------------------------
-        self.ap.update()  # Autopilot logic
-        self.update_asas()  # Airborne Separation Assurance
-        self.aporasas.update()   # Decide to use autopilot or ASAS for commands
-
-        #---------- Performance Update ------------------------
-        self.perf.update()
-
+    def update_kinematics(self, dt):
         #---------- Limit commanded speeds based on performance ------------------------------
         self.aporasas.tas, self.aporasas.vs, self.aporasas.alt = \
             self.perf.limits(self.aporasas.tas, self.aporasas.vs,
                              self.aporasas.alt, self.ax)
 
         #---------- Kinematics --------------------------------
-        self.update_airspeed()
-        self.update_groundspeed()
-        self.update_pos()
-
-        # --------- Update from data --------------------------
-        self.trafdatafeed.update()
-
-        #---------- Simulate Turbulence -----------------------
-        self.turbulence.update()
-
-        # Check whether new traffic state triggers conditional commands
-        self.cond.update()
-
-        #---------- Aftermath ---------------------------------
-        self.trails.update()
+        self.update_airspeed(dt)
+        self.update_groundspeed(dt)
+        self.update_pos(dt)
+
+    @stack.command(name='STAGE')
+    def setstage(self, name: 'txt' = '', dt: float = None):
+        """ STAGE [name, dt]
+
+            Set the update interval [s] of a traffic update stage, or list
+            all stages with their interval and wall-clock time. """
+        if not name:
+            return True, 'Traffic update stages:\n' + self.pipeline.report()
+        stage = self.pipeline.get(name)
+        if stage is None:
+            return False, f'Stage {name} not found, stages are: ' + ', '.join(self.pipeline.stages)
+        if dt is None:
+            return True, f'{stage.name} dt = {stage.timer.dt_act}'
+        return stage.timer.setdt(dt)
 
     @timed_function(name='asas', dt=bs.settings.asas_dt, manual=True)
     def update_asas(self):
@@ -481,13 +527,13 @@ class Traffic(Entity):
         self.cd.update(self, self)
         self.cr.update(self.cd, self, self)
 
-    def update_airspeed(self):
+    def update_airspeed(self, dt):
         # Compute horizontal acceleration
         delta_spd = self.aporasas.tas - self.tas
-        need_ax = np.abs(delta_spd) > np.abs(bs.sim.simdt * self.perf.axmax)
+        need_ax = np.abs(delta_spd) > np.abs(dt * self.perf.axmax)
         self.ax = need_ax * np.sign(delta_spd) * self.perf.axmax
         # Update velocities
-        self.tas = np.where(need_ax, self.tas + self.ax * bs.sim.simdt, self.aporasas.tas)
+        self.tas = np.where(need_ax, self.tas + self.ax * dt, self.aporasas.tas)
         self.cas = vtas2cas(self.tas, self.alt)
         self.M = vtas2mach(self.tas, self.alt)
 
@@ -495,30 +541,30 @@ class Traffic(Entity):
         turnrate = np.degrees(g0 * np.tan(np.where(self.ap.turnphi>self.eps,self.ap.turnphi,self.ap.bankdef) \
                                           / np.maximum(self.tas, self.eps)))
         delhdg = (self.aporasas.hdg - self.hdg + 180) % 360 - 180  # [deg]
-        self.swhdgsel = np.abs(delhdg) > np.abs(bs.sim.simdt * turnrate)
+        self.swhdgsel = np.abs(delhdg) > np.abs(dt * turnrate)
 
         # Update heading
         self.hdg = np.where(self.swhdgsel, 
-                            self.hdg + bs.sim.simdt * turnrate * np.sign(delhdg), self.aporasas.hdg) % 360.0
+                            self.hdg + dt * turnrate * np.sign(delhdg), self.aporasas.hdg) % 360.0
 
         # Update vertical speed (alt select, capture and hold autopilot mode)
         delta_alt = self.aporasas.alt - self.alt
         # Old dead band version:
         #        self.swaltsel = np.abs(delta_alt) > np.maximum(
-        #            10 * ft, np.abs(2 * bs.sim.simdt * self.vs))
+        #            10 * ft, np.abs(2 * dt * self.vs))
 
         # Update version: time based engage of altitude capture (to adapt for UAV vs airliner scale)
-        self.swaltsel = np.abs(delta_alt) >  1.05*np.maximum(np.abs(bs.sim.simdt * self.aporasas.vs), \
-                                                         np.abs(bs.sim.simdt * self.vs))
+        self.swaltsel = np.abs(delta_alt) >  1.05*np.maximum(np.abs(dt * self.aporasas.vs), \
+                                                         np.abs(dt * self.vs))
         target_vs = self.swaltsel * np.sign(delta_alt) * np.abs(self.aporasas.vs)
         delta_vs = target_vs - self.vs
         # print(delta_vs / fpm)
         need_az = np.abs(delta_vs) > 300 * fpm   # small threshold
         self.az = need_az * np.sign(delta_vs) * (300 * fpm)   # fixed vertical acc approx 1.6 m/s^2
-        self.vs = np.where(need_az, self.vs+self.az*bs.sim.simdt, target_vs)
+        self.vs = np.where(need_az, self.vs+self.az*dt, target_vs)
         self.vs = np.where(np.isfinite(self.vs), self.vs, 0)    # fix vs nan issue
 
-    def update_groundspeed(self):
+    def update_groundspeed(self, dt):
         # Compute ground speed and track from heading, airspeed and wind
         if self.wind.winddim == 0:  # no wind
             self.gsnorth  = self.tas * np.cos(np.radians(self.hdg))
@@ -542,34 +588,29 @@ class Traffic(Entity):
             self.trk = np.logical_not(applywind)*self.hdg + \
                        applywind*np.degrees(np.arctan2(self.gseast, self.gsnorth)) % 360.
 
-        self.work += (self.perf.thrust * bs.sim.simdt * np.sqrt(self.gs * self.gs + self.vs * self.vs))
+        self.work += (self.perf.thrust * dt * np.sqrt(self.gs * self.gs + self.vs * self.vs))
 
-    def update_pos(self):
+    def update_pos(self, dt):
         # Update position
-        self.alt = np.where(self.swaltsel, np.round(self.alt + self.vs * bs.sim.simdt, 6), self.aporasas.alt)
-        self.lat = self.lat + np.degrees(bs.sim.simdt * self.gsnorth / Rearth)
+        self.alt = np.where(self.swaltsel, np.round(self.alt + self.vs * dt, 6), self.aporasas.alt)
+        self.lat = self.lat + np.degrees(dt * self.gsnorth / Rearth)
         self.coslat = np.cos(np.deg2rad(self.lat))
-        self.lon = self.lon + np.degrees(bs.sim.simdt * self.gseast / self.coslat / Rearth)
+        self.lon = self.lon + np.degrees(dt * self.gseast / self.coslat / Rearth)
         # Update distflown only for simulated aircraft
-        itrafsim = np.setdiff1d(np.arange(0, self.ntraf), get_indices(self.id, bs.traf.trafdatafeed.datafeedids))
-        self.distflown[itrafsim] += self.gs[itrafsim] * bs.sim.simdt
+        itrafsim = np.setdiff1d(np.arange(0, self.ntraf), get_indices(self.id, bs.traf.trafdatafeed.datafeedids, self.idindex))
+        self.distflown[itrafsim] += self.gs[itrafsim] * dt
 
     def id2idx(self, acid):
         """Find index of aircraft id"""
         if not isinstance(acid, str):
             # id2idx is called for multiple id's
-            # Fast way of finding indices of all ACID's in a given list
-            tmp = dict((v, i) for i, v in enumerate(self.id))
-            return [tmp.get(acidi, -1) for acidi in acid]
+            return [self.idindex.get(acidi, -1) for acidi in acid]
         else:
              # Catch last created id (* or # symbol)
             if acid in ('#', '*'):
                 return self.ntraf - 1
 
-            try:
-                return self.id.index(acid.upper())
-            except:
-                return -1
+            return self.idindex.get(acid.upper(), -1)
 
     def idselect2idx(self):
         """
@@ -582,13 +623,7 @@ class Traffic(Entity):
         Date: 10-12-2021
         """
 
-        if self.id_select != '':
-            try:
-                return self.id.index(self.id_select.upper())
-            except:
-                return -1
-        else:
-            return -1
+        return self.idindex.get(self.id_select.upper(), -1)
 
     def mnual(self, idx, flag=None):
         """
@@ -653,10 +688,15 @@ class Traffic(Entity):
 
         self.HighRes = flag
         self.Wind_DB = name
+        if self.meteocube is not None:
+            self.meteocube.close()
+            self.meteocube = None
         if self.HighRes:
             bs.scr.echo("HighResolution Meteo mode has been initialised.")
             self.wind.winddim = 1
             self.activate_HR = True
+            self.HR_Loaded = False
+            self.meteocube = MeteoCube(name)
         else:
             print("HighResolution Meteo mode has been disabled.")
             self.wind.winddim = 0
@@ -675,25 +715,16 @@ class Traffic(Entity):
             """ Only goes here when 10 seconds have past. """
             if (str(bs.sim.utc)[17:] == "00" and str(bs.sim.utc)[15] == "0") or self.activate_HR == True:
                 """ Only goes here every 10 minutes, which is when the new weather data must be loaded. """
-                self.prev_timestamp, self.next_timestamp = Functions.utc2stamps(bs.sim.utc)
-                self.df_1 = Functions.query_DB_to_DF(self.Wind_DB,"SELECT * FROM " + self.Wind_DB + " WHERE timestamp_data = " + str(self.prev_timestamp))
-                self.df_2 = Functions.query_DB_to_DF(self.Wind_DB,"SELECT * FROM " + self.Wind_DB + " WHERE timestamp_data = " + str(self.next_timestamp))
+                # The timeframe after these is read in the background
+                self.meteocube.update(bs.sim.utc)
                 self.HR_Loaded = True
                 self.activate_HR = False
 
             if self.HR_Loaded:
-                base = floor(len(self.lat) * int(str(bs.sim.utc)[17:])/60)
-                top  = ceil(len(self.lat) * int(str(bs.sim.utc)[17:])/60) + ceil(len(self.lat) * 10/60)
-                if top >= len(self.lat):
-                    top -= 1
-                for idx in range(top - base):
-                    """ Fill the uwind and vwind variables. """
-                    timefrac = Functions.utc2frac(bs.sim.utc, self.prev_timestamp)
-                    if self.lat[idx + base] >= 49 and self.lat[idx + base] <= 55.9 and self.lon[idx + base] >= -1 and self.lon[idx + base] <= 9.9:
-                        value1 = Functions.find_datapoint_timeframe(self.df_1,[self.prev_timestamp, self.alt[idx + base] / 0.3048,self.lat[idx + base], self.lon[idx + base]])
-                        value2 = Functions.find_datapoint_timeframe(self.df_2,[self.next_timestamp, self.alt[idx + base] / 0.3048,self.lat[idx + base], self.lon[idx + base]])
-                        self.windnorth[idx + base] = Functions.time_interpolation(timefrac, value1[4], value2[4])
-                        self.windeast[idx + base] = Functions.time_interpolation(timefrac, value1[5], value2[5])
+                # Interpolate the wind of all aircraft in the meteo area
+                inside, uwind, vwind = self.meteocube.getdata(self.lat, self.lon, self.alt / ft, bs.sim.utc)
+                self.windnorth[inside] = uwind
+                self.windeast[inside] = vwind
 
 
     def setnoise(self, noise=None):
@@ -5,7 +5,6 @@ Created by: Bob van Dillen
 Date: 13-1-2022
 """
 
-import copy
 import numpy as np
 import bluesky as bs
 from bluesky import stack
@@ -131,7 +130,7 @@ class TrafficDataFeed(Entity):
 
             # ---------- Update from previous aircraft states ----------
             # Get indices for traffic arrays and previous aircraft states
-            itraf_prev = misc.get_indices(bs.traf.id, np.delete(self.datafeedids, idatafeed_update))
+            itraf_prev = misc.get_indices(bs.traf.id, np.delete(self.datafeedids, idatafeed_update), bs.traf.idindex)
             iprev = misc.get_indices(self.trafprev['id'], np.delete(self.datafeedids, idatafeed_update))
             # Update from previous aircraft states
             self.update_fromtrafprev(itraf_prev, iprev)
@@ -143,7 +142,7 @@ class TrafficDataFeed(Entity):
             self.trackdata = dict()
         else:
             # Get indices for traffic arrays and previous aircraft states
-            itraf_prev = misc.get_indices(bs.traf.id, self.datafeedids)
+            itraf_prev = misc.get_indices(bs.traf.id, self.datafeedids, bs.traf.idindex)
             iprev = misc.get_indices(self.trafprev['id'], self.datafeedids)
             # Update from previous aircraft states
             self.update_fromtrafprev(itraf_prev, iprev)
@@ -206,7 +205,7 @@ class TrafficDataFeed(Entity):
         """
 
         # Get indices for traffic arrays
-        itraf = misc.get_indices(bs.traf.id, self.datafeedids)
+        itraf = misc.get_indices(bs.traf.id, self.datafeedids, bs.traf.idindex)
 
         # No wind
         if bs.traf.wind.winddim == 0:
@@ -265,13 +264,13 @@ class TrafficDataFeed(Entity):
         Date: 13-1-2022
         """
 
-        self.trafprev['id'] = copy.deepcopy(bs.traf.id)
-        self.trafprev['lat'] = copy.deepcopy(bs.traf.lat)
-        self.trafprev['lon'] = copy.deepcopy(bs.traf.lon)
-        self.trafprev['hdg'] = copy.deepcopy(bs.traf.hdg)
-        self.trafprev['alt'] = copy.deepcopy(bs.traf.alt)
-        self.trafprev['gs'] = copy.deepcopy(bs.traf.gs)
-        self.trafprev['distflown'] = copy.deepcopy(bs.traf.distflown)
+        self.trafprev['id'] = list(bs.traf.id)
+        self.trafprev['lat'] = bs.traf.lat.copy()
+        self.trafprev['lon'] = bs.traf.lon.copy()
+        self.trafprev['hdg'] = bs.traf.hdg.copy()
+        self.trafprev['alt'] = bs.traf.alt.copy()
+        self.trafprev['gs'] = bs.traf.gs.copy()
+        self.trafprev['distflown'] = bs.traf.distflown.copy()
 
     def indices_update(self, ids_trackdata):
         """
@@ -291,7 +290,7 @@ class TrafficDataFeed(Entity):
         # Get callsigns that need an update and index for trackdata
         ids_update, ireplay, itrackdata_update = np.intersect1d(self.datafeedids, ids_trackdata, return_indices=True)
         # Get index for traffic arrays
-        itraf_update = misc.get_indices(bs.traf.id, ids_update)
+        itraf_update = misc.get_indices(bs.traf.id, ids_update, bs.traf.idindex)
 
         return itraf_update, itrackdata_update, ireplay
 
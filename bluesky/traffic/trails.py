@@ -1,10 +1,13 @@
 """ Create aircraft trails on the radar display."""
-from math import *
 import numpy as np
 import bluesky as bs
 from bluesky import settings
 from bluesky.core import TrafficArrays
 
+# Maximum number of stored trail segments, and maximum segment age [s]
+# (zero: no maximum age)
+settings.set_variable_defaults(trails_maxseg=100000, trails_maxage=0.0)
+
 
 class Trails(TrafficArrays):
     """
@@ -15,6 +18,11 @@ class Trails(TrafficArrays):
 
     Members: see create
 
+    Trail segments are stored in a fixed-capacity circular buffer, with
+    float32 positions and times, and uint8 colours. When the buffer is full,
+    or when segments are older than the maximum age, the oldest segments
+    are removed.
+
     Created by  : Jacco M. Hoekstra
     """
 
@@ -24,6 +32,7 @@ class Trails(TrafficArrays):
         self.dt = dttrail    # Resolution of trail pieces in time
         self.pygame = (bs.gui_type == 'pygame') # Trails are different for pygame
         self.tcol0 = 60.  # After how many seconds old colour
+        self.maxage = settings.trails_maxage
 
         # This list contains some standard colors
         self.colorList = {'BLUE': np.array([0, 0, 255]),
@@ -34,42 +43,33 @@ class Trails(TrafficArrays):
         # Set default color to Blue
         self.defcolor = self.colorList['CYAN']
 
-        # Foreground data on line pieces
-        self.lat0 = np.array([])
-        self.lon0 = np.array([])
-        self.lat1 = np.array([])
-        self.lon1 = np.array([])
-        self.time = np.array([])
-        self.col  = []
-        self.fcol = np.array([])
-
-        # background copy of data
-        self.bglat0 = np.array([])
-        self.bglon0 = np.array([])
-        self.bglat1 = np.array([])
-        self.bglon1 = np.array([])
-        self.bgtime = np.array([])
-        self.bgcol = []
+        # Circular buffer with line pieces
+        self.capacity = settings.trails_maxseg
+        self.seglat0 = np.zeros(self.capacity, dtype=np.float32)
+        self.seglon0 = np.zeros(self.capacity, dtype=np.float32)
+        self.seglat1 = np.zeros(self.capacity, dtype=np.float32)
+        self.seglon1 = np.zeros(self.capacity, dtype=np.float32)
+        self.segtime = np.zeros(self.capacity, dtype=np.float32)
+        self.segcol  = np.zeros((self.capacity, 3), dtype=np.uint8)
 
         with self.settrafarrays():
-            self.accolor = []
+            self.accolor = np.zeros((0, 3), dtype=np.uint8)
             self.lastlat = np.array([])
             self.lastlon = np.array([])
             self.lasttim = np.array([])
 
-        self.clearnew()
+        self.clear()
 
         return
 
     def create(self,n=1):
         super().create(n)
 
-        self.accolor[-1] = self.defcolor
-        self.lastlat[-1] = bs.traf.lat[-1]
-        self.lastlon[-1] = bs.traf.lon[-1]
+        self.accolor[-n:] = self.defcolor
+        self.lastlat[-n:] = bs.traf.lat[-n:]
+        self.lastlon[-n:] = bs.traf.lon[-n:]
 
     def update(self):
-        self.acid    = bs.traf.id
         if not self.active:
             self.lastlat = bs.traf.lat
             self.lastlon = bs.traf.lon
@@ -77,119 +77,123 @@ class Trails(TrafficArrays):
             return
         """Add linepieces for trails based on traffic data"""
 
-        # Use temporary list/array for fast append
-        lstlat0 = []
-        lstlon0 = []
-        lstlat1 = []
-        lstlon1 = []
-        lsttime = []
-
         # Check for update
         delta = bs.sim.simt - self.lasttim
-        idxs = np.where(delta > self.dt)[0]
-
-        # Add all a/c which need the update
-        # if len(idxs)>0:
-        #     print "len(idxs)=",len(idxs)
-
-        for i in idxs:
-            # Add to lists
-            lstlat0.append(self.lastlat[i])
-            lstlon0.append(self.lastlon[i])
-            lstlat1.append(bs.traf.lat[i])
-            lstlon1.append(bs.traf.lon[i])
-            lsttime.append(bs.sim.simt)
-
-            if isinstance(self.col, np.ndarray):
-                # print type(trailcol[i])
-                # print trailcol[i]
-                # print "col type: ",type(self.col)
-                self.col = self.col.tolist()
-
-            type(self.col)
-            self.col.append(self.accolor[i])
-
-            # Update aircraft record
-            self.lastlat[i] = bs.traf.lat[i]
-            self.lastlon[i] = bs.traf.lon[i]
-            self.lasttim[i] = bs.sim.simt
-
-        # When a/c is no longer part of trail semgment,
-        # it is no longer a/c data => move to the GUI buffer (send or draw)
-        if self.pygame:
-            # Pygame: send to drawing buffer
-            self.lat0 = np.concatenate((self.lat0, np.array(lstlat0)))
-            self.lon0 = np.concatenate((self.lon0, np.array(lstlon0)))
-            self.lat1 = np.concatenate((self.lat1, np.array(lstlat1)))
-            self.lon1 = np.concatenate((self.lon1, np.array(lstlon1)))
-            self.time = np.concatenate((self.time, np.array(lsttime)))
-        else:
-            # QtGL: add to send buffer
-            self.newlat0.extend(lstlat0)
-            self.newlon0.extend(lstlon0)
-            self.newlat1.extend(lstlat1)
-            self.newlon1.extend(lstlon1)
-        # Update colours
-        self.fcol = (1. - np.minimum(self.tcol0, np.abs(bs.sim.simt - self.time)) / self.tcol0)
+        idxs = np.nonzero(delta > self.dt)[0]
+        if len(idxs) == 0:
+            return
 
-        return
+        # Remove segments that are too old
+        if self.maxage > 0.0:
+            self.evict(bs.sim.simt - self.maxage)
+
+        # Add line pieces of all a/c which need the update
+        self.append(self.lastlat[idxs], self.lastlon[idxs],
+                    bs.traf.lat[idxs], bs.traf.lon[idxs], bs.sim.simt,
+                    self.accolor[idxs])
+
+        # Update aircraft record
+        self.lastlat[idxs] = bs.traf.lat[idxs]
+        self.lastlon[idxs] = bs.traf.lon[idxs]
+        self.lasttim[idxs] = bs.sim.simt
+        self.gather()
+
+    def append(self, lat0, lon0, lat1, lon1, time, col):
+        """ Add line pieces to the circular buffer, overwriting the oldest
+            line pieces when the buffer is full. """
+        n = len(lat0)
+        if n > self.capacity:
+            lat0, lon0, lat1, lon1, col = (a[-self.capacity:] for a in
+                                           (lat0, lon0, lat1, lon1, col))
+            n = self.capacity
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.seglat0[idx] = lat0
+        self.seglon0[idx] = lon0
+        self.seglat1[idx] = lat1
+        self.seglon1[idx] = lon1
+        self.segtime[idx] = time
+        self.segcol[idx] = col
+        self.head = (self.head + n) % self.capacity
+        self.nseg = min(self.nseg + n, self.capacity)
+        self.nfg = min(self.nfg + n, self.nseg)
+        self.nnew = min(self.nnew + n, self.nseg)
+
+    def evict(self, tmin):
+        """ Remove line pieces older than tmin. """
+        if self.nseg == 0 or self.segtime[(self.head - self.nseg) % self.capacity] >= tmin:
+            return
+        # Line pieces are stored in chronological order
+        nold = np.searchsorted(self.segtime[self.segments()], tmin)
+        self.nseg -= nold
+        self.nfg = min(self.nfg, self.nseg)
+        self.nnew = min(self.nnew, self.nseg)
+
+    def segments(self, start=0, end=None):
+        """ Buffer indices of line pieces start to end, in chronological
+            order. """
+        end = self.nseg if end is None else end
+        return (self.head - self.nseg + np.arange(start, end)) % self.capacity
+
+    def getnew(self):
+        """ Return the line pieces added since the previous call
+            (lat0, lon0, lat1, lon1, time). """
+        idx = self.segments(self.nseg - self.nnew)
+        self.nnew = 0
+        return self.seglat0[idx], self.seglon0[idx], self.seglat1[idx], \
+            self.seglon1[idx], self.segtime[idx]
+
+    def gather(self):
+        """ Gather the foreground line pieces (added since the last buffer()
+            call) and the background line pieces in chronological order,
+            for the pygame screen. """
+        idx = self.segments(self.nseg - self.nfg)
+        self.lat0, self.lon0 = self.seglat0[idx], self.seglon0[idx]
+        self.lat1, self.lon1 = self.seglat1[idx], self.seglon1[idx]
+        self.time, self.col = self.segtime[idx], self.segcol[idx]
+        idx = self.segments(0, self.nseg - self.nfg)
+        self.bglat0, self.bglon0 = self.seglat0[idx], self.seglon0[idx]
+        self.bglat1, self.bglon1 = self.seglat1[idx], self.seglon1[idx]
+        self.bgtime, self.bgcol = self.segtime[idx], self.segcol[idx]
+
+    @property
+    def fcol(self):
+        """ Fading factor of the foreground line pieces. """
+        return 1. - np.minimum(self.tcol0, np.abs(bs.sim.simt - self.time)) / self.tcol0
 
     def buffer(self):
         """Buffer trails: Move current stack to background """
-
-        self.bglat0 = np.append(self.bglat0, self.lat0)
-        self.bglon0 = np.append(self.bglon0, self.lon0)
-        self.bglat1 = np.append(self.bglat1, self.lat1)
-        self.bglon1 = np.append(self.bglon1, self.lon1)
-        self.bgtime = np.append(self.bgtime, self.time)
-
-        # No color saved: Background: always 'old color' self.col0
-        if isinstance(self.bgcol, np.ndarray):
-            self.bgcol = self.bgcol.tolist()
-        if isinstance(self.col, np.ndarray):
-            self.col = self.col.tolist()
-
-        self.bgcol = self.bgcol + self.col
-        self.bgacid = self.bgacid + self.acid
-
-        self.clearfg()  # Clear foreground trails
+        self.nfg = 0
+        self.gather()
         return
 
     def clearnew(self):
         # Clear new lines pipeline used for QtGL
-        self.newlat0 = []
-        self.newlon0 = []
-        self.newlat1 = []
-        self.newlon1 = []
-
+        self.nnew = 0
 
     def clearfg(self):  # Foreground
         """Clear trails foreground"""
-        self.lat0 = np.array([])
-        self.lon0 = np.array([])
-        self.lat1 = np.array([])
-        self.lon1 = np.array([])
-        self.time = np.array([])
-        self.col = np.array([])
+        self.nseg -= self.nfg
+        self.nnew = min(self.nnew, self.nseg)
+        self.head = (self.head - self.nfg) % self.capacity
+        self.nfg = 0
+        self.gather()
         return
 
     def clearbg(self):  # Background
         """Clear trails background"""
-        self.bglat0 = np.array([])
-        self.bglon0 = np.array([])
-        self.bglat1 = np.array([])
-        self.bglon1 = np.array([])
-        self.bgtime = np.array([])
-        self.bgacid = []
+        self.nseg = self.nfg
+        self.gather()
         return
 
     def clear(self):
         """Clear all data, Foreground and background"""
         self.lastlon = np.array([])
         self.lastlat = np.array([])
-        self.clearfg()
-        self.clearbg()
-        self.clearnew()
+        self.head = 0   # Index of the next line piece in the buffer
+        self.nseg = 0   # Number of line pieces in the buffer
+        self.nfg = 0    # Number of foreground line pieces (pygame)
+        self.nnew = 0   # Number of line pieces not yet sent (QtGL)
+        self.gather()
         return
 
     def setTrails(self, *args):
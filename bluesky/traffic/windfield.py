@@ -3,10 +3,28 @@ from numpy import array, sin, cos, arange, radians, ones, append, ndarray, \
                   amin, minimum, repeat, delete, zeros, around, maximum, floor, \
                   interp, pi
 
+from scipy.spatial import cKDTree
+
 from bluesky.tools.aero import ft
 import bluesky as bs
 import numpy as np
 
+
+def xyz(lat, lon):
+    ''' Unit vectors [-] of lat/lon positions [deg], to search neighbours. '''
+    latrad = radians(lat)
+    lonrad = radians(lon)
+    return np.column_stack((cos(latrad) * cos(lonrad), cos(latrad) * sin(lonrad), sin(latrad)))
+
+
+def cellindex(axis, x):
+    ''' Index of the grid cell along axis that contains x, and relative
+        position of x in that cell, clipped to the edges of the grid. '''
+    i = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+    f = np.clip((x - axis[i]) / (axis[i + 1] - axis[i]), 0., 1.)
+    return i, f
+
+
 class Windfield():
     """ Windfield class:
         Methods:
@@ -25,6 +43,15 @@ class Windfield():
 
             remove(idx) = remove a defined profile using the index
 
+        Interpolation of 2D and 3D fields (mode):
+            IDW  = inverse distance weighting over all wind points
+            GRID = bilinear in lat/lon (trilinear with altitude) when the wind
+                   points form a regular lat/lon grid, otherwise IDW
+            KNN  = inverse distance weighting over the knn nearest wind points,
+                   found with a KD-tree. The neighbours of a position are
+                   only searched again when it moved more than the typical
+                   distance between wind points.
+
         Members:
             lat(nvec)          = latitudes of wind definitions
             lon(nvec)          = longitudes of wind definitions
@@ -53,6 +80,10 @@ class Windfield():
         # List of indices of points with an altitude profile (for 3D check)
         self.iprof   = []
 
+        # Interpolation method, and number of wind points used by KNN
+        self.mode    = 'IDW'
+        self.knn     = 8
+
         # Clear actual field
         self.clear()
         return
@@ -67,8 +98,84 @@ class Windfield():
         self.vnorth  = array([[]])
         self.veast   = array([[]])
         self.nvec    = 0
+        self.clearindex()
         return
 
+    def clearindex(self):
+        ''' Clear the grid or KD-tree of the wind points, and cached
+            neighbours. Called when the wind points change. '''
+        self.index    = None
+        self.knncache = dict()
+
+    def fieldindex(self):
+        ''' Build the grid (GRID) or KD-tree (KNN) of the wind points if
+            needed. Returns None if the wind points are not a regular grid. '''
+        if self.index is None or self.index[0] != self.mode:
+            self.knncache = dict()
+            if self.mode == 'GRID':
+                lataxis, ilat = np.unique(self.lat, return_inverse=True)
+                lonaxis, ilon = np.unique(self.lon, return_inverse=True)
+                gridpoint = np.full((len(lataxis), len(lonaxis)), -1)
+                gridpoint[ilat, ilon] = arange(self.nvec)
+                if min(gridpoint.shape) < 2 or self.nvec != gridpoint.size or \
+                        (gridpoint < 0).any():
+                    self.index = ('GRID', None)
+                else:
+                    self.index = ('GRID', (lataxis, lonaxis, gridpoint))
+            else:
+                tree = cKDTree(xyz(self.lat, self.lon))
+                # Median distance between neighbouring wind points [deg]
+                dnn = tree.query(tree.data, k=2)[0][:, 1]
+                self.index = ('KNN', (tree, np.degrees(np.median(dnn))))
+
+        return self.index[1]
+
+    def gridweights(self, lat, lon):
+        ''' Indices of the wind points at the corners of the grid cell of each
+            position, and their bilinear interpolation weights. '''
+        lataxis, lonaxis, gridpoint = self.index[1]
+        i, fi = cellindex(lataxis, lat)
+        j, fj = cellindex(lonaxis, lon)
+        idx = np.column_stack((gridpoint[i, j], gridpoint[i + 1, j],
+                               gridpoint[i, j + 1], gridpoint[i + 1, j + 1]))
+        weights = np.column_stack(((1. - fi) * (1. - fj), fi * (1. - fj),
+                                   (1. - fi) * fj, fi * fj))
+        return idx, weights
+
+    def knnweights(self, lat, lon, eps=1e-20):
+        ''' Indices of the nearest wind points of each position, and their
+            inverse distance weights. '''
+        tree, cell = self.index[1]
+        npos = len(lat)
+        k = min(self.knn, self.nvec)
+
+        # Neighbours are cached per number of positions, and only searched
+        # again for positions that moved more than a cell
+        cache = self.knncache.get(npos)
+        if cache is None:
+            if len(self.knncache) > 8:
+                self.knncache.clear()
+            cache = self.knncache[npos] = dict(lat=lat.copy(), lon=lon.copy(),
+                                               idx=np.zeros((npos, k), dtype=int))
+            moved = np.ones(npos, dtype=bool)
+        else:
+            dy = lat - cache['lat']
+            dx = cos(radians(lat)) * (lon - cache['lon'])
+            moved = dx * dx + dy * dy > cell * cell
+
+        if moved.any():
+            cache['idx'][moved] = tree.query(xyz(lat[moved], lon[moved]), k=k)[1].reshape(-1, k)
+            cache['lat'][moved] = lat[moved]
+            cache['lon'][moved] = lon[moved]
+
+        # Inverse distance squared weights as in IDW
+        idx = cache['idx']
+        cavelat = cos(radians(0.5 * (lat.reshape(npos, 1) + self.lat[idx])))
+        dy = lat.reshape(npos, 1) - self.lat[idx]
+        dx = cavelat * (lon.reshape(npos, 1) - self.lon[idx])
+        invd2 = 1. / (eps + dx * dx + dy * dy)
+        return idx, invd2 / invd2.sum(axis=1, keepdims=True)
+
     def addpoint(self,lat,lon,winddir,windspd,windalt=None):
         """ addpoint: adds a lat,lon position with a wind direction [deg]
                                                      and wind speedd [m/s]
@@ -119,6 +226,7 @@ class Windfield():
             self.iprof.append(idx)
 
         self.nvec = self.nvec+1
+        self.clearindex()
 
         return idx # return index of added point
 
@@ -165,6 +273,28 @@ class Windfield():
                 vnorth = ones(npos)*self.vnorth[0,0]
                 veast  = ones(npos)*self.veast[0,0]
 
+            elif self.winddim >= 2 and self.mode != 'IDW' and self.fieldindex() is not None:
+                # Horizontal interpolation over a limited set of wind points per position
+                idx, horfact = self.gridweights(lat[0], lon[0]) if self.mode == 'GRID' \
+                    else self.knnweights(lat[0], lon[0])
+
+                # No altitude profiles used: do 2D planar interpolation only
+                if self.winddim == 2 or ((type(useralt) not in (list,ndarray)) and useralt==0.0):
+                    vnorth = (self.vnorth[0, idx] * horfact).sum(axis=1)
+                    veast  = (self.veast[0, idx] * horfact).sum(axis=1)
+
+                # Altitude interpolation combined with horizontal
+                else:
+                    idxalt = np.clip(alt / self.altstep, 0., self.nalt - 1.)
+                    ialt   = minimum(floor(idxalt).astype(int), self.nalt - 2).reshape(npos, 1)
+                    falt   = idxalt - ialt[:, 0]
+                    vn0    = (self.vnorth[ialt, idx] * horfact).sum(axis=1)
+                    vn1    = (self.vnorth[ialt + 1, idx] * horfact).sum(axis=1)
+                    vnorth = (1. - falt) * vn0 + falt * vn1
+                    ve0    = (self.veast[ialt, idx] * horfact).sum(axis=1)
+                    ve1    = (self.veast[ialt + 1, idx] * horfact).sum(axis=1)
+                    veast  = (1. - falt) * ve0 + falt * ve1
+
             elif self.winddim >= 2: # 2D/3D field = more points defined but no altitude profile
 
                 #---- Get horizontal weight factors
@@ -228,7 +358,7 @@ class Windfield():
     def remove(self,idx): # remove a point using the returned index when it was added
         if idx<len(self.lat):
             self.lat = delete(self.lat,idx)
-            self.lon = delete(self.lat,idx)
+            self.lon = delete(self.lon,idx)
 
             self.vnorth = delete(self.vnorth,idx,axis=1)
             self.veast  = delete(self.veast ,idx,axis=1)
@@ -239,4 +369,7 @@ class Windfield():
             if self.winddim<3 or len(self.iprof)==0 or len(self.lat)==0:
                 self.winddim = min(2,len(self.lat)) # Check for 0, 1D, 2D or 3D
 
+            self.nvec = len(self.lat)
+            self.clearindex()
+
         return
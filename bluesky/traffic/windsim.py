@@ -68,3 +68,31 @@ class WindSim(Entity, Windfield, replaceable=True):
         txt  = "WIND AT %.5f, %.5f: %03d/%d" % (lat,lon,round(wdir),round(wspd/kts))
 
         return True, txt
+
+    @command(name='WINDMODE')
+    def setmode(self, mode: 'txt' = '', k: int = 0):
+        """ Select the interpolation method of 2D/3D wind fields.
+
+            Arguments:
+            - mode:
+              - IDW: Inverse distance weighting over all wind points (default)
+              - GRID: Trilinear interpolation when the wind points form a
+                regular lat/lon grid, IDW otherwise
+              - KNN: Inverse distance weighting over the k nearest wind points
+            - k: Number of wind points used by KNN
+        """
+        if mode and mode not in ('IDW', 'GRID', 'KNN'):
+            return False, f'WINDMODE: Unknown interpolation method {mode}'
+        if k > 0 and k != self.knn:
+            # Cached neighbours have the previous number of points
+            self.knn = k
+            self.clearindex()
+        if not mode:
+            return True, f'WINDMODE is {self.mode}' + \
+                (f' with k={self.knn}' if self.mode == 'KNN' else '')
+
+        self.mode = mode
+        self.clearindex()
+        if mode == 'GRID' and self.winddim >= 2 and self.fieldindex() is None:
+            return True, 'WINDMODE GRID: Wind field is not a regular grid, using IDW'
+        return True
@@ -561,8 +561,9 @@ class Screen:
                 x0, y0 = self.ll2xy(bs.traf.trails.bglat0, bs.traf.trails.bglon0)
                 x1, y1 = self.ll2xy(bs.traf.trails.bglat1, bs.traf.trails.bglon1)
 
+                bgcol = bs.traf.trails.bgcol
                 for i in trlsel:
-                    pg.draw.aaline(self.radbmp, bs.traf.trails.bgcol[i], \
+                    pg.draw.aaline(self.radbmp, bgcol[i], \
                                    (x0[i], y0[i]), (x1[i], y1[i]))
 
             #---------- Draw ADSB Coverage Area
@@ -845,8 +846,9 @@ class Screen:
                 x0, y0 = self.ll2xy(bs.traf.trails.lat0, bs.traf.trails.lon0)
                 x1, y1 = self.ll2xy(bs.traf.trails.lat1, bs.traf.trails.lon1)
 
+                col = bs.traf.trails.col
                 for i in trlsel:
-                    pg.draw.line(self.win, bs.traf.trails.col[i], \
+                    pg.draw.line(self.win, col[i], \
                                  (x0[i], y0[i]), (x1[i], y1[i]))
 
                 # Redraw background => buffer ; if >1500 foreground linepieces on screen
@@ -1,5 +1,6 @@
 """ Definition of custom QEvent objects for QtGL gui. """
 from PyQt5.QtCore import QEvent
+import numpy as np
 
 
 NUMCUSTOMEVENTS    = 2
@@ -37,6 +38,7 @@ class ACDataEvent(QEvent):
         self.confcpalat = []
         self.confcpalon = []
         self.id         = []
+        self.slot       = np.array([], dtype=np.int64)
         self.nconf_tot  = 0
         self.nlos_tot   = 0
         self.nconf_exp  = 0
@@ -399,9 +399,8 @@ class Traffic(glh.RenderObject, layer=100):
         self.glsurface.makeCurrent()
         self.traillines.set_vertex_count(len(lat0))
         if len(lat0) > 0:
-            self.traillines.update(vertex=np.array(
-                    list(zip(lat0, lon0,
-                             lat1, lon1)), dtype=np.float32))
+            self.traillines.update(vertex=np.column_stack(
+                (lat0, lon0, lat1, lon1)).astype(np.float32))
 
     def update_route_data(self, data):
         ''' Update GPU buffers with route data from simulation. '''
@@ -516,6 +516,10 @@ class nodeData:
 
         self.naircraft = 0
         self.acdata = ACDataEvent()
+        # Static aircraft data per field, as dicts of slot id to value.
+        # None until the first keyframe is received.
+        self.acstatic = None
+        self.acslotidx = dict()
         self.routedata = RouteDataEvent()
 
         # GUI traffic data event
@@ -528,23 +532,72 @@ class nodeData:
         self._route = route
 
     def setacdata(self, data):
-        self.acdata = ACDataEvent(data)
+        ''' Apply an ACDATA update. Static aircraft data is received as
+            patches keyed by aircraft slot id. Other data is either a complete
+            update, or an update of part of the fields of the last complete
+            update. '''
+        static = data.get('static')
+        if static:
+            if static['keyframe'] or self.acstatic is None:
+                self.acstatic = {name: dict() for name in static
+                                 if name not in ('keyframe', 'slot')}
+            slots = static['slot'].tolist()
+            for name, table in self.acstatic.items():
+                table.update(zip(slots, static[name]))
+
+        # Wait for the first keyframe before showing any aircraft
+        if self.acstatic is None:
+            return
+
+        if 'simt' in data:
+            self.acdata = ACDataEvent({name: value for name, value in data.items()
+                                       if name != 'static'})
+            self.acslotidx = {slot: i for i, slot in enumerate(self.acdata.slot.tolist())}
+        else:
+            # Only update the aircraft of the last complete update
+            idata, iupd = [], []
+            for i, slot in enumerate(data['slot'].tolist()):
+                idx = self.acslotidx.get(slot)
+                if idx is not None:
+                    idata.append(idx)
+                    iupd.append(i)
+            for name, value in data.items():
+                if name not in ('static', 'slot'):
+                    arr = np.array(getattr(self.acdata, name, value[:0]))
+                    arr[idata] = value[iupd]
+                    setattr(self.acdata, name, arr)
+
+        slots = self.acdata.slot.tolist()
+        for name, table in self.acstatic.items():
+            setattr(self.acdata, name, [table.get(slot, '') for slot in slots])
         self.naircraft = len(self.acdata.lat)
 
     def setroutedata(self, data):
         self.routedata = RouteDataEvent(data)
 
-    def settrails(self, swtrails, traillat0, traillon0, traillat1, traillon1):
+    def settrails(self, swtrails, traillat0, traillon0, traillat1, traillon1,
+                  trailtime=None, maxseg=0, tmin=-np.inf):
         if not swtrails:
-            self.traillat0 = []
-            self.traillon0 = []
-            self.traillat1 = []
-            self.traillon1 = []
-        else:
-            self.traillat0.extend(traillat0)
-            self.traillon0.extend(traillon0)
-            self.traillat1.extend(traillat1)
-            self.traillon1.extend(traillon1)
+            self.cleartrails()
+            return
+        if trailtime is None:
+            trailtime = np.zeros(len(traillat0), dtype=np.float32)
+        # Keep at most maxseg segments, which are not older than tmin
+        names = ('traillat0', 'traillon0', 'traillat1', 'traillon1', 'trailtime')
+        new = (traillat0, traillon0, traillat1, traillon1, trailtime)
+        ikeep = np.searchsorted(self.trailtime, tmin)
+        if maxseg:
+            ikeep = max(ikeep, len(self.trailtime) + len(traillat0) - maxseg)
+        for name, values in zip(names, new):
+            setattr(self, name, np.append(getattr(self, name)[ikeep:],
+                                          np.asarray(values, dtype=np.float32)))
+
+    def cleartrails(self):
+        self.traillat0 = np.array([], dtype=np.float32)
+        self.traillon0 = np.array([], dtype=np.float32)
+        self.traillat1 = np.array([], dtype=np.float32)
+        self.traillon1 = np.array([], dtype=np.float32)
+        self.trailtime = np.array([], dtype=np.float32)
 
     def clear_scen_data(self):
         # Clear all scenario-specific data for sender node
@@ -567,10 +620,7 @@ class nodeData:
         self.filteralt = False
 
         # Create trail data
-        self.traillat0 = []
-        self.traillon0 = []
-        self.traillat1 = []
-        self.traillon1 = []
+        self.cleartrails()
 
         # Reset transition level
         self.translvl = 4500.*ft
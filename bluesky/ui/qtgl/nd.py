@@ -62,13 +62,16 @@ class ND(QGLWidget):
 
     def on_simstream_received(self, streamname, data, sender_id):
         if streamname == b'ACDATA':
-            if self.ac_id in data['id']:
-                idx = data['id'].index(self.ac_id.upper())
-                lat = data['lat'][idx]
-                lon = data['lon'][idx]
-                trk = data['trk'][idx]
-                tas = data['tas'][idx]
-                self.n_aircraft = len(data['lat'])
+            # Use the aircraft data as assembled by the client, because the
+            # stream itself only contains changes in static data like the id
+            data = bs.net.get_nodedata(sender_id).acdata
+            if self.ac_id in data.id:
+                idx = data.id.index(self.ac_id.upper())
+                lat = data.lat[idx]
+                lon = data.lon[idx]
+                trk = data.trk[idx]
+                tas = data.tas[idx]
+                self.n_aircraft = len(data.lat)
                 self.globaldata.set_owndata(idx, lat, lon, trk)
 
     def setAircraftID(self, ac_id):
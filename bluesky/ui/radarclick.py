@@ -140,7 +140,7 @@ def radarclick(cmdline, lat, lon, acdata=None, route=None, actdata=None):
                     todisplay += str(round(geo.kwikdist(latref, lonref, lat, lon), 6))
 
                 elif clicktype == "apt":
-                    idx = findnearest(lat, lon, bs.navdb.aptlat, bs.navdb.aptlon)
+                    idx = bs.navdb.getapinear(lat, lon) if len(bs.navdb.aptlat) else -1
                     if idx >= 0:
                         todisplay += bs.navdb.aptid[idx] + " "
 
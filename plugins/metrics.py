@@ -13,70 +13,49 @@ from bluesky.tools.aero import nm, ft
 # Metrics object
 metrics = None
 
-class SectorData:
-    # Selected traffic data for a/c in a sector
-    def __init__(self):
-        self.acid = list()
-        self.lat0 = np.array([])
-        self.lon0 = np.array([])
-        self.dist0 = np.array([])
-
-    def id2idx(self, acid):
-        # Fast way of finding indices of all ACID's in our list
-        tmp = dict((v, i) for i, v in enumerate(self.acid))
-        # Return only the indices
-        return [tmp.get(acidi, -1) for acidi in acid]
-
-    def get(self, acid):
-        # Get lat,lon and distance flown for this a/c
-        idx = self.id2idx(acid)
-        return self.lat0[idx], self.lon0[idx], self.dist0[idx]
-
-    def delete(self, acid):
-        # Remove an aircraft from our sector traffic data list
-        idx = np.sort(self.id2idx(acid))
-        self.lat0 = np.delete(self.lat0, idx)
-        self.lon0 = np.delete(self.lon0, idx)
-        self.dist0 = np.delete(self.dist0, idx)
-        for i in reversed(idx):
-            del self.acid[i]
-
-    def extend(self, acid, lat0, lon0, dist0):
-        # Add several a/c to our list:
-        # input: lat0,lon0,dist: np arrays, acid: list of strings
-        self.lat0 = np.append(self.lat0, lat0)
-        self.lon0 = np.append(self.lon0, lon0)
-        self.dist0 = np.append(self.dist0, dist0)
-        self.acid.extend(acid)
-
 class Metrics(Entity):
     def __init__(self):
         super().__init__()
         # List of sectors known to this plugin.
         self.sectors = list()
-        # List of sets of aircraft in each sector
-        self.acinside = list()
+        # Per aircraft (rows) and sector (columns): whether the aircraft
+        # is inside the sector, and its position and distance flown when it
+        # entered the sector
+        with self.settrafarrays():
+            self.acinside = np.zeros((0, 0), dtype=bool)
+            self.lat0 = np.zeros((0, 0))
+            self.lon0 = np.zeros((0, 0))
+            self.dist0 = np.zeros((0, 0))
         # Static Density metric
         self.sectorsd = np.array([], dtype=int)
         # Summed pairwise convergence metric
-        self.sectorconv = np.array([], dtype=np.float)
+        self.sectorconv = np.array([], dtype=float)
         # Route efficiency metric
         self.sectoreff = []
 
         self.effplot = None
 
-        self.delac = SectorData()
+        # Sector exit data of aircraft deleted inside a sector
+        self.delac = list()
 
         self.fsd = None
         self.fconv = None
         self.feff = None
 
     def create(self, n=1):
-        pass
+        super().create(n)
         # print(n, 'aircraft created, ntraf =', traf.ntraf)
 
     def delete(self, idx):
-        self.delac.extend(np.array(traf.id)[idx], traf.lat[idx], traf.lon[idx], traf.distflown[idx])
+        # Aircraft deleted inside a sector leave it at their last position
+        rows = np.atleast_1d(idx)
+        iac, isec = np.nonzero(self.acinside[rows])
+        iac = rows[iac]
+        self.delac.append((isec, np.array(traf.id, dtype=str)[iac],
+                           self.lat0[iac, isec], self.lon0[iac, isec],
+                           self.dist0[iac, isec], traf.lat[iac],
+                           traf.lon[iac], traf.distflown[iac]))
+        super().delete(idx)
         # n = len(idx) if isinstance(idx, Collection) else 1
         # print(n, 'aircraft deleted, ntraf =', traf.ntraf, 'idx =', idx, 'len(traf.lat) =', len(traf.lat))
 
@@ -103,65 +82,42 @@ class Metrics(Entity):
         else:
             ownidx = np.array([])
     
-        sendeff = False
-        for idx, (sector, previnside) in enumerate(zip(self.sectors, self.acinside)):
-            inside = areafilter.checkInside(sector, traf.lat, traf.lon, traf.alt)
-
-            sectoreff = []
-            # Detect aircraft leaving and entering the sector
-            previds = set(previnside.acid)
-            ids = set(np.array(traf.id)[inside])
-            arrived = list(ids - previds)
-            left = previds - ids
-
-            # Split aircraft that left the sector in deleted and not deleted
-            left_intraf = left.intersection(traf.id)
-            left_del = list(left - left_intraf) # Aircraft id's prev inside but deleted
-            left_intraf = list(left_intraf) # Aircraft id's that left sector
-
-            # New a/c in sector arr listed by index in arridx
-            arridx = traf.id2idx(arrived)
-            leftidx = traf.id2idx(left_intraf)
-
-            # Retrieve the current distance flown for arriving and leaving aircraft
-            arrdist = traf.distflown[arridx]
-            arrlat = traf.lat[arridx]
-            arrlon = traf.lon[arridx]
-
-            # Get all a/c ids that left from the set delac
-            leftlat, leftlon, leftdist = self.delac.get(left_del)
-            leftlat = np.append(leftlat, traf.lat[leftidx])
-            leftlon = np.append(leftlon, traf.lon[leftidx])
-            leftdist = np.append(leftdist, traf.distflown[leftidx])
-            leftlat0, leftlon0, leftdist0 = previnside.get(left_del + left_intraf)
-            self.delac.delete(left_del)
-
-            if len(left) > 0:
-
-                # Exclude aircraft where origin = destination for sector efficiency,
-                # so require that distance start-end > 10 nm
-                q, d = geo.qdrdist(leftlat0, leftlon0, leftlat, leftlon)
-                mask = d > 10
-
-                sectoreff = list((leftdist[mask] - leftdist0[mask]) / d[mask] / nm)
-                names = np.array(left_del + left_intraf)[mask]
-
-                for name, eff in zip(names, sectoreff):
-                    self.feff.write('{}, {}, {}\n'.format(sim.simt, name, eff))
-                sendeff = True
-
-                # print('{} aircraft left sector {}, distance flown (acid:dist):'.format(len(left), sector))
-                # for a, d0, d1, e in zip(left, leftdist0, leftdist, sectoreff):
-                #     print('Aircraft {} flew {} meters (eff = {})'.format(a, round(d1-d0), e))
-
-            # Update inside data for this sector
-            previnside.delete(left)
-            previnside.extend(arrived, arrlat, arrlon, arrdist)
-
-            self.sectoreff.append(sectoreff)
-
-            self.sectorsd[idx] = np.count_nonzero(inside)
-            insidx = np.where(np.logical_and(inside, inconf))
+        # Sector membership of all aircraft, and entering and leaving
+        # aircraft from the difference with the previous update
+        inside = areafilter.classify(traf.lat, traf.lon, traf.alt, self.sectors)
+        iarr, isecarr = np.nonzero(inside & ~self.acinside)
+        ileft, isecleft = np.nonzero(self.acinside & ~inside)
+
+        # Store position and distance flown of entering aircraft
+        self.lat0[iarr, isecarr] = traf.lat[iarr]
+        self.lon0[iarr, isecarr] = traf.lon[iarr]
+        self.dist0[iarr, isecarr] = traf.distflown[iarr]
+
+        # Entry and exit data of aircraft that left, including aircraft that
+        # were deleted inside a sector
+        left = [(isecleft, np.array(traf.id, dtype=str)[ileft],
+                 self.lat0[ileft, isecleft], self.lon0[ileft, isecleft],
+                 self.dist0[ileft, isecleft], traf.lat[ileft],
+                 traf.lon[ileft], traf.distflown[ileft])] + self.delac
+        isecleft, names, leftlat0, leftlon0, leftdist0, leftlat, leftlon, leftdist = \
+            [np.concatenate(col) for col in zip(*left)]
+        self.delac.clear()
+        self.acinside[:] = inside
+
+        # Exclude aircraft where origin = destination for sector efficiency,
+        # so require that distance start-end > 10 nm
+        q, d = geo.qdrdist(leftlat0, leftlon0, leftlat, leftlon)
+        mask = d > 10
+        eff = (leftdist[mask] - leftdist0[mask]) / d[mask] / nm
+        isecleft, names = isecleft[mask], names[mask]
+        for name, e in zip(names, eff):
+            self.feff.write('{}, {}, {}\n'.format(sim.simt, name, e))
+
+        for idx in range(len(self.sectors)):
+            self.sectoreff.append(list(eff[isecleft == idx]))
+
+            self.sectorsd[idx] = np.count_nonzero(inside[:, idx])
+            insidx = np.where(np.logical_and(inside[:, idx], inconf))
             pairsinside = np.isin(ownidx, insidx)
             if len(pairsinside):
                 tnorm = np.array(tcpa)[pairsinside] / 300.0
@@ -173,7 +129,7 @@ class Metrics(Entity):
 
             self.fconv.write('{}, {}\n'.format(sim.simt, self.sectorconv[idx]))
             self.fsd.write('{}, {}\n'.format(sim.simt, self.sectorsd[idx]))
-        if sendeff:
+        if len(names):
             self.effplot.send()
 
     def reset(self):
@@ -184,6 +140,23 @@ class Metrics(Entity):
         if self.feff:
             self.feff.close()
 
+    def addsector(self):
+        ''' Add a column for a new sector to the per-aircraft sector data. '''
+        for name in ('acinside', 'lat0', 'lon0', 'dist0'):
+            arr = getattr(self, name)
+            setattr(self, name, np.column_stack(
+                (arr, np.zeros(len(arr), dtype=arr.dtype))))
+
+    def removesector(self, idx):
+        ''' Remove the column of sector idx from the per-aircraft sector data. '''
+        for name in ('acinside', 'lat0', 'lon0', 'dist0'):
+            setattr(self, name, np.delete(getattr(self, name), idx, axis=1))
+        delac = list()
+        for isec, *data in self.delac:
+            keep = isec != idx
+            delac.append((isec[keep] - (isec[keep] > idx), *[d[keep] for d in data]))
+        self.delac = delac
+
     @stack.command(name='METRICS')
     def stackio(self, cmd, name):
         ''' Calculate a set of metrics within specified sectors. '''
@@ -212,7 +185,7 @@ class Metrics(Entity):
                                 xlabel='Sector', ylabel='Efficiency', fig=3)
                 # Add new area to the sector list, and add an initial inside count of traffic
                 self.sectors.append(name)
-                self.acinside.append(SectorData())
+                self.addsector()
                 plotter.legend(self.sectors, 1)
                 return True, 'Added %s to sector list.' % name
 
@@ -224,6 +197,7 @@ class Metrics(Entity):
             if name in self.sectors:
                 idx = self.sectors.index(name)
                 self.sectors.pop(idx)
+                self.removesector(idx)
                 return True, 'Removed %s from sector list.' % name
             return False, "No sector registered with name '%s'." % name
 
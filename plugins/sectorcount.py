@@ -3,22 +3,67 @@ import numpy as np
 # Import the global bluesky objects. Uncomment the ones you need
 import bluesky as bs
 # from bluesky import traf, scr  #, stack, settings, navdb, traf, sim, scr, tools
+from bluesky.core import TrafficArrays
 from bluesky.tools import areafilter, datalog
 
 # List of sectors known to this plugin.
 sectors    = list()
-# List of aircraft counted inside registered sectors in previous update step.
-previnside = list()
+# Sector membership of all aircraft in previous update step.
+previnside = None
 
 # Data logger for sector occupancy count logfiles
 logger     = None
 
+
+class SectorMembership(TrafficArrays):
+    ''' Sector membership of all aircraft, with a row per aircraft and a
+        column per registered sector. As a traffic array it stays aligned
+        with the traffic arrays when aircraft are created and deleted, so
+        entering and leaving aircraft follow from element-wise differences
+        with the current membership. '''
+    def __init__(self):
+        super().__init__()
+        with self.settrafarrays():
+            self.inside = np.zeros((0, len(sectors)), dtype=bool)
+        self.cleardeleted()
+
+    def cleardeleted(self):
+        ''' Clear the list of deleted aircraft. '''
+        # Sector column and callsign of aircraft deleted inside a sector
+        self.delcol = np.array([], dtype=int)
+        self.delid = np.array([], dtype=str)
+
+    def delete(self, idx):
+        # Aircraft that are deleted inside a sector have left that sector
+        rows = np.atleast_1d(idx)
+        iac, icol = np.nonzero(self.inside[rows])
+        self.delcol = np.append(self.delcol, icol)
+        self.delid = np.append(self.delid, np.array(bs.traf.id, dtype=str)[rows[iac]])
+        super().delete(idx)
+
+    def reset(self):
+        super().reset()
+        self.cleardeleted()
+
+    def addsector(self, inside):
+        ''' Add a sector column with initial membership inside. '''
+        self.inside = np.column_stack((self.inside, inside))
+
+    def removesector(self, col):
+        ''' Remove sector column col. '''
+        self.inside = np.delete(self.inside, col, axis=1)
+        keep = self.delcol != col
+        self.delcol = self.delcol[keep] - (self.delcol[keep] > col)
+        self.delid = self.delid[keep]
+
+
 ### Initialization function of your plugin. Do not change the name of this
 ### function, as it is the way BlueSky recognises this file as a plugin.
 def init_plugin():
     # Register a sector count logger
-    global logger
+    global logger, previnside
     logger = datalog.crelog('OCCUPANCYLOG', None, 'Sector count log')
+    previnside = SectorMembership()
 
     # Configuration parameters
     config = {
@@ -52,29 +97,33 @@ def init_plugin():
 ### this by anything, so long as you communicate this in init_plugin
 
 def update():
+    # Membership of all aircraft in all sectors in one pass, and entering
+    # and leaving aircraft from the difference with the previous step
+    inside  = areafilter.classify(bs.traf.lat, bs.traf.lon, bs.traf.alt, sectors)
+    arrived = inside & ~previnside.inside
+    left    = previnside.inside & ~inside
+    acid    = np.array(bs.traf.id, dtype=str)
+
     mylog = list()
     for idx, name in enumerate(sectors):
-        # Perform inside count, and check entering and leaving aircraft
-        inside    = areafilter.checkInside(name, traf.lat, traf.lon, traf.alt)
-        ids       = set(np.array(traf.id)[inside])
-        previds   = previnside[idx]
-        arrived   = str.join(', ', ids - previds)
-        left      = str.join(', ', previds - ids)
-        n_tot     = len(ids)
-        n_arrived = len(arrived)
-        n_left    = len(left)
+        n_tot     = np.count_nonzero(inside[:, idx])
+        arrids    = acid[arrived[:, idx]]
+        leftids   = np.append(acid[left[:, idx]],
+                              previnside.delid[previnside.delcol == idx])
 
         # Add log string to list
         mylog.append('%s, %d' % (name, n_tot))
 
         # Print to console
-        if n_left > 0:
-            scr.echo('%s aircraft that have left: %s' % (name, left))
-        if n_arrived > 0:
-            scr.echo('%s aircraft that have arrived: %s' % (name, arrived))
-        if n_left + n_arrived > 0:
-            scr.echo('%s occupancy count: %d' % (name, n_tot))
-            previnside[idx] = ids
+        if len(leftids) > 0:
+            bs.scr.echo('%s aircraft that have left: %s' % (name, str.join(', ', leftids)))
+        if len(arrids) > 0:
+            bs.scr.echo('%s aircraft that have arrived: %s' % (name, str.join(', ', arrids)))
+        if len(leftids) + len(arrids) > 0:
+            bs.scr.echo('%s occupancy count: %d' % (name, n_tot))
+
+    previnside.inside[:] = inside
+    previnside.cleardeleted()
 
     # Log data if enabled
     logger.log(str.join(', ', mylog))
@@ -92,8 +141,8 @@ def sectorcount(sw, name=''):
         elif areafilter.hasArea(name):
             # Add new area to the sector list, and add an initial inside count of traffic
             sectors.append(name)
-            inside = areafilter.checkInside(name, traf.lat, traf.lon, traf.alt)
-            previnside.append(set(np.array(traf.id)[inside]))
+            previnside.addsector(areafilter.checkInside(
+                name, bs.traf.lat, bs.traf.lon, bs.traf.alt))
             return True, 'Added %s to sector list.' % name
         else:
             return False, "No area found with name '%s', create it first with one of the shape commands" % name
@@ -103,7 +152,7 @@ def sectorcount(sw, name=''):
         if name in sectors:
             idx = sectors.index(name)
             sectors.pop(idx)
-            previnside.pop(idx)
+            previnside.removesector(idx)
             return True, 'Removed %s from sector list.' % name
         else:
             return False, "No sector registered with name '%s'." % name
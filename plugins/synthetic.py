@@ -2,7 +2,7 @@
 import random
 import numpy as np
 from bluesky import stack, traf, sim
-from bluesky.tools.aero import ft, eas2tas
+from bluesky.tools.aero import ft, kts, eas2tas
 
 
 def init_plugin():
@@ -26,7 +26,7 @@ def syn():
     ''' SYNTHETIC: Generate synthetic conflict geometries. '''
     return True, ("This is the synthetic traffic scenario module\n"
                   "Possible subcommands: SIMPLE, SIMPLED, DIFG, SUPER, SPHERE, "
-                  "MATRIX, FLOOR, TAKEOVER, WALL, ROW, COLUMN, DISP")
+                  "MATRIX, FLOOR, TAKEOVER, WALL, ROW, COLUMN, DENSITY, DISP")
 
 
 @syn.subcommand
@@ -340,3 +340,25 @@ def col(numac:int, angle:int, radius:float=1.0, alt:'alt'=1e5,
         traf.cre(acid="ANG"+str(i*2+1), actype=actype,
                  aclat=aclat, aclon=-aclon,
                  achdg=180-angle, acalt=alt*ft, acspd=spd)
+
+
+@syn.subcommand
+def density(numac:int, acdensity:float=5.0, seed:int=0):
+    ''' DENSITY: Generate random traffic in an area that scales with the
+        number of aircraft, such that the traffic density remains constant.
+
+        Arguments:
+        -numac: The number of aircraft.
+        -acdensity: The number of aircraft per square degree.
+        -seed: The seed of the random generator.
+    '''
+    sim.reset()
+    rng = np.random.default_rng(seed)
+    size = np.sqrt(numac / acdensity)  # [deg]
+    traf.cre(acid=[f'SYN{i:05d}' for i in range(numac)], actype='B738',
+             aclat=size * (rng.random(numac) - 0.5),
+             aclon=size * (rng.random(numac) - 0.5),
+             achdg=360.0 * rng.random(numac),
+             acalt=rng.integers(100, 400, numac) * 100.0 * ft,
+             acspd=(250.0 + 200.0 * rng.random(numac)) * kts)
+    return True